@@ -0,0 +1,1060 @@
+'''
+Overview
+benchmarks for scraping ufc stats
+
+assembly
+measures the cost of organising parsed fights into the fight results and fight stats dfs
+fights are rebuilt from the bundled fight results file, so the benchmark runs at the scale of the full dataset without the network
+the legacy method grows dfs one row at a time with .loc and pd.concat onto an accumulator after every fight
+the records method appends records to a RecordAccumulator and creates each df once
+
+normalise
+measures the cost of converting the text columns of fight stats into numeric columns
+the per cell method converts each cell with python string methods, as consumers of the text columns do
+the vectorised method is LIB.normalise_fight_stats(), which converts whole columns at once
+
+parsers
+measures parse time per page of each parser backend over pages saved in the page cache
+checks that every backend gives the same output as html.parser for every page
+fill the page cache by running the scraper once with page_cache_file_name set in the config
+--fixtures parses the saved pages of a directory instead, e.g. tests/fixtures, with a urls.json of file name to url
+
+index
+measures parsing the index of all events and an alphabetical page of fighters from the page cache as the site grows
+the rows of each page are repeated to scale it up, e.g. --scale 16 is a page with 16 times as many events
+each backend builds a soup of the whole page before the first record
+the stream methods parse chunks of the page in one pass, with python's html parser or with lxml's pull parser
+reports time to first record, total time and peak memory of each method, and checks every method gives the same records
+
+record
+records a corpus of event, fight and fighter pages from the page cache, so benchmarks can replay the same pages without the live site
+--events and --fighters record a smaller corpus, index pages are trimmed to the pages recorded
+the corpus is written to benchmark_corpus_file_name in the config, in the format of the page cache
+
+replay
+measures ms/page of each parse function of the library over the pages of the corpus, and pages/s of the pipeline parse functions
+--save writes the timings to a json file and --compare checks them against saved timings
+it exits with an error if a function is slower than saved by more than --tolerance, to catch regressions before deploying
+
+serve
+serves the corpus from a local mock server of ufcstats.com, with --latency and --error-rate to inject slow responses and errors
+run the scraper against it with http_proxy=http://127.0.0.1:8080
+
+backfill
+measures a backfill of the corpus end to end through the mock server, with the same --latency and --error-rate
+reports seconds, pages/s, responses of the mock server and peak memory
+
+run with
+python scrape_ufc_stats_benchmark.py assembly
+python scrape_ufc_stats_benchmark.py assembly --fights 1000
+python scrape_ufc_stats_benchmark.py normalise
+python scrape_ufc_stats_benchmark.py parsers
+python scrape_ufc_stats_benchmark.py parsers --pages 200
+python scrape_ufc_stats_benchmark.py parsers --fixtures tests/fixtures
+python scrape_ufc_stats_benchmark.py index
+python scrape_ufc_stats_benchmark.py index --scale 64
+python scrape_ufc_stats_benchmark.py record --events 50 --fighters 500
+python scrape_ufc_stats_benchmark.py replay --save benchmark_timings.json
+python scrape_ufc_stats_benchmark.py replay --compare benchmark_timings.json
+python scrape_ufc_stats_benchmark.py serve --latency 0.2 --error-rate 0.05
+python scrape_ufc_stats_benchmark.py backfill --latency 0.05 --error-rate 0.02 --workers 4
+'''
+
+# imports
+from typing import Callable, Dict, List, Tuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+import pandas as pd
+import numpy as np
+import re
+
+# import library
+import scrape_ufc_stats_library as LIB
+import scrape_ufc_stats_fetch as FETCH
+import scrape_ufc_stats_soup as SOUP
+import scrape_ufc_stats_pipeline as PIPE
+import scrape_ufc_stats_storage as STORE
+import scrape_ufc_stats_career as CAREER
+
+# import config
+import yaml
+config = yaml.safe_load(open('scrape_ufc_stats_config.yaml'))
+
+
+
+# rebuild parsed fights from fight results file
+def build_parsed_fights(number_of_fights: int = None) -> List[Tuple[List[str], List[str], List[str], str, str]]:
+    '''
+    rebuild the lists returned by parse_fight_results() and parse_fight_stats() for each fight in the fight results file
+    fight results are rebuilt from each row of the file
+    fight stats are not in the bundled files, so one set of stats is repeated for the number of rounds in each fight
+
+    arguments:
+    number_of_fights (int): number of fights to rebuild, defaults to all fights in the file
+
+    returns:
+    a list of tuples of fight results, stats of fighter a, stats of fighter b, event and bout
+    '''
+    # read fight results
+    fight_results_df = pd.read_csv(config['fight_results_file_name'], keep_default_na=False)
+    if number_of_fights:
+        fight_results_df = fight_results_df.head(number_of_fights)
+
+    # create empty list to store parsed fights
+    parsed_fights = []
+    for row in fight_results_df.itertuples(index=False):
+        event, bout, outcome, weightclass, method, round, fight_time, time_format, referee, details, url = row
+        fighter_a, _, fighter_b = bout.partition(' vs. ')
+        outcome_a, _, outcome_b = outcome.partition('/')
+        # rebuild fight results as returned by parse_fight_results() with the url appended
+        fight_results = [
+            event, fighter_a, fighter_b, outcome_a, outcome_b, weightclass,
+            'Method: '+method, 'Round:'+str(round), 'Time:'+fight_time, 'Time format:'+time_format,
+            'Referee:'+referee, 'Details:'+details, 'URL:'+url
+        ]
+        # rebuild stats as returned by parse_fight_stats(), a summary and one set per round for each type of stat
+        number_of_rounds = int(round) if str(round).isdigit() else 1
+        fighter_stats = []
+        for fighter in [fighter_a, fighter_b]:
+            totals = [fighter, '0', '19 of 32', '59%', '25 of 40', '1 of 3', '33%', '0', '0', '2:13']
+            significant_strikes = [fighter, '19 of 32', '59%', '10 of 20', '5 of 7', '4 of 5', '15 of 26', '2 of 3', '2 of 3']
+            fighter_stats.append(totals * (number_of_rounds + 1) + significant_strikes * (number_of_rounds + 1))
+        parsed_fights.append((fight_results, fighter_stats[0], fighter_stats[1], event.strip(), bout))
+
+    # return
+    return parsed_fights
+
+
+
+# legacy method of organising fights
+def assemble_legacy(parsed_fights: list) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    '''
+    organise parsed fights into dfs the way the library did before RecordAccumulator
+    each fight result and each round of stats is appended to a df with .loc
+    the dfs of each fight are concat to the accumulated dfs after every fight
+
+    arguments:
+    parsed_fights (list): output of build_parsed_fights()
+
+    returns:
+    dfs of fight results and fight stats
+    '''
+    totals_column_names = config['totals_column_names']
+    significant_strikes_column_names = config['significant_strikes_column_names']
+
+    # convert stats of one fighter to a df one round at a time
+    def convert_fight_stats_to_df(clean_fighter_stats):
+        totals_df = pd.DataFrame(columns=totals_column_names)
+        significant_strikes_df = pd.DataFrame(columns=significant_strikes_column_names)
+        number_of_rounds = int((len(clean_fighter_stats) - 2) / 2)
+        for round in range(number_of_rounds):
+            totals_df.loc[len(totals_df)] = ['Round '+str(round+1)] + clean_fighter_stats[round+1]
+            significant_strikes_df.loc[len(significant_strikes_df)] = ['Round '+str(round+1)] + clean_fighter_stats[round+1+int((len(clean_fighter_stats) / 2))]
+        return totals_df.merge(significant_strikes_df, how='inner')
+
+    all_fight_results_df = pd.DataFrame(columns=config['fight_results_column_names'])
+    all_fight_stats_df = pd.DataFrame(columns=config['fight_stats_column_names'])
+    for fight_results, fighter_a_stats, fighter_b_stats, event, bout in parsed_fights:
+        # organise fight results into a one row df
+        fight_results_clean = fight_results[:1] + [' vs. '.join(fight_results[1:3]), '/'.join(fight_results[3:5])] + [re.sub('^(.+?): ?', '', text) for text in fight_results[5:]]
+        fight_result_df = pd.DataFrame(columns=config['fight_results_column_names'])
+        fight_result_df.loc[len(fight_result_df)] = fight_results_clean
+        # organise fight stats into a df
+        fight_stats_df = pd.concat([
+            convert_fight_stats_to_df(LIB.organise_fight_stats(fighter_a_stats)),
+            convert_fight_stats_to_df(LIB.organise_fight_stats(fighter_b_stats))
+        ])
+        fight_stats_df['EVENT'] = event
+        fight_stats_df['BOUT'] = bout
+        fight_stats_df = LIB.move_columns(fight_stats_df, ['EVENT', 'BOUT'], 'ROUND', 'before')
+        # concat to accumulated dfs
+        all_fight_results_df = pd.concat([all_fight_results_df, fight_result_df])
+        all_fight_stats_df = pd.concat([all_fight_stats_df, fight_stats_df])
+
+    # return
+    return all_fight_results_df, all_fight_stats_df
+
+
+
+# records method of organising fights
+def assemble_records(parsed_fights: list) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    '''
+    organise parsed fights into dfs with the record functions of the library
+    records are appended to a RecordAccumulator and each df is created once
+
+    arguments:
+    parsed_fights (list): output of build_parsed_fights()
+
+    returns:
+    dfs of fight results and fight stats
+    '''
+    totals_column_names = config['totals_column_names']
+    significant_strikes_column_names = config['significant_strikes_column_names']
+
+    fight_results_records = LIB.RecordAccumulator(config['fight_results_column_names'])
+    fight_stats_records = LIB.RecordAccumulator(config['fight_stats_column_names'])
+    for fight_results, fighter_a_stats, fighter_b_stats, event, bout in parsed_fights:
+        fight_results_records.append(LIB.organise_fight_results_record(fight_results))
+        fight_stats_records.extend(LIB.combine_fighter_stats_records(
+            LIB.convert_fight_stats_to_records(LIB.organise_fight_stats(fighter_a_stats), totals_column_names, significant_strikes_column_names),
+            LIB.convert_fight_stats_to_records(LIB.organise_fight_stats(fighter_b_stats), totals_column_names, significant_strikes_column_names),
+            event,
+            bout
+        ))
+
+    # return
+    return fight_results_records.to_df(), fight_stats_records.to_df()
+
+
+
+# time a function
+def time_function(function: Callable, *args) -> Tuple[float, object]:
+    '''
+    time one call of a function
+
+    arguments:
+    function (function): function to time
+    args: arguments of function
+
+    returns:
+    seconds taken and output of function
+    '''
+    start = time.perf_counter()
+    output = function(*args)
+
+    # return
+    return time.perf_counter() - start, output
+
+
+
+# benchmark assembly of fight results and fight stats
+def benchmark_assembly(number_of_fights: int = None) -> None:
+    '''
+    time the legacy and records methods of organising fights and check that both give the same dfs
+
+    arguments:
+    number_of_fights (int): number of fights to organise, defaults to all fights in the fight results file
+
+    returns:
+    none
+    '''
+    parsed_fights = build_parsed_fights(number_of_fights)
+
+    legacy_seconds, (legacy_results_df, legacy_stats_df) = time_function(assemble_legacy, parsed_fights)
+    records_seconds, (records_results_df, records_stats_df) = time_function(assemble_records, parsed_fights)
+
+    # both methods should write the same files
+    same_output = (
+        legacy_results_df.to_csv(index=False) == records_results_df.to_csv(index=False)
+        and legacy_stats_df.to_csv(index=False) == records_stats_df.to_csv(index=False)
+    )
+
+    print(f'fights: {len(parsed_fights)}, fight stats rows: {len(records_stats_df)}')
+    print(f'legacy  (.loc and pd.concat per fight): {legacy_seconds:8.2f} s')
+    print(f'records (RecordAccumulator):            {records_seconds:8.2f} s')
+    print(f'speed up: {legacy_seconds / records_seconds:.1f}x, same output: {same_output}')
+
+
+
+# normalise fight stats one cell at a time
+def normalise_per_cell(fight_stats_df: pd.DataFrame) -> pd.DataFrame:
+    '''
+    normalise fight stats the way consumers of the text columns do, with python string methods on each cell
+
+    arguments:
+    fight_stats_df (df): df of fight stats with text columns
+
+    returns:
+    a df of fight stats with numeric columns, the same as LIB.normalise_fight_stats()
+    '''
+    normalised_fight_stats_columns = config['normalised_fight_stats_columns']
+    column_types = LIB.get_normalised_fight_stats_column_types(normalised_fight_stats_columns)
+
+    # convert one cell of text to numbers, or nans if it does not match
+    def to_numbers(value, pattern, number_of_groups):
+        match = re.match(pattern, value) if isinstance(value, str) else None
+        return [float(group) for group in match.groups()] if match else [np.nan] * number_of_groups
+
+    columns = {}
+    for column in fight_stats_df.columns:
+        values = fight_stats_df[column]
+        if column in normalised_fight_stats_columns['landed_attempted']:
+            numbers = [to_numbers(value, r'^\s*(\d+) of (\d+)\s*$', 2) for value in values]
+            columns[column+' LANDED'] = pd.array([landed for landed, _ in numbers]).astype(column_types[column+' LANDED'])
+            columns[column+' ATTEMPTED'] = pd.array([attempted for _, attempted in numbers]).astype(column_types[column+' ATTEMPTED'])
+        elif column in normalised_fight_stats_columns['percentage']:
+            columns[column] = np.array([to_numbers(value, r'^\s*(\d+(?:\.\d+)?)%\s*$', 1)[0] / 100 for value in values]).astype(column_types[column])
+        elif column in normalised_fight_stats_columns['time']:
+            numbers = [to_numbers(value, r'^\s*(\d+):(\d+)\s*$', 2) for value in values]
+            columns[column+' SECONDS'] = pd.array([minutes * 60 + seconds for minutes, seconds in numbers]).astype(column_types[column+' SECONDS'])
+        elif column in normalised_fight_stats_columns['count']:
+            columns[column] = pd.array([to_numbers(str(value), r'^\s*(\d+)(?:\.0+)?\s*$', 1)[0] for value in values]).astype(column_types[column])
+        else:
+            columns[column] = values
+
+    # return
+    return pd.DataFrame(columns, index=fight_stats_df.index)
+
+
+
+# benchmark normalising fight stats
+def benchmark_normalise(number_of_fights: int = None) -> None:
+    '''
+    time normalising fight stats one cell at a time and with LIB.normalise_fight_stats(), and check that both give the same df
+    report memory of fight stats before and after normalising
+
+    arguments:
+    number_of_fights (int): number of fights, defaults to all fights in the fight results file
+
+    returns:
+    none
+    '''
+    _, fight_stats_df = assemble_records(build_parsed_fights(number_of_fights))
+
+    per_cell_seconds, per_cell_df = time_function(normalise_per_cell, fight_stats_df)
+    vectorised_seconds, vectorised_df = time_function(LIB.normalise_fight_stats, fight_stats_df, config['normalised_fight_stats_columns'])
+
+    print(f'fight stats rows: {len(fight_stats_df)}')
+    print(f'per cell   (python string methods):  {per_cell_seconds:8.2f} s')
+    print(f'vectorised (normalise_fight_stats):  {vectorised_seconds:8.2f} s')
+    print(f'speed up: {per_cell_seconds / vectorised_seconds:.1f}x, same output: {per_cell_df.equals(vectorised_df)}')
+    print(f'memory of text columns:       {fight_stats_df.memory_usage(deep=True).sum() / 1e6:8.1f} MB')
+    print(f'memory of normalised columns: {vectorised_df.memory_usage(deep=True).sum() / 1e6:8.1f} MB')
+
+
+
+# parse a page with the parse function for its type of page
+def parse_page(url: str, soup) -> str:
+    '''
+    parse a page with the library's parse functions for its type of page, found from its url
+    output is returned as text so that output of different backends can be compared
+
+    arguments:
+    url (str): url of page
+    soup (html): output of SOUP.make_soup()
+
+    returns:
+    parsed output as text
+    '''
+    if 'statistics/events' in url:
+        return LIB.parse_event_details(soup).to_csv(index=False)
+    if 'event-details' in url:
+        return LIB.parse_fight_details(soup).to_csv(index=False)
+    if 'fight-details' in url:
+        fight_results_record, fight_stats_records = LIB.parse_organise_fight_results_and_stats_records(
+            soup,
+            url,
+            config['totals_column_names'],
+            config['significant_strikes_column_names']
+        )
+        return repr((LIB.parse_bout(soup), fight_results_record, fight_stats_records))
+    if 'statistics/fighters' in url:
+        return LIB.parse_fighter_details(soup, config['fighter_details_column_names']).to_csv(index=False)
+    if 'fighter-details' in url:
+        fighter_tott_record = LIB.organise_fighter_tott_record(LIB.parse_fighter_tott(soup), url)
+        fighter_averages_record = LIB.organise_fighter_tott_record(LIB.parse_fighter_averages(soup), url)
+        return repr((fighter_tott_record, fighter_averages_record, LIB.organise_fighter_history_records(LIB.parse_fighter_history(soup), fighter_tott_record[0], url)))
+    raise ValueError(f'unknown type of page {url}')
+
+
+
+# benchmark parser backends
+def benchmark_parsers(number_of_pages: int = None, fixtures_directory: str = None) -> bool:
+    '''
+    time creating soups and parsing pages from the page cache with each parser backend
+    report milliseconds per page for each type of page, and pages whose output differs from html.parser
+
+    arguments:
+    number_of_pages (int): number of pages of each type to parse, defaults to all cached pages
+    fixtures_directory (str): directory of saved pages with a urls.json of file name to url, parsed instead of the page cache
+
+    returns:
+    true if all backends give the same output
+    '''
+    page_types = ['statistics/events', 'event-details', 'fight-details', 'statistics/fighters', 'fighter-details']
+    pages: Dict[str, List[Tuple[str, bytes]]] = {}
+
+    # read saved pages
+    if fixtures_directory:
+        with open(os.path.join(fixtures_directory, 'urls.json')) as file:
+            fixture_urls = json.load(file)
+        for page_type in page_types:
+            pages[page_type] = []
+            for file_name, url in fixture_urls.items():
+                if page_type in url:
+                    with open(os.path.join(fixtures_directory, file_name), 'rb') as file:
+                        pages[page_type].append((url, file.read()))
+            pages[page_type] = pages[page_type][:number_of_pages]
+        if not any(pages.values()):
+            print(f'no saved pages in {fixtures_directory}')
+            return False
+
+    # read pages from page cache
+    else:
+        FETCH.configure(page_cache_file_name=config['page_cache_file_name'], offline=True)
+        for page_type in page_types:
+            urls = FETCH.list_cached_urls(page_type)[:number_of_pages]
+            pages[page_type] = [(url, FETCH.get_page(url)) for url in urls]
+        if not any(pages.values()):
+            print(f'no pages in page cache {config["page_cache_file_name"]}, run the scraper once to fill it')
+            return False
+
+    # parse every page with every backend
+    outputs = {}
+    same_output = True
+    print(f'{"backend":<12} {"page type":<20} {"pages":>6} {"soup ms/page":>13} {"parse ms/page":>14} {"mismatches":>11}')
+    for parser_backend in SOUP.parser_backends:
+        for page_type in page_types:
+            if not pages[page_type]:
+                continue
+            soup_seconds = parse_seconds = 0
+            mismatches = 0
+            for url, page in pages[page_type]:
+                start = time.perf_counter()
+                soup = SOUP.make_soup(page, parser_backend)
+                soup_seconds += time.perf_counter() - start
+                start = time.perf_counter()
+                output = parse_page(url, soup)
+                parse_seconds += time.perf_counter() - start
+                # compare output to html.parser
+                if parser_backend == 'html.parser':
+                    outputs[url] = output
+                elif output != outputs[url]:
+                    mismatches += 1
+                    print(f'  output of {parser_backend} differs for {url}')
+            same_output = same_output and mismatches == 0
+            number_of_page_type = len(pages[page_type])
+            print(f'{parser_backend:<12} {page_type:<20} {number_of_page_type:>6} {1000 * soup_seconds / number_of_page_type:>13.2f} {1000 * parse_seconds / number_of_page_type:>14.2f} {mismatches:>11}')
+
+    print(f'same output: {same_output}')
+
+    # return
+    return same_output
+
+
+
+# scale index page
+def scale_index_page(page: bytes, scale: int) -> bytes:
+    '''
+    repeat the rows of an index page that link to events or fighters, to make a page of a larger site
+
+    arguments:
+    page (bytes): raw content of index page
+    scale (int): number of times the rows are repeated
+
+    returns:
+    raw content of scaled page
+    '''
+    text = page.decode()
+    # rows from the first to the last row with a link to an event or fighter
+    first = text.rfind('<tr', 0, text.index('b-link b-link_style_black'))
+    last = text.index('</tr>', text.rindex('b-link b-link_style_black')) + len('</tr>')
+
+    # return
+    return (text[:first] + text[first:last] * scale + text[last:]).encode()
+
+
+
+# parse index page with a method
+def parse_index_page(method: str, page_type: str, page: bytes) -> Tuple[float, float, list]:
+    '''
+    parse an index page with a parser backend, or in chunks with a stream method
+
+    arguments:
+    method (str): a parser backend, or stream followed by the parser backend of the stream, e.g. 'stream lxml'
+    page_type (str): statistics/events or statistics/fighters
+    page (bytes): raw content of index page
+
+    returns:
+    seconds to first record, seconds to all records, and the records
+    '''
+    start = time.perf_counter()
+
+    # stream page in chunks the size of chunks from the network
+    if method.startswith('stream'):
+        SOUP.configure(method.split()[1])
+        chunks = (page[i:i + 65536] for i in range(0, len(page), 65536))
+        iter_records = LIB.iter_event_details(chunks) if page_type == 'statistics/events' else LIB.iter_fighter_details(chunks)
+        records = [next(iter_records)]
+        first_seconds = time.perf_counter() - start
+        records.extend(iter_records)
+        return first_seconds, time.perf_counter() - start, records
+
+    # build soup of whole page, records are only available once the page is parsed
+    soup = SOUP.make_soup(page, method)
+    if page_type == 'statistics/events':
+        records = LIB.parse_event_details(soup).values.tolist()
+    else:
+        records = LIB.parse_fighter_details(soup, config['fighter_details_column_names']).values.tolist()
+    seconds = time.perf_counter() - start
+
+    # return
+    return seconds, seconds, records
+
+
+
+# measure parse of index page in a new process
+def measure_index_page(method: str, page_type: str, page: bytes, connection) -> None:
+    '''
+    parse an index page in a child process and send its times, peak memory and records to the parent
+    peak memory is the growth of the peak resident set size of the process, which includes memory of lxml
+
+    arguments:
+    method (str): a parser backend, or a stream method
+    page_type (str): statistics/events or statistics/fighters
+    page (bytes): raw content of index page
+    connection (connection): pipe to parent process
+
+    returns:
+    none
+    '''
+    start_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    first_seconds, seconds, records = parse_index_page(method, page_type, page)
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    connection.send((first_seconds, seconds, (peak_rss - start_rss) / 1024, records))
+    connection.close()
+
+
+
+# benchmark parsing index pages
+def benchmark_index(scale: int = 16) -> bool:
+    '''
+    time parsing the index of all events and the first alphabetical page of fighters from the page cache
+    with every parser backend and with the stream methods, at scales from 1 to scale
+    each parse runs in a new process so that its peak memory is measured on its own
+
+    arguments:
+    scale (int): largest number of times the rows of each page are repeated
+
+    returns:
+    true if every method gives the same records
+    '''
+    # read pages from page cache
+    FETCH.configure(page_cache_file_name=config['page_cache_file_name'], offline=True)
+    pages = {}
+    for page_type, url in [('statistics/events', config['completed_events_all_url']), ('statistics/fighters', LIB.generate_alphabetical_urls()[0])]:
+        if url in FETCH.list_cached_urls(url):
+            pages[page_type] = FETCH.get_page(url)
+    if not pages:
+        print(f'no index pages in page cache {config["page_cache_file_name"]}, run the scraper once to fill it')
+        return False
+
+    # parse every scaled page with every method in a new process
+    context = multiprocessing.get_context('fork')
+    same_output = True
+    print(f'{"page type":<20} {"scale":>6} {"MB":>7} {"method":<18} {"records":>8} {"ms to first":>12} {"ms total":>10} {"peak MB":>9}')
+    for page_type, page in pages.items():
+        for page_scale in sorted({1, 4, scale} | {4 ** i for i in range(1, 8) if 4 ** i < scale}):
+            scaled_page = scale_index_page(page, page_scale)
+            outputs = {}
+            for method in SOUP.parser_backends + ['stream html.parser', 'stream lxml']:
+                receiver, sender = context.Pipe(duplex=False)
+                process = context.Process(target=measure_index_page, args=(method, page_type, scaled_page, sender))
+                process.start()
+                first_seconds, seconds, peak_mb, outputs[method] = receiver.recv()
+                process.join()
+                print(f'{page_type:<20} {page_scale:>6} {len(scaled_page) / 1e6:>7.2f} {method:<18} {len(outputs[method]):>8} {1000 * first_seconds:>12.1f} {1000 * seconds:>10.1f} {peak_mb:>9.1f}')
+            same_output = same_output and all(output == outputs['html.parser'] for output in outputs.values())
+
+    print(f'same output: {same_output}')
+
+    # return
+    return same_output
+
+
+
+# types of pages in a corpus, in the order they are reported
+corpus_page_types = ['statistics/events', 'event-details', 'fight-details', 'statistics/fighters', 'fighter-details']
+
+
+
+# trim index page
+def trim_index_page(page: bytes, urls: set) -> bytes:
+    '''
+    remove the rows of an index page that link to events or fighters not in urls, so that the page only links to recorded pages
+
+    arguments:
+    page (bytes): raw content of index page
+    urls (set): urls of events or fighters to keep
+
+    returns:
+    raw content of trimmed page
+    '''
+    # keep rows without a link to an event or fighter, and rows whose link is kept
+    def keep_row(match):
+        row = match.group(0)
+        link = re.search(r'href="([^"]+)"[^>]*class="b-link b-link_style_black"', row)
+        return row if link is None or link.group(1) in urls else ''
+
+    # return
+    return re.sub(r'<tr\b.*?</tr>', keep_row, page.decode(), flags=re.DOTALL).encode()
+
+
+
+# record corpus of pages
+def record_corpus(number_of_events: int = None, number_of_fighters: int = None) -> bool:
+    '''
+    record a corpus of pages from the page cache to replay in benchmarks without the network
+    the corpus is the index of all events with the first number_of_events events, their event pages and fight pages,
+    and the alphabetical pages of fighters with the first number_of_fighters fighters and their fighter pages
+    events and fighters whose pages are not all in the page cache are left out, and index pages are trimmed to the pages recorded
+    the corpus is written to config['benchmark_corpus_file_name'] in the format of the page cache
+
+    arguments:
+    number_of_events (int): number of events, defaults to all events in the page cache
+    number_of_fighters (int): number of fighters, defaults to all fighters in the page cache
+
+    returns:
+    true if every page needed for a backfill is in the corpus
+    '''
+    # read pages from page cache
+    FETCH.configure(page_cache_file_name=config['page_cache_file_name'], offline=True)
+    cached_urls = set(FETCH.list_cached_urls())
+    if config['completed_events_all_url'] not in cached_urls:
+        print(f'no index of events in page cache {config["page_cache_file_name"]}, run the scraper once to fill it')
+        return False
+
+    # find events whose event page and fight pages are cached, in order of the index of events
+    events_page = FETCH.get_page(config['completed_events_all_url'])
+    pages = {}
+    for _, event_url, _, _ in LIB.iter_event_details([events_page]):
+        if number_of_events is not None and len(pages) >= number_of_events:
+            break
+        if event_url not in cached_urls:
+            continue
+        event_page = FETCH.get_page(event_url)
+        fight_urls = list(LIB.parse_fight_details(SOUP.make_soup(event_page))['URL'])
+        if all(fight_url in cached_urls for fight_url in fight_urls):
+            pages[event_url] = event_page
+    for fight_url in [fight_url for event_page in list(pages.values()) for fight_url in LIB.parse_fight_details(SOUP.make_soup(event_page))['URL']]:
+        pages[fight_url] = FETCH.get_page(fight_url)
+    pages[config['completed_events_all_url']] = trim_index_page(events_page, set(pages))
+
+    # find fighters whose fighter page is cached, in order of the alphabetical pages
+    fighter_urls = set()
+    alphabetical_pages = {}
+    for alphabetical_url in LIB.generate_alphabetical_urls():
+        if alphabetical_url not in cached_urls:
+            print(f'  alphabetical page {alphabetical_url} is not in the page cache')
+            continue
+        alphabetical_pages[alphabetical_url] = FETCH.get_page(alphabetical_url)
+        for _, _, _, fighter_url in LIB.iter_fighter_details([alphabetical_pages[alphabetical_url]]):
+            if fighter_url in cached_urls and (number_of_fighters is None or len(fighter_urls) < number_of_fighters):
+                fighter_urls.add(fighter_url)
+    for alphabetical_url, alphabetical_page in alphabetical_pages.items():
+        pages[alphabetical_url] = trim_index_page(alphabetical_page, fighter_urls)
+    for fighter_url in sorted(fighter_urls):
+        pages[fighter_url] = FETCH.get_page(fighter_url)
+
+    # write corpus in the format of the page cache
+    for suffix in ['', '-wal', '-shm']:
+        if os.path.exists(config['benchmark_corpus_file_name'] + suffix):
+            os.remove(config['benchmark_corpus_file_name'] + suffix)
+    FETCH.configure(page_cache_file_name=config['benchmark_corpus_file_name'], offline=True)
+    for url, page in pages.items():
+        FETCH.write_cached_page(url, page)
+    FETCH.configure(page_cache_file_name='')
+
+    print(f'recorded {len(pages)} pages to {config["benchmark_corpus_file_name"]}')
+    for page_type in corpus_page_types:
+        print(f'{page_type:<20} {sum(page_type in url for url in pages):>6}')
+
+    # return
+    return len(alphabetical_pages) == len(LIB.generate_alphabetical_urls())
+
+
+
+# read corpus of pages
+def read_corpus(number_of_pages: int = None) -> Dict[str, List[Tuple[str, bytes]]]:
+    '''
+    read the pages of the corpus recorded by record_corpus(), by type of page
+
+    arguments:
+    number_of_pages (int): number of pages of each type, defaults to all pages in the corpus
+
+    returns:
+    a dict of type of page to a list of tuples of url and raw content of page, empty if there is no corpus
+    '''
+    if not os.path.exists(config['benchmark_corpus_file_name']):
+        print(f'no corpus {config["benchmark_corpus_file_name"]}, record one with python scrape_ufc_stats_benchmark.py record')
+        return {}
+
+    FETCH.configure(page_cache_file_name=config['benchmark_corpus_file_name'], offline=True)
+    pages = {}
+    for page_type in corpus_page_types:
+        urls = FETCH.list_cached_urls(page_type)[:number_of_pages]
+        pages[page_type] = [(url, FETCH.get_page(url)) for url in urls]
+    FETCH.configure(page_cache_file_name='')
+
+    # return
+    return pages
+
+
+
+# get parse functions of type of page
+def get_parse_functions(page_type: str) -> List[Tuple[str, Callable]]:
+    '''
+    get the library's parse functions for a type of page, each as a function of the raw page, its url and its soup
+    the pipeline function that does all the parsing of a page in a backfill is first, it is timed on its own without the soup
+
+    arguments:
+    page_type (str): one of corpus_page_types
+
+    returns:
+    a list of tuples of name and function
+    '''
+    totals_column_names = config['totals_column_names']
+    significant_strikes_column_names = config['significant_strikes_column_names']
+    fighter_details_column_names = config['fighter_details_column_names']
+    parse_functions = {
+        'statistics/events': [
+            ('PIPE.parse_events_page', lambda page, url, soup: PIPE.parse_events_page(page, url)),
+            ('SOUP.make_soup', lambda page, url, soup: SOUP.make_soup(page)),
+            ('parse_event_details', lambda page, url, soup: LIB.parse_event_details(soup)),
+            ('iter_event_details', lambda page, url, soup: list(LIB.iter_event_details([page]))),
+        ],
+        'event-details': [
+            ('PIPE.parse_event_page', lambda page, url, soup: PIPE.parse_event_page(page, url)),
+            ('SOUP.make_soup', lambda page, url, soup: SOUP.make_soup(page)),
+            ('parse_fight_details', lambda page, url, soup: LIB.parse_fight_details(soup)),
+            ('parse_fight_fingerprints', lambda page, url, soup: LIB.parse_fight_fingerprints(soup)),
+        ],
+        'fight-details': [
+            ('PIPE.parse_fight_page', lambda page, url, soup: PIPE.parse_fight_page(page, url, totals_column_names, significant_strikes_column_names)),
+            ('SOUP.make_soup', lambda page, url, soup: SOUP.make_soup(page)),
+            ('parse_bout', lambda page, url, soup: LIB.parse_bout(soup)),
+            ('parse_fight_results', lambda page, url, soup: LIB.parse_fight_results(soup)),
+            ('parse_fight_stats', lambda page, url, soup: LIB.parse_fight_stats(soup)),
+        ],
+        'statistics/fighters': [
+            ('PIPE.parse_fighters_page', lambda page, url, soup: PIPE.parse_fighters_page(page, url, fighter_details_column_names)),
+            ('SOUP.make_soup', lambda page, url, soup: SOUP.make_soup(page)),
+            ('parse_fighter_details', lambda page, url, soup: LIB.parse_fighter_details(soup, fighter_details_column_names)),
+            ('iter_fighter_details', lambda page, url, soup: list(LIB.iter_fighter_details([page]))),
+        ],
+        'fighter-details': [
+            ('PIPE.parse_fighter_page', lambda page, url, soup: PIPE.parse_fighter_page(page, url, True)),
+            ('SOUP.make_soup', lambda page, url, soup: SOUP.make_soup(page)),
+            ('parse_fighter_tott', lambda page, url, soup: LIB.parse_fighter_tott(soup)),
+            ('parse_fighter_averages', lambda page, url, soup: LIB.parse_fighter_averages(soup)),
+            ('parse_fighter_history', lambda page, url, soup: LIB.parse_fighter_history(soup)),
+        ],
+    }
+
+    # return
+    return parse_functions[page_type]
+
+
+
+# benchmark replay of corpus through parse functions
+def benchmark_replay(number_of_pages: int = None, save_file_name: str = None, compare_file_name: str = None, tolerance: float = 1.25) -> bool:
+    '''
+    time the library's parse functions over the pages of the corpus, without the network
+    report milliseconds per page of each function, pages per second of the pipeline functions and peak memory
+    timings can be saved to a json file, and compared with a saved file to find functions that have become slower
+
+    arguments:
+    number_of_pages (int): number of pages of each type, defaults to all pages in the corpus
+    save_file_name (str): json file to save milliseconds per page of each function to
+    compare_file_name (str): json file of saved milliseconds per page to compare with
+    tolerance (float): ratio to the saved milliseconds per page above which a function is reported as slower
+
+    returns:
+    true if no function is slower than the saved timings by more than tolerance
+    '''
+    pages = read_corpus(number_of_pages)
+    if not any(pages.values()):
+        return False
+
+    # time every parse function of each type of page over all pages of the type
+    timings = {}
+    pipeline_pages = pipeline_seconds = 0
+    print(f'{"page type":<20} {"pages":>6} {"function":<28} {"ms/page":>9} {"pages/s":>9}')
+    for page_type in corpus_page_types:
+        if not pages[page_type]:
+            continue
+        for name, function in get_parse_functions(page_type):
+            seconds = 0
+            for url, page in pages[page_type]:
+                soup = None if name.startswith(('PIPE.', 'SOUP.', 'iter_')) else SOUP.make_soup(page)
+                start = time.perf_counter()
+                function(page, url, soup)
+                seconds += time.perf_counter() - start
+            number_of_page_type = len(pages[page_type])
+            timings[f'{page_type} {name}'] = 1000 * seconds / number_of_page_type
+            if name.startswith('PIPE.'):
+                pipeline_pages += number_of_page_type
+                pipeline_seconds += seconds
+            print(f'{page_type:<20} {number_of_page_type:>6} {name:<28} {1000 * seconds / number_of_page_type:>9.2f} {number_of_page_type / seconds:>9.1f}')
+
+    print(f'pages/s of pipeline parse functions: {pipeline_pages / pipeline_seconds:.1f}, pages: {pipeline_pages}, parser backend: {SOUP.settings["parser_backend"]}')
+    print(f'peak memory: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MB')
+
+    # save timings
+    if save_file_name:
+        with open(save_file_name, 'w') as file:
+            json.dump(timings, file, indent=1)
+        print(f'saved timings to {save_file_name}')
+
+    # compare timings with saved timings
+    no_regressions = True
+    if compare_file_name:
+        with open(compare_file_name) as file:
+            saved_timings = json.load(file)
+        for name, ms_per_page in timings.items():
+            if name not in saved_timings:
+                continue
+            ratio = ms_per_page / saved_timings[name]
+            if ratio > tolerance:
+                no_regressions = False
+                print(f'  slower: {name} {saved_timings[name]:.2f} -> {ms_per_page:.2f} ms/page ({ratio:.2f}x)')
+        print(f'no regressions compared to {compare_file_name}: {no_regressions}')
+
+    # return
+    return no_regressions
+
+
+
+# http handler of mock server
+class CorpusRequestHandler(BaseHTTPRequestHandler):
+    '''
+    http handler that serves pages of the corpus as a stand-in for ufcstats.com
+    requests can be sent as to a proxy, with the full url as the path, or to the server itself with the path of the url
+    each response waits for the latency of the server, and is replaced with an error at the error rate of the server
+    pages have an etag, so a request with a matching If-None-Match is answered not modified
+    '''
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        url = self.path if self.path.startswith('http') else 'http://ufcstats.com' + self.path
+
+        # wait for latency of server with jitter
+        if server.latency:
+            time.sleep(server.latency * random.uniform(0.5, 1.5))
+
+        # count request and pick response
+        with server.counts_lock:
+            server.counts['requests'] += 1
+            if url not in server.pages:
+                status = 404
+            elif random.random() < server.error_rate:
+                status = server.error_status
+            elif self.headers.get('If-None-Match') == server.pages[url][1]:
+                status = 304
+            else:
+                status = 200
+            server.counts[status] = server.counts.get(status, 0) + 1
+
+        # send response
+        content = server.pages[url][0] if status == 200 else b''
+        self.send_response(status)
+        if status in (200, 304):
+            self.send_header('ETag', server.pages[url][1])
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    # requests are counted instead of logged
+    def log_message(self, format, *args):
+        pass
+
+
+
+# serve corpus with mock server
+def serve_corpus(port: int = 0, latency: float = 0.0, error_rate: float = 0.0, error_status: int = 503, connection=None) -> None:
+    '''
+    serve the pages of the corpus over http on localhost as a stand-in for ufcstats.com
+    point the scraper at it with the environment variable http_proxy=http://127.0.0.1:port
+    with a connection the server runs in a child process, it sends its port once it is listening
+    and sends its counts of requests and responses by status once the parent sends a message to stop
+
+    arguments:
+    port (int): port to listen on, 0 picks a free port
+    latency (float): mean seconds each response waits, with jitter of half the latency
+    error_rate (float): fraction of requests answered with error_status instead of the page
+    error_status (int): status of injected errors, e.g. 503 to throttle or 500 to fail
+    connection (connection): pipe to parent process, none serves until interrupted
+
+    returns:
+    none
+    '''
+    pages = read_corpus()
+
+    server = ThreadingHTTPServer(('127.0.0.1', port), CorpusRequestHandler)
+    server.daemon_threads = True
+    server.pages = {url: (page, '"' + hashlib.sha256(page).hexdigest()[:16] + '"') for page_type in pages for url, page in pages[page_type]}
+    server.latency = latency
+    server.error_rate = error_rate
+    server.error_status = error_status
+    server.counts = {'requests': 0}
+    server.counts_lock = threading.Lock()
+
+    # serve until interrupted
+    if connection is None:
+        print(f'serving {len(server.pages)} pages on http://127.0.0.1:{server.server_address[1]}, latency {latency} s, error rate {error_rate}')
+        print(f'run the scraper with http_proxy=http://127.0.0.1:{server.server_address[1]}')
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print(server.counts)
+        return
+
+    # serve until the parent process sends a message to stop
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    connection.send(server.server_address[1])
+    connection.recv()
+    server.shutdown()
+    connection.send(server.counts)
+    connection.close()
+
+
+
+# benchmark backfill through mock server
+def benchmark_backfill(latency: float = 0.0, error_rate: float = 0.0, error_status: int = 503, workers: int = 0, requests_per_second: float = 1000.0) -> bool:
+    '''
+    time a backfill of the corpus end to end, fetching every page from the mock server and writing every table
+    the mock server runs in a child process so that it does not share the interpreter with the backfill
+    the backfill writes to a temporary directory with its own page cache, journal and tables
+    report seconds, pages per second, responses of the mock server by status and peak memory
+
+    arguments:
+    latency (float): mean seconds each response of the mock server waits
+    error_rate (float): fraction of requests the mock server answers with error_status
+    error_status (int): status of injected errors
+    workers (int): number of parser processes of the backfill, 0 parses in the main process
+    requests_per_second (float): rate limit of the fetch engine, high by default so that the rate limit does not hide the cost of parsing
+
+    returns:
+    true if the backfill wrote every page of the corpus
+    '''
+    if not os.path.exists(config['benchmark_corpus_file_name']):
+        print(f'no corpus {config["benchmark_corpus_file_name"]}, record one with python scrape_ufc_stats_benchmark.py record')
+        return False
+
+    # start mock server in a child process
+    context = multiprocessing.get_context('fork')
+    connection, server_connection = context.Pipe()
+    server_process = context.Process(target=serve_corpus, args=(0, latency, error_rate, error_status, server_connection))
+    server_process.start()
+    port = connection.recv()
+
+    with tempfile.TemporaryDirectory() as directory:
+        # write every file of the backfill to the temporary directory
+        backfill_config = {key: os.path.join(directory, os.path.basename(value)) if key.endswith('_file_name') and value else value for key, value in config.items()}
+
+        # fetch every page from the mock server, requests prefers the lower case variable
+        http_proxy = os.environ.get('http_proxy')
+        os.environ['http_proxy'] = f'http://127.0.0.1:{port}'
+        FETCH.configure(
+            max_workers=config['max_workers'],
+            requests_per_second=requests_per_second,
+            page_cache_file_name=backfill_config['page_cache_file_name'],
+            page_cache_ttls=config['page_cache_ttls'],
+            offline=False,
+            request_timeout=config['request_timeout'],
+            max_retries=config['max_retries'],
+            backoff_seconds=config['backoff_seconds'],
+            min_requests_per_second=min(config['min_requests_per_second'], requests_per_second)
+            )
+        SOUP.configure(config['parser_backend'])
+        STORE.configure(config['storage_backend'], database_file_name=backfill_config['database_file_name'], id_columns=config['id_columns'])
+        if config['normalise_fight_stats']:
+            STORE.configure(column_types=LIB.get_normalised_fight_stats_column_types(config['normalised_fight_stats_columns']))
+        if config['fighter_career_stats']:
+            STORE.configure(column_types=CAREER.get_career_column_types(config['normalised_fight_stats_columns']))
+        if config['compact_columns']:
+            STORE.configure(categorical_column_names=config['categorical_column_names'], categories_file_name=backfill_config['categories_file_name'])
+
+        # run backfill
+        complete = True
+        start = time.perf_counter()
+        try:
+            PIPE.backfill(backfill_config, workers=workers, chunk_size=config['journal_chunk_size'])
+        except RuntimeError as error:
+            complete = False
+            print(f'backfill did not complete: {error}')
+        seconds = time.perf_counter() - start
+
+        # count pages written
+        number_of_pages = len(FETCH.list_cached_urls())
+        FETCH.configure(page_cache_file_name='')
+        if http_proxy is None:
+            del os.environ['http_proxy']
+        else:
+            os.environ['http_proxy'] = http_proxy
+
+    # stop mock server
+    connection.send('stop')
+    counts = connection.recv()
+    server_process.join()
+
+    print(f'latency: {latency} s, error rate: {error_rate} ({error_status}), workers: {workers}, parser backend: {config["parser_backend"]}')
+    print(f'backfill: {seconds:.2f} s, pages: {number_of_pages}, pages/s: {number_of_pages / seconds:.1f}, complete: {complete}')
+    print(f'responses of mock server: {counts}')
+    print(f'peak memory: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MB, parser processes: {resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024:.1f} MB')
+
+    # return
+    return complete
+
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='benchmarks for scraping ufc stats')
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+    assembly_parser = subparsers.add_parser('assembly', help='organise parsed fights into fight results and fight stats dfs')
+    assembly_parser.add_argument('--fights', type=int, default=None, help='number of fights, defaults to all fights in the fight results file')
+    normalise_parser = subparsers.add_parser('normalise', help='normalise fight stats into numeric columns')
+    normalise_parser.add_argument('--fights', type=int, default=None, help='number of fights, defaults to all fights in the fight results file')
+    parsers_parser = subparsers.add_parser('parsers', help='parse pages in the page cache with each parser backend')
+    parsers_parser.add_argument('--pages', type=int, default=None, help='number of pages of each type, defaults to all cached pages')
+    parsers_parser.add_argument('--fixtures', default=None, help='directory of saved pages to parse instead of the page cache, e.g. tests/fixtures')
+    index_parser = subparsers.add_parser('index', help='parse index pages of events and fighters from the page cache, streamed and as soups')
+    index_parser.add_argument('--scale', type=int, default=16, help='largest number of times the rows of each index page are repeated')
+    record_parser = subparsers.add_parser('record', help='record a corpus of pages from the page cache')
+    record_parser.add_argument('--events', type=int, default=None, help='number of events, defaults to all events in the page cache')
+    record_parser.add_argument('--fighters', type=int, default=None, help='number of fighters, defaults to all fighters in the page cache')
+    replay_parser = subparsers.add_parser('replay', help='parse pages of the corpus with the parse functions, without the network')
+    replay_parser.add_argument('--pages', type=int, default=None, help='number of pages of each type, defaults to all pages in the corpus')
+    replay_parser.add_argument('--save', default=None, help='json file to save milliseconds per page of each function to')
+    replay_parser.add_argument('--compare', default=None, help='json file of saved milliseconds per page to compare with')
+    replay_parser.add_argument('--tolerance', type=float, default=1.25, help='ratio to saved milliseconds per page above which a function is slower')
+    serve_parser = subparsers.add_parser('serve', help='serve the corpus from a mock server of ufcstats.com')
+    serve_parser.add_argument('--port', type=int, default=8080, help='port of the mock server')
+    backfill_parser = subparsers.add_parser('backfill', help='backfill the corpus end to end through a mock server of ufcstats.com')
+    backfill_parser.add_argument('--workers', type=int, default=config['parse_workers'], help='number of parser processes, 0 parses in the main process')
+    backfill_parser.add_argument('--requests-per-second', type=float, default=1000.0, help='rate limit of the fetch engine')
+    for mock_server_parser in [serve_parser, backfill_parser]:
+        mock_server_parser.add_argument('--latency', type=float, default=0.0, help='mean seconds each response of the mock server waits')
+        mock_server_parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests answered with an error')
+        mock_server_parser.add_argument('--error-status', type=int, default=503, help='status of injected errors')
+    args = parser.parse_args()
+
+    if args.benchmark == 'assembly':
+        benchmark_assembly(args.fights)
+    if args.benchmark == 'normalise':
+        benchmark_normalise(args.fights)
+    if args.benchmark == 'parsers':
+        sys.exit(0 if benchmark_parsers(args.pages, args.fixtures) else 1)
+    if args.benchmark == 'index':
+        sys.exit(0 if benchmark_index(args.scale) else 1)
+    if args.benchmark == 'record':
+        sys.exit(0 if record_corpus(args.events, args.fighters) else 1)
+    if args.benchmark == 'replay':
+        sys.exit(0 if benchmark_replay(args.pages, args.save, args.compare, args.tolerance) else 1)
+    if args.benchmark == 'serve':
+        serve_corpus(args.port, args.latency, args.error_rate, args.error_status)
+    if args.benchmark == 'backfill':
+        sys.exit(0 if benchmark_backfill(args.latency, args.error_rate, args.error_status, args.workers, args.requests_per_second) else 1)
@@ -0,0 +1,248 @@
+'''
+Overview
+
+career stats of each fighter, a table of totals kept next to the parsed tables
+one row per fighter with fights, results by outcome and method, rounds and the totals of fight stats
+e.g. FIGHTER, URL, FIGHTS, WINS, ..., CAREER SIG.STR. LANDED, CAREER SIG.STR. ATTEMPTED, ..., CAREER SIG.STR. %
+
+career stats are computed from fight results, fight stats and fighter tale of the tape with groupbys over whole columns
+results are split into one row for each fighter of a fight, e.g. 'W/L' of 'A vs. B' gives A a win and B a loss
+fight stats are normalised into numbers and summed by fighter
+
+the table is updated incrementally
+only fighters of fights that are added, changed or removed, and fighters whose tale of the tape is added, are computed again
+the rows of other fighters are kept as they are
+
+'''
+
+# imports
+from typing import Dict, Iterable, List, Set
+import numpy as np
+import pandas as pd
+
+# import library and storage backends
+import scrape_ufc_stats_library as LIB
+import scrape_ufc_stats_storage as STORE
+
+
+
+# columns of counts of fights by outcome and method
+outcome_column_names = ['FIGHTS', 'WINS', 'LOSSES', 'DRAWS', 'NO CONTESTS']
+method_column_names = ['KO/TKO WINS', 'SUBMISSION WINS', 'DECISION WINS', 'OTHER WINS']
+
+# outcome of a fighter in fight results to column of counts
+outcome_columns = {'W': 'WINS', 'L': 'LOSSES', 'D': 'DRAWS', 'NC': 'NO CONTESTS'}
+
+# prefix of columns of totals of fight stats
+career_prefix = 'CAREER '
+
+
+
+# get column types of career stats
+def get_career_column_types(normalised_fight_stats_columns: Dict[str, List[str]]) -> Dict[str, str]:
+    '''
+    get the name and type of each column of numbers of career stats
+    counts and totals are int32, as totals of a career can be larger than int16, percentages are float32
+
+    arguments:
+    normalised_fight_stats_columns (dict): lists of fight stats columns by type, landed_attempted, percentage, time and count
+
+    returns:
+    a dict of column name to type
+    '''
+    column_types = {column: 'Int32' for column in outcome_column_names + method_column_names + ['ROUNDS']}
+    for column, column_type in LIB.get_normalised_fight_stats_column_types(normalised_fight_stats_columns).items():
+        column_types[career_prefix+column] = 'float32' if column_type.startswith('float') else 'Int32'
+
+    # return
+    return column_types
+
+
+
+# split bouts into fighters
+def split_bouts(bouts: pd.Series) -> pd.DataFrame:
+    '''
+    split bouts into their two fighters, e.g. 'A vs. B' into A and B
+
+    arguments:
+    bouts (series): series of bouts
+
+    returns:
+    a df with a column for the first and the second fighter, 0 and 1
+    '''
+    fighters = bouts.astype('string').str.split(' vs. ', n=1, expand=True).reindex(columns=[0, 1]).astype('string')
+
+    # return
+    return fighters.apply(lambda column: column.str.strip())
+
+
+
+# split fight results by fighter
+def get_fighter_results(fight_results_df: pd.DataFrame) -> pd.DataFrame:
+    '''
+    split each fight of fight results into a row for each fighter
+    bouts are split on ' vs. ' and outcomes on '/', e.g. 'A vs. B' and 'W/L' give A a W and B an L
+    methods are grouped into KO/TKO, SUBMISSION, DECISION and OTHER
+
+    arguments:
+    fight_results_df (df): df of fight results
+
+    returns:
+    a df with FIGHTER, OUTCOME and METHOD columns, two rows for each fight
+    '''
+    fighters = split_bouts(fight_results_df['BOUT'])
+    outcomes = fight_results_df['OUTCOME'].astype('string').str.strip().str.split('/', n=1, expand=True).reindex(columns=[0, 1]).astype('string')
+
+    # group methods, e.g. 'Decision - Split ' is DECISION
+    methods = fight_results_df['METHOD'].astype('string').str.strip().fillna('')
+    method_groups = np.select(
+        [methods.str.contains('KO'), methods.str.startswith('Submission'), methods.str.startswith('Decision')],
+        ['KO/TKO', 'SUBMISSION', 'DECISION'],
+        'OTHER'
+    )
+
+    # one row for the first and one for the second fighter of each fight
+    fighter_results_df = pd.concat([
+        pd.DataFrame({'FIGHTER': fighters[i], 'OUTCOME': outcomes[i], 'METHOD': method_groups})
+        for i in [0, 1]
+    ], ignore_index=True)
+
+    # return
+    return fighter_results_df[fighter_results_df['FIGHTER'].notna()]
+
+
+
+# get fighters of fights
+def get_fight_fighters(fight_results_df: pd.DataFrame = None, fight_stats_df: pd.DataFrame = None) -> Set[str]:
+    '''
+    get the fighters of the fights of fight results and fight stats, to find whose career stats change
+
+    arguments:
+    fight_results_df (df): df of fight results, only the BOUT column is used
+    fight_stats_df (df): df of fight stats
+
+    returns:
+    a set of fighters
+    '''
+    fighters = set()
+    if fight_results_df is not None and len(fight_results_df):
+        fighters.update(split_bouts(fight_results_df['BOUT']).stack().dropna())
+    if fight_stats_df is not None and len(fight_stats_df):
+        fighters.update(fight_stats_df['FIGHTER'].dropna().astype(str).str.strip())
+
+    # return
+    return fighters
+
+
+
+# compute career stats
+def get_career_stats(fight_results_df: pd.DataFrame, fight_stats_df: pd.DataFrame, fighter_tott_df: pd.DataFrame, normalised_fight_stats_columns: Dict[str, List[str]], fighters: Iterable[str] = None) -> pd.DataFrame:
+    '''
+    compute the career stats of fighters with groupbys, not a loop over fighters
+    every fight of a fighter in fight results counts, fight stats are summed over all rounds of the fighter
+    URL is the url of the fighter in tale of the tape, missing if the name is not in tale of the tape or belongs to more than one fighter
+
+    arguments:
+    fight_results_df (df): df of fight results, with all fights of the fighters
+    fight_stats_df (df): df of fight stats, normalised or not, with all fights of the fighters
+    fighter_tott_df (df): df of fighter tale of the tape with FIGHTER and URL columns
+    normalised_fight_stats_columns (dict): lists of fight stats columns by type, landed_attempted, percentage, time and count
+    fighters (list): fighters to compute, defaults to all fighters of fight results and fight stats
+
+    returns:
+    a df of career stats, one row for each fighter with fights, in order of fighter
+    '''
+    column_types = get_career_column_types(normalised_fight_stats_columns)
+
+    # results by fighter
+    fighter_results_df = get_fighter_results(fight_results_df)
+    fight_stats_df = fight_stats_df[fight_stats_df['FIGHTER'].notna()].assign(FIGHTER=fight_stats_df['FIGHTER'].astype(str).str.strip())
+    if fighters is not None:
+        fighters = set(fighters)
+        fighter_results_df = fighter_results_df[fighter_results_df['FIGHTER'].isin(fighters)]
+        fight_stats_df = fight_stats_df[fight_stats_df['FIGHTER'].isin(fighters)]
+
+    # count fights by outcome, and wins by method
+    outcome_counts_df = pd.crosstab(fighter_results_df['FIGHTER'], fighter_results_df['OUTCOME'].map(outcome_columns))
+    outcome_counts_df['FIGHTS'] = fighter_results_df.groupby('FIGHTER').size()
+    wins_df = fighter_results_df[fighter_results_df['OUTCOME'] == 'W']
+    method_counts_df = pd.crosstab(wins_df['FIGHTER'], wins_df['METHOD'] + ' WINS')
+
+    # sum stats of rounds by fighter
+    normalised_fight_stats_df = LIB.normalise_fight_stats(fight_stats_df, normalised_fight_stats_columns)
+    stats_column_names = [column for column in normalised_fight_stats_df.columns if career_prefix+column in column_types and not column_types[career_prefix+column].startswith('float')]
+    # stats are summed as int64, as totals of a career can be larger than the int16 of a round
+    grouped_stats = normalised_fight_stats_df[stats_column_names].astype('Int64').groupby(normalised_fight_stats_df['FIGHTER'])
+    stats_totals_df = grouped_stats.sum().add_prefix(career_prefix)
+    stats_totals_df['ROUNDS'] = normalised_fight_stats_df.groupby('FIGHTER')['ROUND'].count()
+
+    # combine counts and totals of fighters with fights or stats
+    career_df = pd.concat([outcome_counts_df, method_counts_df, stats_totals_df], axis=1)
+    career_df = career_df.reindex(columns=outcome_column_names + method_column_names + ['ROUNDS'] + list(stats_totals_df.columns.drop('ROUNDS')))
+    career_df = career_df.fillna(0)
+
+    # career percentages from totals of landed and attempted, e.g. SIG.STR. % from SIG.STR. LANDED and SIG.STR. ATTEMPTED
+    for column in normalised_fight_stats_columns['percentage']:
+        landed_attempted = column.removesuffix(' %')
+        if landed_attempted in normalised_fight_stats_columns['landed_attempted']:
+            landed = career_df[career_prefix+landed_attempted+' LANDED'].astype('float64')
+            attempted = career_df[career_prefix+landed_attempted+' ATTEMPTED'].astype('float64')
+            career_df[career_prefix+column] = (landed / attempted.where(attempted > 0)).round(4)
+
+    # add url of fighters whose name belongs to one fighter
+    fighter_urls = fighter_tott_df.drop_duplicates('FIGHTER', keep=False).set_index('FIGHTER')['URL']
+    career_df.insert(0, 'URL', career_df.index.map(fighter_urls))
+    career_df = career_df.rename_axis('FIGHTER').reset_index().sort_values('FIGHTER', kind='stable', ignore_index=True)
+
+    # return
+    return career_df.astype({column: column_type for column, column_type in column_types.items() if column in career_df.columns})
+
+
+
+# update career stats table
+def update_career_stats(config: dict, fighters: Iterable[str] = None) -> pd.DataFrame:
+    '''
+    compute career stats again for fighters and write the career stats table
+    fight stats of the fighters are looked up by fighter, which reads only their rows with the sqlite backend
+    rows of other fighters are kept, fighters with no fights left are removed
+    the whole table is computed if fighters is none or the table does not exist yet
+    the table is not written if there are no fighters to compute again
+
+    arguments:
+    config (dict): config with file names of tables and normalised_fight_stats_columns
+    fighters (list): fighters whose fights or tale of the tape changed
+
+    returns:
+    a df of the career stats that were computed
+    '''
+    # read existing career stats
+    try:
+        parsed_career_df = STORE.read_table(config['fighter_career_file_name']) if fighters is not None else None
+    except FileNotFoundError:
+        parsed_career_df = None
+    # no fighters to compute again
+    if parsed_career_df is not None and not fighters:
+        return parsed_career_df.iloc[:0]
+
+    # read fights and tale of the tape of fighters
+    fight_results_df = STORE.read_table(config['fight_results_file_name'])
+    if parsed_career_df is None:
+        fight_stats_df = STORE.read_table(config['fight_stats_file_name'])
+        fighter_tott_df = STORE.read_table(config['fighter_tott_file_name'], columns=['FIGHTER', 'URL'])
+    else:
+        fighters = set(fighters)
+        fight_stats_df = STORE.lookup_table(config['fight_stats_file_name'], 'FIGHTER', fighters)
+        fighter_tott_df = STORE.lookup_table(config['fighter_tott_file_name'], 'FIGHTER', fighters, columns=['FIGHTER', 'URL'])
+    career_df = get_career_stats(fight_results_df, fight_stats_df, fighter_tott_df, config['normalised_fight_stats_columns'], None if parsed_career_df is None else fighters)
+
+    # replace rows of fighters computed again
+    if parsed_career_df is not None:
+        # rows read back from the table are converted to the types of computed rows, e.g. float32 percentages read from csv as float64
+        updated_career_df = pd.concat([parsed_career_df[~parsed_career_df['FIGHTER'].isin(fighters)].astype(career_df.dtypes.to_dict()), career_df], ignore_index=True)
+        updated_career_df = updated_career_df.sort_values('FIGHTER', kind='stable', ignore_index=True)
+    else:
+        updated_career_df = career_df
+    STORE.write_table(updated_career_df, config['fighter_career_file_name'])
+
+    # return
+    return career_df
@@ -0,0 +1,316 @@
+'''
+Overview
+
+change log of the rows each run inserts, updates or deletes in each table
+downstream consumers read the changes of the runs after the last run they synced, instead of reading and comparing the whole tables
+
+changes are recorded by scrape_ufc_stats_storage each time a table is written, by comparing the new rows with the rows they replace
+a whole table written with write_table() replaces all of its rows
+rows appended with append_table() replace the rows of replaced events and the rows with the same key
+rows are matched by their key, the ids of ufcstats.com of the row, e.g. FIGHT_ID of fight results, see STORE.get_change_key_df()
+a row whose key is only in the new rows is inserted, only in the replaced rows is deleted, and in both with other values is updated
+values are compared as text, or as numbers when both are numbers, so a row read back from a csv file, e.g. with 0.0 for '0.00', has not changed
+
+changes are written as soon as their table is written, so a run that fails part way keeps the changes of the tables it wrote
+each run gets a run number one higher than the last run in the change log when it first changes a row
+{"run": 42, "written_at": ..., "table": "ufc_fight_results", "operation": "update", "key": {"FIGHT_ID": "de1a3734be60e6a1"}, "row": {...}}
+the row of an insert or update is the new row, the row of a delete is the deleted row
+
+formats
+jsonl - one json line per changed row appended to the file with the extension .jsonl, e.g. ufc_changes.jsonl
+parquet - one part file per write of a table in the directory with the extension .parquet, e.g. ufc_changes.parquet/run-000042-0001.parquet
+          key and row are json text, as the tables have different columns
+
+recording is off until configure() sets a change log, so tables can be written without one, e.g. by conversions of scrape_ufc_stats_storage.py
+
+'''
+
+# imports
+from typing import Dict, List
+import json
+import math
+import os
+import re
+import threading
+import time
+import numpy as np
+import pandas as pd
+
+# import metrics
+import scrape_ufc_stats_metrics as METRICS
+
+
+
+# change log settings, update with configure()
+# change_log_file_name is the file name of the change log without its extension, empty does not record changes
+# change_log_format is one of change_log_formats
+settings = {
+    'change_log_file_name': '',
+    'change_log_format': 'jsonl',
+}
+
+# available formats of change logs
+change_log_formats = ['jsonl', 'parquet']
+
+# run number and number of parts written of the current run, the run number is taken when the run first changes a row
+_run = {'run': None, 'parts': 0}
+_changes_lock = threading.Lock()
+
+
+
+# configure change log settings
+def configure(change_log_file_name: str = None, change_log_format: str = None) -> None:
+    '''
+    update change log settings
+
+    arguments:
+    change_log_file_name (str): file name of the change log without its extension, empty does not record changes
+    change_log_format (str): one of jsonl or parquet
+
+    returns:
+    none
+    '''
+    if change_log_file_name is not None:
+        settings['change_log_file_name'] = change_log_file_name
+    if change_log_format is not None:
+        if change_log_format not in change_log_formats:
+            raise ValueError(f'change_log_format must be one of {change_log_formats}, not {change_log_format}')
+        settings['change_log_format'] = change_log_format
+
+
+
+# start run
+def start_run() -> None:
+    '''
+    start a new run, whose changes get the next run number, e.g. for each poll of a watch in one process
+
+    arguments:
+    none
+
+    returns:
+    none
+    '''
+    with _changes_lock:
+        _run.update(run=None, parts=0)
+
+
+
+# get path of change log
+def get_change_log_path() -> str:
+    '''
+    get the path of the change log, its file name with the extension of its format
+
+    arguments:
+    none
+
+    returns:
+    path of change log
+    '''
+    # return
+    return f'{settings["change_log_file_name"]}.{settings["change_log_format"]}'
+
+
+
+# get last run of change log
+def get_last_run(path: str) -> int:
+    '''
+    get the number of the last run in the change log
+    the last line of a jsonl change log is read from the end of the file, the part files of a parquet change log are named by run
+
+    arguments:
+    path (str): path of change log
+
+    returns:
+    number of last run, 0 if there is no change log yet
+    '''
+    if not os.path.exists(path):
+        return 0
+
+    # parquet, the highest run of the names of part files
+    if os.path.isdir(path):
+        runs = [int(match.group(1)) for match in map(re.compile(r'run-(\d+)-\d+\.parquet$').match, os.listdir(path)) if match]
+        return max(runs, default=0)
+
+    # jsonl, read blocks from the end of the file until the last line is complete
+    with open(path, 'rb') as file:
+        file.seek(0, os.SEEK_END)
+        end = file.tell()
+        tail = b''
+        while end and tail.rstrip(b'\n').count(b'\n') == 0:
+            start = max(0, end - 65536)
+            file.seek(start)
+            tail = file.read(end - start) + tail
+            end = start
+    lines = tail.rstrip(b'\n').split(b'\n')
+
+    # return
+    return json.loads(lines[-1])['run'] if lines[-1] else 0
+
+
+
+# normalise value of row
+def normalise_value(value):
+    '''
+    convert a value of a df to a plain json value, missing values and empty text to none and whole floats to integers
+    so the same row has the same values whether it was parsed or read back from a table, where empty text is read as missing
+
+    arguments:
+    value: value of a cell of a df
+
+    returns:
+    a value that json can write
+    '''
+    if hasattr(value, 'item') and not isinstance(value, str):
+        value = value.item()
+    if value is None or value is pd.NA or value is pd.NaT or value == '':
+        return None
+    if isinstance(value, float):
+        if math.isnan(value):
+            return None
+        if value.is_integer():
+            return int(value)
+
+    # return
+    return value
+
+
+
+# check values are the same
+def is_same_value(value, other_value) -> bool:
+    '''
+    check two values of a column are the same, as text or as numbers when both are numbers
+    e.g. the text 0.00 of a parsed page is the number 0 read back from a csv file
+
+    arguments:
+    value: normalised value of new row
+    other_value: normalised value of replaced row
+
+    returns:
+    true if the values are the same
+    '''
+    if str(value) == str(other_value):
+        return True
+    try:
+        return float(value) == float(other_value)
+    except (TypeError, ValueError):
+        return False
+
+
+
+# get rows of df
+def get_rows(df: pd.DataFrame) -> List[Dict[str, object]]:
+    '''
+    get the rows of a df as dicts of column to plain json value
+    float32 columns, e.g. of career stats, are converted by their shortest text, so 0.3923 is not 0.392300009727478
+
+    arguments:
+    df (df): df of rows
+
+    returns:
+    a list of dicts, one for each row
+    '''
+    float32_columns = df.select_dtypes(include=[np.float16, np.float32]).columns
+    if len(float32_columns):
+        df = df.assign(**{column: df[column].astype(str).astype('float64') for column in float32_columns})
+
+    # return
+    return [{column: normalise_value(value) for column, value in row.items()} for row in df.to_dict('records')]
+
+
+
+# get keys of rows
+def get_keys(key_df: pd.DataFrame) -> List[tuple]:
+    '''
+    get the key of each row as a tuple of its key values and the number of rows with the same key values before it
+    so rows with the same key values, e.g. upcoming fights of fight history without a fight url, are matched in order
+
+    arguments:
+    key_df (df): key columns of rows, from STORE.get_change_key_df()
+
+    returns:
+    a list of tuples, one for each row
+    '''
+    counts = {}
+    keys = []
+    for values in key_df.astype('string').astype(object).where(key_df.notna(), None).itertuples(index=False, name=None):
+        counts[values] = counts.get(values, -1) + 1
+        keys.append((values, counts[values]))
+
+    # return
+    return keys
+
+
+
+# record changes of table
+def record_changes(table_name: str, replaced_key_df: pd.DataFrame, replaced_df: pd.DataFrame, key_df: pd.DataFrame, df: pd.DataFrame) -> int:
+    '''
+    compare the new rows of a table with the rows they replace and write the rows that are inserted, updated or deleted to the change log
+    values of the columns of the new rows are compared, so a column that is no longer written does not update every row
+
+    arguments:
+    table_name (str): name of table, e.g. ufc_fight_results
+    replaced_key_df (df): key columns of the replaced rows
+    replaced_df (df): replaced rows
+    key_df (df): key columns of the new rows
+    df (df): new rows
+
+    returns:
+    number of changed rows
+    '''
+    if not settings['change_log_file_name']:
+        return 0
+
+    # match rows by key
+    key_columns = list(key_df.columns)
+    replaced_rows = dict(zip(get_keys(replaced_key_df), get_rows(replaced_df)))
+    rows = dict(zip(get_keys(key_df), get_rows(df)))
+
+    # compare rows
+    changes = []
+    for key, row in replaced_rows.items():
+        if key not in rows:
+            changes.append(('delete', key, row))
+    for key, row in rows.items():
+        replaced_row = replaced_rows.get(key)
+        if replaced_row is None:
+            changes.append(('insert', key, row))
+        elif not all(is_same_value(value, replaced_row.get(column)) for column, value in row.items()):
+            changes.append(('update', key, row))
+    if not changes:
+        return 0
+
+    # write changes under the number of the run
+    path = get_change_log_path()
+    with _changes_lock:
+        if _run['run'] is None:
+            _run['run'] = get_last_run(path) + 1
+        _run['parts'] += 1
+        records = [
+            {'run': _run['run'], 'written_at': time.time(), 'table': table_name, 'operation': operation, 'key': dict(zip(key_columns, key[0])), 'row': row}
+            for operation, key, row in changes
+        ]
+
+        # json lines
+        if settings['change_log_format'] == 'jsonl':
+            with open(path, 'a') as file:
+                for record in records:
+                    file.write(json.dumps(record, default=str) + '\n')
+
+        # parquet, one part file for each write of a table, written under a temporary name and then renamed
+        else:
+            os.makedirs(path, exist_ok=True)
+            part_file_name = os.path.join(path, f'run-{_run["run"]:06d}-{_run["parts"]:04d}.parquet')
+            changes_df = pd.DataFrame(records)
+            changes_df['key'] = [json.dumps(key, default=str) for key in changes_df['key']]
+            changes_df['row'] = [json.dumps(row, default=str) for row in changes_df['row']]
+            changes_df.to_parquet(part_file_name + '.tmp', index=False)
+            os.replace(part_file_name + '.tmp', part_file_name)
+
+    # count changed rows by table and operation
+    for operation in ['insert', 'update', 'delete']:
+        number_of_rows = sum(change[0] == operation for change in changes)
+        if number_of_rows:
+            METRICS.increment('changed_rows_total', number_of_rows, table=table_name, operation=operation)
+
+    # return
+    return len(changes)
@@ -0,0 +1,1131 @@
+'''
+Overview
+
+fetch engine for scraping ufc stats
+all requests share one keep-alive connection pool instead of opening a new connection per page
+batches of urls are fetched concurrently by a bounded pool of threads and returned in input order
+requests to each host are spaced out by a token bucket that respects a politeness rate
+the rate of each host adapts, it backs off when the host throttles or slows down and recovers as responses come back fast
+
+each request has a timeout, and timeouts, connection errors and 429 / 5xx responses are retried with jittered exponential backoff
+a url that still fails is quarantined, it is skipped by iter_pages(quarantine=True) and kept in a retry queue
+so a single bad page never stalls the run or is parsed as if it were a page of stats
+
+raw html of every fetched page can be kept in a local page cache
+the cache is a sqlite file of zlib compressed pages, stored once per unique content and keyed by url
+each class of url has its own time to live, expired pages are revalidated with etag / last-modified headers
+so that pages can be parsed again after a parser or config change without using the network
+
+the top of a page or a fingerprint from the headers of its response can be read without downloading the page
+so a quick check can find out if anything changed before a run
+
+'''
+
+# imports
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+import hashlib
+import random
+import sqlite3
+import threading
+import time
+import zlib
+import requests
+from requests.adapters import HTTPAdapter
+
+# import metrics
+import scrape_ufc_stats_metrics as METRICS
+
+
+
+# fetch settings, update with configure()
+# max_workers is the number of pages fetched at the same time
+# requests_per_second is the politeness rate for each host
+# page_cache_file_name is the sqlite file of cached pages, None disables the cache
+# page_cache_ttls maps a part of a url to seconds before its cached page is revalidated, -1 never expires
+# offline serves every page from the cache and never uses the network
+# request_timeout is the seconds to wait for a host to connect or send data
+# max_retries is the number of times a failed request is retried, with a backoff of backoff_seconds doubled on each retry
+# min_requests_per_second is the lowest rate a host is slowed down to when it throttles
+settings = {
+    'max_workers': 8,
+    'requests_per_second': 10.0,
+    'page_cache_file_name': None,
+    'page_cache_ttls': {},
+    'offline': False,
+    'request_timeout': 30.0,
+    'max_retries': 4,
+    'backoff_seconds': 1.0,
+    'min_requests_per_second': 1.0,
+}
+
+# status codes of responses that are retried, and of those that mean the host is throttling
+retry_status_codes = {429, 500, 502, 503, 504}
+throttle_status_codes = {429, 503}
+# longest wait between retries in seconds
+max_backoff_seconds = 60.0
+
+# shared session and the rate limit of each host
+_session = None
+_session_lock = threading.Lock()
+_host_rate_limits: Dict[str, 'TokenBucket'] = {}
+_host_lock = threading.Lock()
+
+# retry queue of quarantined urls and the reason each failed
+_quarantined_urls: Dict[str, str] = {}
+_quarantine_lock = threading.Lock()
+
+# shared connection to page cache
+_cache = None
+_cache_lock = threading.Lock()
+
+
+
+# configure fetch settings
+def configure(max_workers: int = None, requests_per_second: float = None, page_cache_file_name: str = None, page_cache_ttls: Dict[str, float] = None, offline: bool = None,
+              request_timeout: float = None, max_retries: int = None, backoff_seconds: float = None, min_requests_per_second: float = None) -> None:
+    '''
+    update fetch settings
+    the shared session is recreated so that the connection pool matches max_workers
+    the rate limits of hosts are recreated so that they match requests_per_second
+    the page cache is reopened so that it matches page_cache_file_name
+
+    arguments:
+    max_workers (int): number of pages fetched at the same time
+    requests_per_second (float): maximum number of requests per second to each host
+    page_cache_file_name (str): sqlite file of cached pages, an empty string disables the cache
+    page_cache_ttls (dict): part of url to seconds before its cached page is revalidated, -1 never expires
+    offline (bool): serve every page from the cache and never use the network
+    request_timeout (float): seconds to wait for a host to connect or send data
+    max_retries (int): number of times a failed request is retried
+    backoff_seconds (float): wait before the first retry, doubled on each retry
+    min_requests_per_second (float): lowest rate a host is slowed down to when it throttles
+
+    returns:
+    none
+    '''
+    global _session, _cache
+
+    # update settings that have been given
+    if max_workers is not None:
+        settings['max_workers'] = max_workers
+    if requests_per_second is not None:
+        settings['requests_per_second'] = requests_per_second
+    if page_cache_file_name is not None:
+        settings['page_cache_file_name'] = page_cache_file_name or None
+    if page_cache_ttls is not None:
+        settings['page_cache_ttls'] = page_cache_ttls
+    if offline is not None:
+        settings['offline'] = offline
+    if request_timeout is not None:
+        settings['request_timeout'] = request_timeout
+    if max_retries is not None:
+        settings['max_retries'] = max_retries
+    if backoff_seconds is not None:
+        settings['backoff_seconds'] = backoff_seconds
+    if min_requests_per_second is not None:
+        settings['min_requests_per_second'] = min_requests_per_second
+
+    # drop the shared session so it is recreated with the new pool size
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+
+    # drop the rate limits of hosts so they are recreated with the new rates
+    with _host_lock:
+        _host_rate_limits.clear()
+
+    # drop the page cache so it is reopened with the new file name
+    with _cache_lock:
+        if _cache is not None:
+            _cache.close()
+        _cache = None
+
+
+
+# get shared session
+def get_session() -> requests.Session:
+    '''
+    get the shared session used for all requests
+    the session keeps connections alive and reuses them between requests
+    the connection pool is sized to allow one connection per worker
+
+    arguments:
+    none
+
+    returns:
+    a requests session
+    '''
+    global _session
+
+    with _session_lock:
+        if _session is None:
+            # create session with a connection pool large enough for all workers
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=settings['max_workers'])
+            _session = requests.Session()
+            _session.mount('http://', adapter)
+            _session.mount('https://', adapter)
+
+    # return
+    return _session
+
+
+
+# error of page that could not be fetched
+class FetchError(Exception):
+    '''
+    raised when a page could not be fetched after all retries, or the host replied with a status code that is not retried
+
+    arguments:
+    url (str): url of page
+    reason (str): reason of the last failure, e.g. 'status 503' or a timeout
+    '''
+
+    def __init__(self, url: str, reason: str):
+        super().__init__(f'{url} could not be fetched: {reason}')
+        self.url = url
+        self.reason = reason
+
+
+
+# adaptive rate limit of a host
+class TokenBucket:
+    '''
+    token bucket rate limit of one host that adapts to how the host responds
+    tokens are added at rate per second up to one token, and each request takes a token or waits for one
+    the rate is halved when the host throttles, a 429 or 503 response or a timeout, and requests wait for any retry-after of the host
+    the rate is cut by a quarter when the average latency rises well above the fastest latency seen, as the host is slowing down
+    otherwise each response raises the rate by a small step back towards max_rate
+
+    arguments:
+    max_rate (float): politeness rate, the highest number of requests per second
+    min_rate (float): lowest number of requests per second
+    '''
+
+    # average latency above this many times the fastest latency, and above slow_latency seconds, slows down requests
+    slow_latency_factor = 4.0
+    slow_latency = 1.0
+
+    def __init__(self, max_rate: float, min_rate: float):
+        self.max_rate = max_rate
+        self.min_rate = min(min_rate, max_rate)
+        self.rate = max_rate
+        self.tokens = 1.0
+        self.updated_at = time.monotonic()
+        self.average_latency = None
+        self.min_latency = None
+        self.lock = threading.Lock()
+
+    # wait for token
+    def acquire(self) -> None:
+        '''
+        take a token, waiting until one is available
+        tokens can go below zero, each waiting request holds its place in line
+
+        arguments:
+        none
+
+        returns:
+        none
+        '''
+        with self.lock:
+            now = time.monotonic()
+            # add tokens for the time since the last update
+            self.tokens = min(1.0, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+
+        # sleep until token is available
+        if wait > 0:
+            time.sleep(wait)
+
+    # adapt rate to response
+    def update(self, latency: float, throttled: bool = False, retry_after: float = None) -> None:
+        '''
+        adapt the rate to the latency of a response and whether the host throttled it
+
+        arguments:
+        latency (float): seconds from request to response
+        throttled (bool): the host replied 429 or 503, or did not reply in time
+        retry_after (float): seconds the host asked to wait before the next request
+
+        returns:
+        none
+        '''
+        with self.lock:
+            # keep a moving average and the fastest latency
+            self.average_latency = latency if self.average_latency is None else 0.8 * self.average_latency + 0.2 * latency
+            self.min_latency = latency if self.min_latency is None else min(self.min_latency, latency)
+            slow = self.average_latency > max(self.slow_latency, self.slow_latency_factor * self.min_latency)
+
+            if throttled:
+                self.rate = max(self.min_rate, self.rate / 2)
+            elif slow:
+                self.rate = max(self.min_rate, self.rate * 0.75)
+            else:
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+            # hold back all requests to the host for retry_after seconds
+            if retry_after:
+                self.tokens = min(self.tokens, -retry_after * self.rate)
+
+
+
+# get rate limit of host
+def get_rate_limit(url: str) -> Optional[TokenBucket]:
+    '''
+    get the shared rate limit of the host of a url, creating it if needed
+
+    arguments:
+    url (str): url about to be requested
+
+    returns:
+    a token bucket, or none if requests_per_second is zero or less, which disables the politeness wait
+    '''
+    # a rate of zero or less disables the politeness wait
+    if not settings['requests_per_second'] or settings['requests_per_second'] <= 0:
+        return None
+
+    # get host of url
+    host = urlsplit(url).netloc
+    with _host_lock:
+        if host not in _host_rate_limits:
+            _host_rate_limits[host] = TokenBucket(settings['requests_per_second'], settings['min_requests_per_second'])
+
+    # return
+    return _host_rate_limits[host]
+
+
+
+# get seconds of retry-after header
+def get_retry_after(response: requests.Response) -> Optional[float]:
+    '''
+    get the seconds to wait from the retry-after header of a response
+    the header is either a number of seconds or an http date
+
+    arguments:
+    response (response): response of host
+
+    returns:
+    seconds to wait, or none if there is no valid header
+    '''
+    retry_after = response.headers.get('Retry-After')
+    if not retry_after:
+        return None
+
+    # header is a number of seconds
+    if retry_after.strip().isdigit():
+        return float(retry_after)
+
+    # header is an http date
+    try:
+        return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+
+# get wait before retry
+def get_backoff(attempt: int, retry_after: float = None) -> float:
+    '''
+    get seconds to wait before retrying a request, exponential in the number of attempts with random jitter
+    the jitter spreads out retries of requests that failed at the same time
+    e.g. with backoff_seconds 1, the waits are 0.5 - 1, 1 - 2, 2 - 4, ... seconds
+
+    arguments:
+    attempt (int): number of attempts made before this one, starting from 0
+    retry_after (float): seconds the host asked to wait, the wait is at least this long
+
+    returns:
+    seconds to wait
+    '''
+    backoff = min(max_backoff_seconds, settings['backoff_seconds'] * 2 ** attempt)
+
+    # return
+    return max(backoff * random.uniform(0.5, 1), retry_after or 0)
+
+
+
+# request page with retries
+def request_page(url: str, headers: Dict[str, str] = None, stream: bool = False) -> requests.Response:
+    '''
+    request a page with the shared session, waiting for the rate limit of its host
+    timeouts, connection errors, other request errors, e.g. a broken chunked response, and responses with retry_status_codes
+    are retried up to max_retries times with backoff
+    every response and timeout adapts the rate limit of the host
+
+    arguments:
+    url (str): url of page
+    headers (dict): headers of request
+    stream (bool): return once the headers are read, the content is read by iterating the response
+
+    returns:
+    a response with a status code that is not retried
+
+    raises:
+    FetchError if the page could not be fetched after all retries
+    '''
+    rate_limit = get_rate_limit(url)
+    for attempt in range(settings['max_retries'] + 1):
+        # wait for rate limit of host
+        if rate_limit:
+            rate_limit.acquire()
+
+        started_at = time.monotonic()
+        retry_after = None
+        try:
+            response = get_session().get(url, headers=headers, timeout=settings['request_timeout'], stream=stream)
+        except requests.RequestException as error:
+            # a timeout means the host is overloaded, connection and other request errors are retried without slowing down
+            reason = f'{type(error).__name__}: {error}'
+            METRICS.observe('fetch_request_seconds', time.monotonic() - started_at, status=type(error).__name__)
+            if rate_limit:
+                rate_limit.update(time.monotonic() - started_at, throttled=isinstance(error, requests.Timeout))
+        else:
+            METRICS.observe('fetch_request_seconds', time.monotonic() - started_at, status=str(response.status_code))
+            # response is not retried
+            if response.status_code not in retry_status_codes:
+                if rate_limit:
+                    rate_limit.update(time.monotonic() - started_at)
+                return response
+            # response is retried, after any wait the host asked for
+            response.close()
+            reason = f'status {response.status_code}'
+            retry_after = get_retry_after(response)
+            if rate_limit:
+                rate_limit.update(time.monotonic() - started_at, response.status_code in throttle_status_codes, retry_after)
+
+        # wait before retrying
+        if attempt < settings['max_retries']:
+            time.sleep(get_backoff(attempt, retry_after))
+
+    raise FetchError(url, f'{reason} after {settings["max_retries"] + 1} attempts')
+
+
+
+# quarantine url
+def quarantine_url(url: str, reason: str) -> None:
+    '''
+    add a url that could not be fetched to the retry queue
+
+    arguments:
+    url (str): url of page
+    reason (str): reason it could not be fetched
+
+    returns:
+    none
+    '''
+    with _quarantine_lock:
+        _quarantined_urls[url] = reason
+
+
+
+# list quarantined urls
+def list_quarantined_urls() -> Dict[str, str]:
+    '''
+    list urls in the retry queue, in the order they were quarantined
+
+    arguments:
+    none
+
+    returns:
+    a dict of url to the reason it could not be fetched
+    '''
+    with _quarantine_lock:
+        quarantined_urls = dict(_quarantined_urls)
+
+    # return
+    return quarantined_urls
+
+
+
+# release quarantined urls
+def release_quarantined_urls(urls: Iterable[str] = None) -> None:
+    '''
+    remove urls from the retry queue, e.g. before they are fetched again
+
+    arguments:
+    urls (list): urls to remove, all urls if none
+
+    returns:
+    none
+    '''
+    with _quarantine_lock:
+        if urls is None:
+            _quarantined_urls.clear()
+        for url in urls or []:
+            _quarantined_urls.pop(url, None)
+
+
+
+# get page cache
+def get_page_cache() -> Optional[sqlite3.Connection]:
+    '''
+    get the shared connection to the page cache, creating the tables if needed
+    pages holds the url, hash of content, validators and time fetched of each cached page
+    contents holds the compressed content of each unique page, keyed by its hash
+
+    arguments:
+    none
+
+    returns:
+    a sqlite connection, or none if the page cache is disabled
+    '''
+    global _cache
+
+    # page cache is disabled
+    if not settings['page_cache_file_name']:
+        return None
+
+    with _cache_lock:
+        if _cache is None:
+            # connection is shared between fetch threads and guarded by _cache_lock
+            _cache = sqlite3.connect(settings['page_cache_file_name'], check_same_thread=False)
+            _cache.execute('PRAGMA journal_mode=WAL')
+            _cache.execute('PRAGMA synchronous=NORMAL')
+            _cache.execute('CREATE TABLE IF NOT EXISTS pages (url TEXT PRIMARY KEY, hash TEXT NOT NULL, etag TEXT, last_modified TEXT, fetched_at REAL NOT NULL)')
+            _cache.execute('CREATE TABLE IF NOT EXISTS contents (hash TEXT PRIMARY KEY, content BLOB NOT NULL)')
+            _cache.commit()
+
+    # return
+    return _cache
+
+
+
+# get time to live of url
+def get_page_ttl(url: str) -> float:
+    '''
+    get seconds before the cached page of a url is revalidated
+    the first part of url in page_cache_ttls found in the url is used
+    e.g. 'fight-details' matches 'http://ufcstats.com/fight-details/de1a3734be60e6a1'
+    urls that match no part are always revalidated
+
+    arguments:
+    url (str): url of page
+
+    returns:
+    seconds before the cached page is revalidated, -1 if it never expires
+    '''
+    for url_part, ttl in settings['page_cache_ttls'].items():
+        if url_part in url:
+            return ttl
+
+    # return
+    return 0
+
+
+
+# read page from page cache
+def read_cached_page(url: str, compressed: bool = False) -> Optional[Tuple[bytes, Optional[str], Optional[str], float]]:
+    '''
+    read a page from the page cache
+
+    arguments:
+    url (str): url of page
+    compressed (bool): return the content compressed with zlib, as it is stored
+
+    returns:
+    a tuple of content, etag, last-modified and time fetched, or none if the page is not cached
+    '''
+    cache = get_page_cache()
+    if cache is None:
+        return None
+
+    with _cache_lock:
+        row = cache.execute(
+            'SELECT contents.content, pages.etag, pages.last_modified, pages.fetched_at FROM pages JOIN contents ON pages.hash = contents.hash WHERE pages.url = ?',
+            (url,)
+        ).fetchone()
+    if row is None:
+        return None
+
+    # return
+    return row[0] if compressed else zlib.decompress(row[0]), row[1], row[2], row[3]
+
+
+
+# write page to page cache
+def write_cached_page(url: str, content: bytes, etag: str = None, last_modified: str = None) -> None:
+    '''
+    write a page to the page cache
+    content is stored compressed and only once for each unique hash of content
+
+    arguments:
+    url (str): url of page
+    content (bytes): content of page
+    etag (str): etag header of response
+    last_modified (str): last-modified header of response
+
+    returns:
+    none
+    '''
+    cache = get_page_cache()
+    if cache is None:
+        return
+
+    # hash content as key
+    write_cached_content(url, hashlib.sha256(content).hexdigest(), zlib.compress(content), etag, last_modified)
+
+
+
+# write compressed page to page cache
+def write_cached_content(url: str, content_hash: str, compressed_content: bytes, etag: str = None, last_modified: str = None) -> None:
+    '''
+    write a page that is already hashed and compressed to the page cache, e.g. a page compressed while it was streamed
+
+    arguments:
+    url (str): url of page
+    content_hash (str): sha256 hex digest of content
+    compressed_content (bytes): content compressed with zlib
+    etag (str): etag header of response
+    last_modified (str): last-modified header of response
+
+    returns:
+    none
+    '''
+    cache = get_page_cache()
+    if cache is None:
+        return
+
+    with _cache_lock:
+        cache.execute('INSERT OR IGNORE INTO contents (hash, content) VALUES (?, ?)', (content_hash, compressed_content))
+        cache.execute(
+            'INSERT OR REPLACE INTO pages (url, hash, etag, last_modified, fetched_at) VALUES (?, ?, ?, ?, ?)',
+            (url, content_hash, etag, last_modified, time.time())
+        )
+        cache.commit()
+
+
+
+# mark page in page cache as fresh
+def touch_cached_page(url: str) -> None:
+    '''
+    reset time fetched of a cached page after the server confirms it has not changed
+
+    arguments:
+    url (str): url of page
+
+    returns:
+    none
+    '''
+    cache = get_page_cache()
+    if cache is None:
+        return
+
+    with _cache_lock:
+        cache.execute('UPDATE pages SET fetched_at = ? WHERE url = ?', (time.time(), url))
+        cache.commit()
+
+
+
+# mark pages in page cache as expired
+def expire_cached_pages(urls: Iterable[str]) -> None:
+    '''
+    mark cached pages as expired so they are revalidated with the server the next time they are requested
+    this also applies to pages whose time to live never expires, e.g. a fight whose result has changed
+
+    arguments:
+    urls (list): urls of pages
+
+    returns:
+    none
+    '''
+    cache = get_page_cache()
+    if cache is None:
+        return
+
+    with _cache_lock:
+        cache.executemany('UPDATE pages SET fetched_at = 0 WHERE url = ?', [(url,) for url in urls])
+        cache.commit()
+
+
+
+# list expired urls in page cache
+def list_expired_cached_urls(urls: Iterable[str]) -> List[str]:
+    '''
+    list the urls of cached pages that are still marked as expired by expire_cached_pages(), i.e. not fetched or revalidated since
+
+    arguments:
+    urls (list): urls of pages
+
+    returns:
+    a list of urls of expired pages
+    '''
+    cache = get_page_cache()
+    if cache is None:
+        return []
+
+    # return
+    with _cache_lock:
+        return [url for url in urls if cache.execute('SELECT 1 FROM pages WHERE url = ? AND fetched_at = 0', (url,)).fetchone()]
+
+
+
+# list urls not in page cache
+def list_uncached_urls(urls: Iterable[str]) -> List[str]:
+    '''
+    list the urls of pages that are not in the page cache, e.g. to check that an offline run has every page it reads
+
+    arguments:
+    urls (list): urls of pages
+
+    returns:
+    a list of urls of pages that are not cached, all urls if the page cache is disabled
+    '''
+    cache = get_page_cache()
+    if cache is None:
+        return list(urls)
+
+    # return
+    with _cache_lock:
+        return [url for url in urls if not cache.execute('SELECT 1 FROM pages WHERE url = ?', (url,)).fetchone()]
+
+
+
+# list urls in page cache
+def list_cached_urls(url_part: str = '') -> List[str]:
+    '''
+    list urls of pages in the page cache
+
+    arguments:
+    url_part (str): only list urls that contain this part, e.g. 'fight-details'
+
+    returns:
+    a list of urls
+    '''
+    cache = get_page_cache()
+    if cache is None:
+        return []
+
+    with _cache_lock:
+        rows = cache.execute('SELECT url FROM pages WHERE instr(url, ?) > 0 ORDER BY url', (url_part,)).fetchall()
+
+    # return
+    return [row[0] for row in rows]
+
+
+
+# get headers to revalidate cached page
+def get_revalidation_headers(url: str, cached_page: Optional[tuple]) -> Optional[Dict[str, str]]:
+    '''
+    check if a cached page is within its time to live, otherwise get the headers that ask the server if it has changed
+    pages marked as expired have a time fetched of 0
+
+    arguments:
+    url (str): url of page
+    cached_page (tuple): output of read_cached_page(), none if the page is not cached
+
+    returns:
+    none if the cached page can be used, otherwise a dict of headers of the request, empty if the page is not cached
+    '''
+    headers = {}
+    if cached_page is not None:
+        _, etag, last_modified, fetched_at = cached_page
+        ttl = get_page_ttl(url)
+        if fetched_at and (ttl < 0 or time.time() - fetched_at < ttl):
+            return None
+        # ask server if page has changed since it was cached
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+
+    # return
+    return headers
+
+
+
+# get page content from url
+def get_page(url: str) -> bytes:
+    '''
+    get raw content of page from url
+    a cached page is used while it is within its time to live
+    an expired cached page is revalidated with the server and is used again if the server replies not modified
+    otherwise the page is fetched with request_page() and written to the cache
+
+    arguments:
+    url (str): url of page
+
+    returns:
+    content of page as bytes
+
+    raises:
+    FetchError if the page could not be fetched, or the host replied with an error
+    '''
+    # read page from cache
+    cached_page = read_cached_page(url)
+
+    # use cached page in offline mode
+    if settings['offline']:
+        if cached_page is None:
+            raise LookupError(f'{url} is not in the page cache and fetch is offline')
+        return cached_page[0]
+
+    # use cached page if it has not expired
+    headers = get_revalidation_headers(url, cached_page)
+    if headers is None:
+        count_page('cache', len(cached_page[0]))
+        return cached_page[0]
+
+    # get page of url
+    page = request_page(url, headers)
+
+    # page has not changed since it was cached
+    if page.status_code == 304 and cached_page is not None:
+        touch_cached_page(url)
+        count_page('not_modified', len(cached_page[0]))
+        return cached_page[0]
+
+    # an error page is never returned as if it were the page
+    if page.status_code != 200:
+        raise FetchError(url, f'status {page.status_code}')
+
+    # write page to cache
+    write_cached_page(url, page.content, page.headers.get('ETag'), page.headers.get('Last-Modified'))
+    count_page('network', len(page.content))
+
+    # return
+    return page.content
+
+
+
+# count page fetched
+def count_page(source: str, number_of_bytes: int) -> None:
+    '''
+    count a page and its bytes in the metrics by where it came from
+
+    arguments:
+    source (str): cache, not_modified if the cached page was revalidated, network, or head if only the top or the headers of the page were read
+    number_of_bytes (int): size of content of page
+
+    returns:
+    none
+    '''
+    METRICS.increment('fetch_pages_total', source=source)
+    METRICS.increment('fetch_bytes_total', number_of_bytes, source=source)
+
+
+
+# stream page content from url
+def iter_page_chunks(url: str, chunk_size: int = 65536) -> Iterator[bytes]:
+    '''
+    get raw content of page from url in chunks of about chunk_size bytes, for pages too large to hold at once
+    the cache is used in the same way as get_page(), a cached page is decompressed chunk by chunk
+    a fetched page is hashed and compressed as it is streamed and written to the cache once it is complete
+    only the compressed page and one chunk are held in memory
+    a page that fails after its first chunk raises FetchError and is not retried, as its chunks have already been used
+
+    arguments:
+    url (str): url of page
+    chunk_size (int): number of bytes in each chunk
+
+    returns:
+    an iterator of chunks of content as bytes
+    '''
+    # read compressed page from cache
+    cached_page = read_cached_page(url, compressed=True)
+
+    # use cached page in offline mode, or if it has not expired
+    if settings['offline'] and cached_page is None:
+        raise LookupError(f'{url} is not in the page cache and fetch is offline')
+    headers = None if settings['offline'] else get_revalidation_headers(url, cached_page)
+    if headers is None:
+        yield from iter_counted_chunks(iter_decompressed_chunks(cached_page[0], chunk_size), 'cache')
+        return
+
+    # get headers of page of url
+    page = request_page(url, headers, stream=True)
+
+    # page has not changed since it was cached
+    if page.status_code == 304 and cached_page is not None:
+        page.close()
+        touch_cached_page(url)
+        yield from iter_counted_chunks(iter_decompressed_chunks(cached_page[0], chunk_size), 'not_modified')
+        return
+
+    # an error page is never returned as if it were the page
+    if page.status_code != 200:
+        page.close()
+        raise FetchError(url, f'status {page.status_code}')
+
+    # stream content, hashing and compressing it for the cache if the cache is enabled
+    caching = get_page_cache() is not None
+    content_hash = hashlib.sha256()
+    compressor = zlib.compressobj()
+    compressed_chunks = []
+    number_of_bytes = 0
+    try:
+        for chunk in page.iter_content(chunk_size):
+            if caching:
+                content_hash.update(chunk)
+                compressed_chunks.append(compressor.compress(chunk))
+            number_of_bytes += len(chunk)
+            yield chunk
+    except requests.RequestException as error:
+        raise FetchError(url, f'{type(error).__name__}: {error}') from error
+    finally:
+        page.close()
+    count_page('network', number_of_bytes)
+
+    # write page to cache
+    if caching:
+        compressed_chunks.append(compressor.flush())
+        write_cached_content(url, content_hash.hexdigest(), b''.join(compressed_chunks), page.headers.get('ETag'), page.headers.get('Last-Modified'))
+
+
+
+# decompress cached page in chunks
+def iter_decompressed_chunks(compressed_content: bytes, chunk_size: int) -> Iterator[bytes]:
+    '''
+    decompress content compressed with zlib in chunks of at most chunk_size bytes
+
+    arguments:
+    compressed_content (bytes): content compressed with zlib
+    chunk_size (int): number of bytes in each chunk
+
+    returns:
+    an iterator of chunks of content as bytes
+    '''
+    decompressor = zlib.decompressobj()
+    data = compressed_content
+    while data:
+        chunk = decompressor.decompress(data, chunk_size)
+        data = decompressor.unconsumed_tail
+        if chunk:
+            yield chunk
+    chunk = decompressor.flush()
+    if chunk:
+        yield chunk
+
+
+
+# count chunks of cached page
+def iter_counted_chunks(chunks: Iterator[bytes], source: str) -> Iterator[bytes]:
+    '''
+    yield chunks of a page and count the page and its bytes in the metrics once all chunks are read
+
+    arguments:
+    chunks (iterator): chunks of content of page
+    source (str): cache, or not_modified if the cached page was revalidated
+
+    returns:
+    an iterator of chunks of content as bytes
+    '''
+    number_of_bytes = 0
+    for chunk in chunks:
+        number_of_bytes += len(chunk)
+        yield chunk
+    count_page(source, number_of_bytes)
+
+
+
+# get hash of content of page
+def get_page_hash(url: str) -> Optional[str]:
+    '''
+    get the hash of the current content of a page without parsing it, e.g. to skip pages that have not changed
+    the cache is used in the same way as get_page(), so a page within its time to live, or that the server replies is not modified, is not downloaded
+    otherwise the page is streamed into the cache with iter_page_chunks() and read from the cache when it is parsed
+
+    arguments:
+    url (str): url of page
+
+    returns:
+    sha256 hex digest of content, or none if the page cache is disabled
+
+    raises:
+    FetchError if the page could not be fetched, or the host replied with an error
+    '''
+    cache = get_page_cache()
+    if cache is None:
+        return None
+
+    # fetch page into cache unless the cached page can be used
+    cached_page = read_cached_page(url, compressed=True)
+    if cached_page is None or (not settings['offline'] and get_revalidation_headers(url, cached_page) is not None):
+        for _ in iter_page_chunks(url):
+            pass
+
+    with _cache_lock:
+        row = cache.execute('SELECT hash FROM pages WHERE url = ?', (url,)).fetchone()
+
+    # return
+    return row[0]
+
+
+
+# get top of page
+def get_page_head(url: str, number_of_bytes: int = 65536) -> bytes:
+    '''
+    get the first bytes of the current content of a page without downloading the rest of it, e.g. the newest events on the page of all events
+    the page cache is not used or written, as the page may have changed within its time to live, except in offline mode
+
+    arguments:
+    url (str): url of page
+    number_of_bytes (int): number of bytes at the top of the page
+
+    returns:
+    the first number_of_bytes bytes of content of page, or all of it if it is shorter
+
+    raises:
+    FetchError if the page could not be fetched, or the host replied with an error
+    '''
+    # use cached page in offline mode
+    if settings['offline']:
+        cached_page = read_cached_page(url)
+        if cached_page is None:
+            raise LookupError(f'{url} is not in the page cache and fetch is offline')
+        return cached_page[0][:number_of_bytes]
+
+    # read chunks of page until there are enough bytes, then drop the connection
+    page = request_page(url, stream=True)
+    head = b''
+    try:
+        if page.status_code != 200:
+            raise FetchError(url, f'status {page.status_code}')
+        for chunk in page.iter_content(number_of_bytes):
+            head += chunk
+            if len(head) >= number_of_bytes:
+                break
+    except requests.RequestException as error:
+        raise FetchError(url, f'{type(error).__name__}: {error}') from error
+    finally:
+        page.close()
+    count_page('head', len(head[:number_of_bytes]))
+
+    # return
+    return head[:number_of_bytes]
+
+
+
+# get fingerprint of page from its headers
+def get_page_fingerprint(url: str) -> str:
+    '''
+    get a cheap fingerprint of the current content of a page from the validators in the headers of its response
+    the etag, or else the last modified date, is used so the content is not downloaded
+    if the host sends neither the content is downloaded and hashed, but not parsed or written to the cache
+    the content length is not used, as an edit of the same length, e.g. a changed method of a fight, would not change it
+    the page cache is not used, except in offline mode where the hash of the cached page is used
+
+    arguments:
+    url (str): url of page
+
+    returns:
+    a fingerprint of the page, e.g. 'etag "37fd34fd"', 'last-modified Sat, 13 Apr 2024 ...' or 'sha256 9f86d081...'
+
+    raises:
+    FetchError if the page could not be fetched, or the host replied with an error
+    '''
+    # use hash of cached page in offline mode
+    if settings['offline']:
+        content_hash = get_page_hash(url)
+        if content_hash is None:
+            raise LookupError(f'{url} is not in the page cache and fetch is offline')
+        return f'sha256 {content_hash}'
+
+    page = request_page(url, stream=True)
+    try:
+        if page.status_code != 200:
+            raise FetchError(url, f'status {page.status_code}')
+        # use validators of response
+        for header in ['ETag', 'Last-Modified']:
+            if page.headers.get(header):
+                count_page('head', 0)
+                return f'{header.lower()} {page.headers[header]}'
+        # hash content of response
+        content_hash = hashlib.sha256()
+        number_of_bytes = 0
+        for chunk in page.iter_content(65536):
+            content_hash.update(chunk)
+            number_of_bytes += len(chunk)
+    except requests.RequestException as error:
+        raise FetchError(url, f'{type(error).__name__}: {error}') from error
+    finally:
+        page.close()
+    count_page('network', number_of_bytes)
+
+    # return
+    return f'sha256 {content_hash.hexdigest()}'
+
+
+
+# get pages from list of urls
+def iter_pages(urls: Iterable[str], max_workers: int = None, quarantine: bool = False) -> Iterator[Optional[bytes]]:
+    '''
+    get raw content of pages from a list of urls concurrently
+    pages are yielded in the same order as the urls
+    only a bounded number of pages are fetched ahead of the consumer so memory stays flat on long lists
+    with quarantine a page that could not be fetched is added to the retry queue and none is yielded in its place
+    otherwise its FetchError is raised
+
+    arguments:
+    urls (list): list of urls of pages
+    max_workers (int): number of pages fetched at the same time, defaults to settings['max_workers']
+    quarantine (bool): skip pages that could not be fetched instead of raising
+
+    returns:
+    an iterator of page contents as bytes, or none for quarantined pages
+    '''
+    # get number of workers
+    max_workers = max_workers or settings['max_workers']
+    # number of pages fetched ahead of the consumer
+    window = max_workers * 2
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # queue of futures in order of urls
+        futures = deque()
+        for url in urls:
+            futures.append((url, executor.submit(get_page, url)))
+            # yield oldest page once the window is full
+            if len(futures) >= window:
+                yield get_result(*futures.popleft(), quarantine)
+        # yield remaining pages
+        while futures:
+            yield get_result(*futures.popleft(), quarantine)
+
+
+
+# get result of fetched page
+def get_result(url: str, future, quarantine: bool) -> Optional[bytes]:
+    '''
+    get the page of a future from get_page(), quarantining the url if it could not be fetched
+
+    arguments:
+    url (str): url of page
+    future (future): future of get_page()
+    quarantine (bool): return none instead of raising if the page could not be fetched
+
+    returns:
+    content of page as bytes, or none if the url was quarantined
+    '''
+    try:
+        return future.result()
+    except FetchError as error:
+        if not quarantine:
+            raise
+        quarantine_url(url, error.reason)
+
+    # return
+    return None
+
+
+
+# get pages from list of urls
+def get_pages(urls: Iterable[str], max_workers: int = None) -> List[bytes]:
+    '''
+    get raw content of pages from a list of urls concurrently
+    pages are returned in the same order as the urls
+
+    arguments:
+    urls (list): list of urls of pages
+    max_workers (int): number of pages fetched at the same time, defaults to settings['max_workers']
+
+    returns:
+    a list of page contents as bytes
+    '''
+    # return
+    return list(iter_pages(urls, max_workers))
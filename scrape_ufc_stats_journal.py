@@ -0,0 +1,258 @@
+'''
+Overview
+
+job journal for checkpointed, resumable backfill runs
+the journal is a sqlite file that records the state of every url of a backfill and the records parsed from it
+
+urls are grouped into stages, e.g. the event pages or the fight pages, in the order they are written
+each url moves through the states
+pending - queued to be fetched
+fetched - page fetched and waiting to be parsed, the page is in the page cache
+parsed - records parsed from the page are stored in the journal
+written - records are written to the output tables
+
+parsed records are flushed to the journal in chunks, each chunk in one transaction
+so a run that is stopped loses at most one chunk of parsing, and a resumed run starts with the first url not parsed
+
+'''
+
+# imports
+from typing import Iterable, Iterator, List, Tuple
+import json
+import sqlite3
+import time
+
+
+
+# states of urls in order
+states = ['pending', 'fetched', 'parsed', 'written']
+
+
+
+# journal of a backfill run
+class Journal:
+    '''
+    journal of the urls of a backfill run and the records parsed from them
+    urls holds the stage, url, position in stage, state and time of last change of each url
+    outputs holds the records parsed from each url as json
+    values holds details of the run, e.g. when it started and finished
+
+    arguments:
+    file_name (str): sqlite file of journal
+    '''
+
+    def __init__(self, file_name: str):
+        self.file_name = file_name
+        self.connection = sqlite3.connect(file_name)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS urls (stage TEXT NOT NULL, url TEXT NOT NULL, position INTEGER NOT NULL, state TEXT NOT NULL, updated_at REAL NOT NULL, PRIMARY KEY (stage, url))')
+        self.connection.execute('CREATE INDEX IF NOT EXISTS urls_position ON urls (stage, position)')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS outputs (stage TEXT NOT NULL, url TEXT NOT NULL, output TEXT NOT NULL, PRIMARY KEY (stage, url))')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS run_values (key TEXT PRIMARY KEY, value TEXT NOT NULL)')
+        self.connection.commit()
+
+    # clear journal
+    def reset(self) -> None:
+        '''
+        remove all urls, outputs and values to start a new run
+
+        arguments:
+        none
+
+        returns:
+        none
+        '''
+        with self.connection:
+            self.connection.execute('DELETE FROM urls')
+            self.connection.execute('DELETE FROM outputs')
+            self.connection.execute('DELETE FROM run_values')
+
+    # get value of run
+    def get_value(self, key: str, default=None):
+        '''
+        get a value recorded for the run
+
+        arguments:
+        key (str): name of value
+        default: value returned if there is no value recorded
+
+        returns:
+        the value
+        '''
+        row = self.connection.execute('SELECT value FROM run_values WHERE key = ?', (key,)).fetchone()
+
+        # return
+        return default if row is None else json.loads(row[0])
+
+    # set value of run
+    def set_value(self, key: str, value) -> None:
+        '''
+        record a value for the run
+
+        arguments:
+        key (str): name of value
+        value: value that can be written as json
+
+        returns:
+        none
+        '''
+        with self.connection:
+            self.connection.execute('INSERT OR REPLACE INTO run_values (key, value) VALUES (?, ?)', (key, json.dumps(value)))
+
+    # add urls to stage
+    def add_urls(self, stage: str, urls: Iterable[str]) -> None:
+        '''
+        add urls to a stage as pending, in order after the urls already in the stage
+        urls already in the stage keep their position and state
+
+        arguments:
+        stage (str): name of stage
+        urls (list): list of urls
+
+        returns:
+        none
+        '''
+        now = time.time()
+        with self.connection:
+            position = self.connection.execute('SELECT COALESCE(MAX(position) + 1, 0) FROM urls WHERE stage = ?', (stage,)).fetchone()[0]
+            self.connection.executemany(
+                'INSERT OR IGNORE INTO urls (stage, url, position, state, updated_at) VALUES (?, ?, ?, ?, ?)',
+                [(stage, url, position + i, 'pending', now) for i, url in enumerate(urls)]
+            )
+
+    # list urls of stage
+    def list_urls(self, stage: str, url_states: Iterable[str] = states) -> List[str]:
+        '''
+        list urls of a stage in one of url_states, in order of position
+
+        arguments:
+        stage (str): name of stage
+        url_states (list): list of states
+
+        returns:
+        a list of urls
+        '''
+        url_states = list(url_states)
+        rows = self.connection.execute(
+            f'SELECT url FROM urls WHERE stage = ? AND state IN ({", ".join("?" * len(url_states))}) ORDER BY position',
+            [stage] + url_states
+        )
+
+        # return
+        return [url for url, in rows]
+
+    # save chunk of outputs
+    def save_outputs(self, stage: str, outputs: List[Tuple[str, object]], fetched_urls: Iterable[str] = ()) -> None:
+        '''
+        store the outputs parsed from urls and mark the urls parsed
+        urls fetched but not parsed yet are marked fetched
+        all changes are made in one transaction, so a chunk is either saved completely or not at all
+
+        arguments:
+        stage (str): name of stage
+        outputs (list): list of tuples of url and output, the output can be written as json
+        fetched_urls (list): list of urls fetched since the last chunk
+
+        returns:
+        none
+        '''
+        now = time.time()
+        with self.connection:
+            self.connection.executemany(
+                'UPDATE urls SET state = ?, updated_at = ? WHERE stage = ? AND url = ? AND state = ?',
+                [('fetched', now, stage, url, 'pending') for url in fetched_urls]
+            )
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO outputs (stage, url, output) VALUES (?, ?, ?)',
+                [(stage, url, json.dumps(output)) for url, output in outputs]
+            )
+            self.connection.executemany(
+                'UPDATE urls SET state = ?, updated_at = ? WHERE stage = ? AND url = ?',
+                [('parsed', now, stage, url) for url, _ in outputs]
+            )
+
+    # iterate outputs of stage
+    def iter_outputs(self, stage: str) -> Iterator[Tuple[str, object]]:
+        '''
+        iterate the outputs of a stage in order of position
+
+        arguments:
+        stage (str): name of stage
+
+        returns:
+        an iterator of tuples of url and output
+        '''
+        rows = self.connection.execute(
+            'SELECT urls.url, outputs.output FROM urls JOIN outputs USING (stage, url) WHERE urls.stage = ? ORDER BY urls.position',
+            (stage,)
+        )
+        for url, output in rows:
+            yield url, json.loads(output)
+
+    # mark stages written
+    def mark_written(self, stages: Iterable[str]) -> None:
+        '''
+        mark all parsed urls of stages written, once their records are written to the output tables
+
+        arguments:
+        stages (list): list of names of stages
+
+        returns:
+        none
+        '''
+        now = time.time()
+        with self.connection:
+            self.connection.executemany(
+                'UPDATE urls SET state = ?, updated_at = ? WHERE stage = ? AND state = ?',
+                [('written', now, stage, 'parsed') for stage in stages]
+            )
+
+    # check if stage is written
+    def is_written(self, stage: str) -> bool:
+        '''
+        check if a stage has urls and all of them are written
+
+        arguments:
+        stage (str): name of stage
+
+        returns:
+        true if the stage is written
+        '''
+        total, written = self.connection.execute(
+            'SELECT COUNT(*), COALESCE(SUM(state = ?), 0) FROM urls WHERE stage = ?',
+            ('written', stage)
+        ).fetchone()
+
+        # return
+        return total > 0 and total == written
+
+    # count urls by state
+    def count_states(self) -> dict:
+        '''
+        count urls of each stage by state
+
+        arguments:
+        none
+
+        returns:
+        a dict of stage to a dict of state to number of urls
+        '''
+        counts = {}
+        for stage, state, count in self.connection.execute('SELECT stage, state, COUNT(*) FROM urls GROUP BY stage, state ORDER BY MIN(rowid)'):
+            counts.setdefault(stage, {})[state] = count
+
+        # return
+        return counts
+
+    # close journal
+    def close(self) -> None:
+        '''
+        close the connection to the journal
+
+        arguments:
+        none
+
+        returns:
+        none
+        '''
+        self.connection.close()
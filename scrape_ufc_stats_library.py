@@ -6,21 +6,38 @@ library of functions to scrape ufc stats
 '''
 
 # imports
-from typing import List, Tuple
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import numpy as np
 import re
-import requests
 from bs4 import BeautifulSoup
 import itertools
+import hashlib
 import string
+import sys
+
+# import fetch engine, parser backends and metrics
+import scrape_ufc_stats_fetch as FETCH
+import scrape_ufc_stats_soup as SOUP
+import scrape_ufc_stats_metrics as METRICS
+import scrape_ufc_stats_storage as STORE
+
+# column names of event details, in the order of parse_event_details() and iter_event_details()
+event_details_column_names = ['EVENT', 'URL', 'DATE', 'LOCATION']
+
+# id columns added to the end of records of fight results and fight stats with id columns
+# ids are taken from the links of the fight page, the event in its title and the fighters in its header
+fight_results_id_column_names = ['EVENT_ID', 'FIGHT_ID', 'FIGHTER_A_ID', 'FIGHTER_B_ID']
+fight_stats_id_column_names = ['EVENT_ID', 'FIGHT_ID', 'FIGHTER_ID']
 
 
 
 # get soup from url
+@METRICS.instrument
 def get_soup(url: str) -> BeautifulSoup:
     '''
-    get soup from url using beautifulsoup
+    get soup from url using the parser backend set in scrape_ufc_stats_soup
 
     arguments:
     url (str): url of page to parse
@@ -30,16 +47,111 @@ def get_soup(url: str) -> BeautifulSoup:
     '''
     
     # get page of url
-    page = requests.get(url)
+    page = FETCH.get_page(url)
     # create soup
-    soup = BeautifulSoup(page.content, 'html.parser')
+    soup = SOUP.make_soup(page)
 
     # return
     return soup
 
 
 
+# get soups from list of urls
+def iter_soups(urls: Iterable[str], max_workers: int = None, quarantine: bool = False) -> Iterator[Optional[BeautifulSoup]]:
+    '''
+    get soups from a list of urls using the parser backend set in scrape_ufc_stats_soup
+    pages are fetched concurrently with a shared connection pool
+    soups are yielded in the same order as the urls
+    with quarantine a page that could not be fetched is added to the retry queue of scrape_ufc_stats_fetch and none is yielded in its place
+
+    arguments:
+    urls (list): list of urls of pages to parse
+    max_workers (int): number of pages fetched at the same time, defaults to the fetch settings
+    quarantine (bool): skip pages that could not be fetched instead of raising
+
+    returns:
+    an iterator of soups, or none for quarantined pages
+    '''
+
+    # get pages of urls
+    for page in FETCH.iter_pages(urls, max_workers, quarantine):
+        # create soup
+        yield None if page is None else SOUP.make_soup(page)
+
+
+
+# get records of pages streamed from list of urls
+def iter_page_records(urls: Iterable[str], iter_records: Callable, max_workers: int = None, quarantine: bool = False) -> Iterator[Optional[List[list]]]:
+    '''
+    stream pages from a list of urls and parse each page with iter_records in a single pass, without building a soup
+    for index pages, e.g. the alphabetical pages of fighters, which are too large to hold as soups
+    pages are streamed and parsed concurrently and the records of each page are yielded in the same order as the urls
+    with quarantine a page that could not be fetched is added to the retry queue of scrape_ufc_stats_fetch and none is yielded in its place
+
+    arguments:
+    urls (list): list of urls of pages
+    iter_records (function): function that takes chunks of a page and yields records, e.g. iter_fighter_details()
+    max_workers (int): number of pages streamed at the same time, defaults to the fetch settings
+    quarantine (bool): skip pages that could not be fetched instead of raising
+
+    returns:
+    an iterator of lists of records of each page, or none for quarantined pages
+    '''
+    # stream and parse one page
+    def get_records(url: str) -> Optional[List[list]]:
+        try:
+            return list(iter_records(FETCH.iter_page_chunks(url)))
+        except FETCH.FetchError as error:
+            if not quarantine:
+                raise
+            FETCH.quarantine_url(url, error.reason)
+            return None
+
+    with ThreadPoolExecutor(max_workers=max_workers or FETCH.settings['max_workers']) as executor:
+        yield from executor.map(get_records, urls)
+
+
+
+# get records of pages that have changed from list of urls
+def iter_changed_page_records(urls: Iterable[str], iter_records: Callable, page_hashes: Dict[str, str], max_workers: int = None, quarantine: bool = False) -> Iterator[Optional[Tuple[Optional[str], Optional[List[list]]]]]:
+    '''
+    hash the content of pages from a list of urls and parse only pages whose hash is not in page_hashes, as in iter_page_records()
+    pages within their time to live in the page cache, or that the server replies are not modified, are not downloaded
+    so pages that have not changed since their hash was recorded are skipped entirely
+    pages are always parsed if the page cache is disabled, as their hash is not known
+    with quarantine a page that could not be fetched is added to the retry queue of scrape_ufc_stats_fetch and none is yielded in its place
+
+    arguments:
+    urls (list): list of urls of pages
+    iter_records (function): function that takes chunks of a page and yields records, e.g. iter_fighter_details()
+    page_hashes (dict): url to hash of content of each page when it was last parsed, from FETCH.get_page_hash()
+    max_workers (int): number of pages streamed at the same time, defaults to the fetch settings
+    quarantine (bool): skip pages that could not be fetched instead of raising
+
+    returns:
+    an iterator of tuples of hash of content and list of records of each page, in the same order as the urls
+    records are none for pages that have not changed, and the tuple is none for quarantined pages
+    '''
+    # hash one page and parse it if it has changed
+    def get_changed_records(url: str) -> Optional[Tuple[Optional[str], Optional[List[list]]]]:
+        try:
+            content_hash = FETCH.get_page_hash(url)
+            if content_hash is not None and content_hash == page_hashes.get(url):
+                return content_hash, None
+            return content_hash, list(iter_records(FETCH.iter_page_chunks(url)))
+        except FETCH.FetchError as error:
+            if not quarantine:
+                raise
+            FETCH.quarantine_url(url, error.reason)
+            return None
+
+    with ThreadPoolExecutor(max_workers=max_workers or FETCH.settings['max_workers']) as executor:
+        yield from executor.map(get_changed_records, urls)
+
+
+
 # parse event details
+@METRICS.instrument
 def parse_event_details(soup: BeautifulSoup) -> pd.DataFrame:
     '''
     parse event details from soup
@@ -92,12 +204,96 @@ def parse_event_details(soup: BeautifulSoup) -> pd.DataFrame:
 
 
 
+# stream event details
+def iter_event_details(chunks: Iterable[bytes]) -> Iterator[List[str]]:
+    '''
+    parse event details from the page of all events while it is streamed, in a single pass
+    gives the same records as parse_event_details(), each record is yielded as soon as its row of the page is read
+    the first date and location are of the upcoming event with no stats yet, and are skipped
+
+    arguments:
+    chunks (iterable): chunks of content of page, e.g. from FETCH.iter_page_chunks()
+
+    returns:
+    an iterator of records of event name, url, date and location, in the order of event_details_column_names
+    '''
+    # tags of event name and url, date and location
+    selectors = [
+        ('a', 'b-link b-link_style_black'),
+        ('span', 'b-statistics__date'),
+        ('td', 'b-statistics__table-col b-statistics__table-col_style_big-top-padding'),
+    ]
+    # queues of event names and urls, dates and locations, with the upcoming event's date and location to skip
+    queues = [[], [], []]
+    skips = [0, 1, 1]
+
+    for index, text, attributes in SOUP.iter_tags(chunks, selectors):
+        if skips[index]:
+            skips[index] -= 1
+            continue
+        queues[index].append((text.strip(), attributes.get('href')) if index == 0 else text.strip())
+        # yield record once its name, date and location have been read
+        if all(queues):
+            (event_name, event_url), event_date, event_location = (queue.pop(0) for queue in queues)
+            yield [event_name, event_url, event_date, event_location]
+
+    # every event has a name, date and location
+    if any(queues):
+        raise ValueError(f'event details have {len(queues[0])} names, {len(queues[1])} dates and {len(queues[2])} locations left without a record')
+
+
+
+# parse upcoming event
+def parse_upcoming_event(chunks: Iterable[bytes]) -> Optional[List[str]]:
+    '''
+    parse the upcoming event from the top of the page of all events, the row that parse_event_details() and iter_event_details() skip
+    the upcoming event is linked in white on the first row of the table, its date and location are the first on the page
+    the event stays the upcoming event until ufcstats.com completes it, so it is also the event in progress on fight night
+    the date and location may be empty, e.g. the location of an event whose venue is still to be announced, only the name and url are required
+
+    arguments:
+    chunks (iterable): chunks of content of page, e.g. [FETCH.get_page_head()]
+
+    returns:
+    a record of event name, url, date and location, in the order of event_details_column_names, or none if there is no upcoming event
+    '''
+    # tags of event name and url, date and location
+    selectors = [
+        ('a', 'b-link b-link_style_white'),
+        ('span', 'b-statistics__date'),
+        ('td', 'b-statistics__table-col b-statistics__table-col_style_big-top-padding'),
+    ]
+    record = [None, None, None, None]
+
+    for index, text, attributes in SOUP.iter_tags(chunks, selectors):
+        # the first row is a completed event, there is no upcoming event
+        if record[0] is None and index != 0:
+            return None
+        if index == 0:
+            record[0], record[1] = text.strip(), attributes.get('href')
+        elif record[index + 1] is None:
+            record[index + 1] = text.strip()
+        if None not in record:
+            break
+
+    # an event needs a name and url, a date or location that was not read is left empty
+    if not record[0] or not record[1]:
+        return None
+
+    # return
+    return [value or '' for value in record]
+
+
+
 # parse fight details
+@METRICS.instrument
 def parse_fight_details(soup: BeautifulSoup) -> pd.DataFrame:
     '''
     parse fight details from soup
     includes urls, and fights
-    create bout from fighters' names and create event column as keys
+    create event column as key
+    bout is left empty here and is filled in from the fight page with parse_bout()
+    so that each fight page is only fetched once, when its results and stats are parsed
     return a df of fight details of an event
 
     arguments:
@@ -113,28 +309,8 @@ def parse_fight_details(soup: BeautifulSoup) -> pd.DataFrame:
     for tag in soup.find_all('tr', class_='b-fight-details__table-row b-fight-details__table-row__hover js-fight-details-click'):
         fight_urls.append(tag['data-link'])
 
-    # create an empty list to store fighters in an event
-    fighters_in_event = []
-    # extract all fighters in an event
-    for tag in soup.find_all('a', class_='b-link b-link_style_black'):
-        fighters_in_event.append(tag.text.strip())
-
-    # create empty list to store fights
-    fights_in_event = []
-    # loop through each fight url
-    for url in fight_urls:
-        # get soup from url
-        soup_fight = get_soup(url)
-        # create empty list to store fighters' names
-        fighters_names = []
-        # parse fighters' name from soup
-        for tag in soup_fight.find_all('a', class_='b-link b-fight-details__person-link'):
-            fighters_names.append(tag.text.strip())
-        # join fighters name into one, e.g. fighter_a vs. fighter_b
-        fights_in_event.append(' vs. '.join(fighters_names))
-    
     # create df to store fights
-    fight_details_df = pd.DataFrame({'BOUT':fights_in_event, 'URL':fight_urls})
+    fight_details_df = pd.DataFrame({'BOUT':np.nan, 'URL':fight_urls})
     # create event column as key
     fight_details_df['EVENT'] = soup.find('h2', class_='b-content__title').text.strip()
     # reorder columns
@@ -145,7 +321,139 @@ def parse_fight_details(soup: BeautifulSoup) -> pd.DataFrame:
 
 
 
+# parse fingerprints of fights from soup
+@METRICS.instrument
+def parse_fight_fingerprints(soup: BeautifulSoup) -> Dict[str, str]:
+    '''
+    parse a fingerprint of each fight from the soup of an event page
+    the fingerprint is a hash of the text of the fight's row in the table of fights
+    the row includes the outcome, fighters, summary stats, weightclass, method, round and time
+    so the fingerprint changes when a bout is changed or its result is changed
+    whitespace is collapsed so that every parser backend gives the same fingerprint
+
+    arguments:
+    soup (html): output of get_soup()
+
+    returns:
+    a dict of fight url to fingerprint, in order of fights on the page
+    '''
+
+    # create empty dict to store fingerprints
+    fight_fingerprints = {}
+    # hash text of each row of fights
+    for tag in soup.find_all('tr', class_='b-fight-details__table-row b-fight-details__table-row__hover js-fight-details-click'):
+        row_text = ' '.join(tag.get_text().split())
+        fight_fingerprints[tag['data-link']] = hashlib.sha256(row_text.encode()).hexdigest()[:16]
+
+    # return
+    return fight_fingerprints
+
+
+
+# parse finished fights from soup
+@METRICS.instrument
+def parse_finished_fight_urls(soup: BeautifulSoup) -> List[str]:
+    '''
+    parse the urls of fights that have a result from the soup of an event page
+    a fight has a result once its row of the table of fights has a method, the last column aligned left after the fighters and weightclass
+    fights of an upcoming or in progress event have no method until they are over
+
+    arguments:
+    soup (html): output of get_soup()
+
+    returns:
+    a list of fight urls, in order of fights on the page
+    '''
+
+    # create empty list to store urls of fights with a result
+    finished_fight_urls = []
+    # check method of each row of fights
+    for tag in soup.find_all('tr', class_='b-fight-details__table-row b-fight-details__table-row__hover js-fight-details-click'):
+        method = tag.find_all('td', class_='l-page_align_left')[-1:]
+        if method and method[0].get_text().strip():
+            finished_fight_urls.append(tag['data-link'])
+
+    # return
+    return finished_fight_urls
+
+
+
+# parse bout from soup
+@METRICS.instrument
+def parse_bout(soup: BeautifulSoup) -> str:
+    '''
+    parse bout from soup of a fight page
+    join fighters' names into one, e.g. fighter_a vs. fighter_b
+
+    arguments:
+    soup (html): output of get_soup() parser
+
+    returns:
+    name of bout
+    '''
+
+    # create empty list to store fighters' names
+    fighters_names = []
+    # parse fighters' name from soup
+    for tag in soup.find_all('a', class_='b-link b-fight-details__person-link'):
+        fighters_names.append(tag.text.strip())
+
+    # return
+    return ' vs. '.join(fighters_names)
+
+
+
+# get id from url
+def get_url_id(url: Optional[str]) -> Optional[str]:
+    '''
+    get the id of ufcstats.com from a url
+    e.g. http://ufcstats.com/fighter-details/d854be0f422e4945 has the id d854be0f422e4945
+
+    arguments:
+    url (str): url of event, fight or fighter
+
+    returns:
+    the id, none if the url has no id
+    '''
+    match = re.search(STORE.url_id_pattern, url or '')
+
+    # return
+    return match.group(1) if match else None
+
+
+
+# parse ids of fight from soup
+@METRICS.instrument
+def parse_fight_ids(soup: BeautifulSoup, url: str) -> List[Optional[str]]:
+    '''
+    parse the ids of the event, fight and fighters of a fight page
+    the id of the event is taken from the link in the title, and the ids of fighters from the links of their names
+    fighters are in the same order as in the bout, so names that belong to more than one fighter are told apart
+
+    arguments:
+    soup (html): output of get_soup() parser
+    url (str): url of fight
+
+    returns:
+    a list of ids of event, fight, first fighter and second fighter, none for ids that are not on the page
+    '''
+
+    # parse id of event from link of title
+    title = soup.find('h2', class_='b-content__title')
+    event_link = title.find('a') if title is not None else None
+    event_id = get_url_id(event_link.get('href')) if event_link is not None else None
+
+    # parse ids of fighters from links of their names
+    fighter_ids = [get_url_id(tag.get('href')) for tag in soup.find_all('a', class_='b-link b-fight-details__person-link')]
+    fighter_ids = (fighter_ids + [None, None])[:2]
+
+    # return
+    return [event_id, get_url_id(url)] + fighter_ids
+
+
+
 # parse fight results from soup
+@METRICS.instrument
 def parse_fight_results(soup: BeautifulSoup) -> List[str]:
     '''
     parase fight results from soup
@@ -204,22 +512,22 @@ def parse_fight_results(soup: BeautifulSoup) -> List[str]:
 
 
 
-# organise fight results
-def organise_fight_results(results_from_soup: List[str], fight_results_column_names: List[str]) -> pd.DataFrame:
+# organise fight results into a record
+@METRICS.instrument
+def organise_fight_results_record(results_from_soup: List[str]) -> List[str]:
     '''
-    organise list of fight results
+    organise list of fight results into one record
     fighters' names should be from index 1 and 2
     fight outcome should be from index 3 and 4
     other results includes from index 5 onwards
     weightclass, method, round, time, time format, referee, and details, should be 
-    append all results into list and convert to a df
+    append all results into a list in the order of fight_results_column_names
 
     arguments:
     results_from_soup (list): list of results from parse_fight_results()
-    fight_results_column_names (list): list of column names for fight results
 
     returns:
-    an organised list of fight results
+    a record of fight results
     '''
 
     # create empty list to store results
@@ -235,10 +543,28 @@ def organise_fight_results(results_from_soup: List[str], fight_results_column_na
     # remove and a single ' ', if any,  after the ':'
     fight_results_clean.extend([re.sub('^(.+?): ?', '', text) for text in results_from_soup[5:]])
 
-    # create empty df to store results
-    fight_result_df = pd.DataFrame(columns=fight_results_column_names)
-    # append each round of totals stats from first half of list to totals_df
-    fight_result_df.loc[len(fight_result_df)] = fight_results_clean
+    # return
+    return fight_results_clean
+
+
+
+# organise fight results
+@METRICS.instrument
+def organise_fight_results(results_from_soup: List[str], fight_results_column_names: List[str]) -> pd.DataFrame:
+    '''
+    organise list of fight results
+    convert the record from organise_fight_results_record() to a df
+
+    arguments:
+    results_from_soup (list): list of results from parse_fight_results()
+    fight_results_column_names (list): list of column names for fight results
+
+    returns:
+    an organised list of fight results
+    '''
+
+    # create df from record of results
+    fight_result_df = pd.DataFrame([organise_fight_results_record(results_from_soup)], columns=fight_results_column_names)
 
     # return
     return fight_result_df
@@ -246,6 +572,7 @@ def organise_fight_results(results_from_soup: List[str], fight_results_column_na
 
 
 # parse full fight stats for both fighters
+@METRICS.instrument
 def parse_fight_stats(soup: BeautifulSoup) -> Tuple[List[str], List[str]]:
     '''
     parse full fight stats for both fighters from soup
@@ -287,6 +614,7 @@ def parse_fight_stats(soup: BeautifulSoup) -> Tuple[List[str], List[str]]:
 
 
 # organise stats extracted from soup
+@METRICS.instrument
 def organise_fight_stats(stats_from_soup: List[str]) -> List[List[str]]:
     '''
     organise a list of raw stats extracted from soup
@@ -325,16 +653,37 @@ def organise_fight_stats(stats_from_soup: List[str]) -> List[List[str]]:
 
 
 
-# convert list of fighter stats into a structured dataframe
-def convert_fight_stats_to_df(clean_fighter_stats: List[List[str]], totals_column_names: List[str], significant_strikes_column_names: List[str]) -> pd.DataFrame:
+# get column names of fight stats for one fighter
+def get_fighter_stats_column_names(totals_column_names: List[str], significant_strikes_column_names: List[str]) -> List[str]:
     '''
-    convert a list of fighter stats from organise_fight_stats() into a structured dataframe
+    get column names of merged totals and significant strike stats
+    totals columns come first, followed by significant strike columns that are not in totals
+
+    arguments:
+    totals_column_names (list): list of column names for totals type stats
+    significant_strikes_column_names (list): list of column names for significant strike type stats
+
+    returns:
+    a list of column names
+    '''
+
+    # return
+    return totals_column_names + [column for column in significant_strikes_column_names if column not in totals_column_names]
+
+
+
+# convert list of fighter stats into records
+def convert_fight_stats_to_records(clean_fighter_stats: List[List[str]], totals_column_names: List[str], significant_strikes_column_names: List[str]) -> List[list]:
+    '''
+    convert a list of fighter stats from organise_fight_stats() into a list of records, one for each round
     check if list of stats is empty, there are old fights that do not have stats
-    if fight has no stats, then fill stat columns with nans
+    if fight has no stats, then return one record of nans
     if fight has stats continue and get number of rounds in the fight
     for each round in fight, get stats for totals and significant strikes
     the summary of stats for the fights are ignored
-    merge totals and significant stike stats together and return as one df
+    merge totals and significant stike stats of each round into one record
+    in the order of get_fighter_stats_column_names()
+    a round is only kept if the columns shared by totals and significant strikes agree, as in an inner merge
 
     arguments:
     clean_fighter_stats (list): list of fighter stats from organise_fight_stats()
@@ -342,48 +691,94 @@ def convert_fight_stats_to_df(clean_fighter_stats: List[List[str]], totals_colum
     significant_strikes_column_names (list): list of column names for significant strike type stats
 
     returns:
-    a dataframe of fight stats
+    a list of records of fight stats
     '''
 
-    # create empty df to store each type of stat
-    totals_df = pd.DataFrame(columns=totals_column_names)
-    significant_strikes_df = pd.DataFrame(columns=significant_strikes_column_names)
+    # get position of significant strike columns that are shared with totals and those that are not
+    shared_columns = [(index, totals_column_names.index(column)) for index, column in enumerate(significant_strikes_column_names) if column in totals_column_names]
+    extra_columns = [index for index, column in enumerate(significant_strikes_column_names) if column not in totals_column_names]
 
     # check if list of stats is empty 
     # meaning that stats are unavailable for the fight
     if len(clean_fighter_stats) == 0:
-        # append nans to totals_df and significant_strikes_df
-        totals_df.loc[len(totals_df)] = [np.nan] * len(list(totals_df))
-        significant_strikes_df.loc[len(significant_strikes_df)] = [np.nan] * len(list(significant_strikes_df))
-    
-    # if list of stats is no empty
-    else:
-        # get number of rounds in fight
-        # fight stats has two summary rows and two rows of stats for each round
-        # subtract two summary rows and divide the remaining rows by two to get the number of rounds
-        number_of_rounds = int((len(clean_fighter_stats) - 2) / 2)
-
-        # create empty df to store each type of stat
-        totals_df = pd.DataFrame(columns=totals_column_names)
-        significant_strikes_df = pd.DataFrame(columns=significant_strikes_column_names)
-
-        # for each round in fight, get stats for totals and significant strikes
-        # the first half of stats are totals type and the second half are significant strike type
-        # [[totals - summary], [totals - round 1], [totals - round n]..., [significant strikes - summary], [significant strikes - round 1], [significant strikes - round n]...] 
-        for round in range(number_of_rounds):
-            # append each round of totals stats from first half of list to totals_df
-            totals_df.loc[len(totals_df)] = ['Round '+str(round+1)] + clean_fighter_stats[round+1]
-            # append each round of significant strike stats from second half of list to significant_strikes_df
-            significant_strikes_df.loc[len(significant_strikes_df)] = ['Round '+str(round+1)] + clean_fighter_stats[round+1+int((len(clean_fighter_stats) / 2))]
-
-    # merge totals and significant stike stats together as one df
-    fighter_stats_df = totals_df.merge(significant_strikes_df, how='inner')
+        # return one record of nans
+        return [[np.nan] * (len(totals_column_names) + len(extra_columns))]
+
+    # get number of rounds in fight
+    # fight stats has two summary rows and two rows of stats for each round
+    # subtract two summary rows and divide the remaining rows by two to get the number of rounds
+    number_of_rounds = int((len(clean_fighter_stats) - 2) / 2)
+
+    # create empty list to store records
+    fighter_stats_records = []
+
+    # for each round in fight, get stats for totals and significant strikes
+    # the first half of stats are totals type and the second half are significant strike type
+    # [[totals - summary], [totals - round 1], [totals - round n]..., [significant strikes - summary], [significant strikes - round 1], [significant strikes - round n]...] 
+    for round in range(number_of_rounds):
+        # get each round of totals stats from first half of list
+        totals = ['Round '+str(round+1)] + clean_fighter_stats[round+1]
+        # get each round of significant strike stats from second half of list
+        significant_strikes = ['Round '+str(round+1)] + clean_fighter_stats[round+1+int((len(clean_fighter_stats) / 2))]
+        # check both types of stats have the expected number of columns
+        if len(totals) != len(totals_column_names) or len(significant_strikes) != len(significant_strikes_column_names):
+            raise ValueError(f'round {round+1} stats do not match column names')
+        # merge totals and significant strike stats if shared columns agree
+        if all(significant_strikes[index] == totals[totals_index] for index, totals_index in shared_columns):
+            fighter_stats_records.append(totals + [significant_strikes[index] for index in extra_columns])
+
+    # return
+    return fighter_stats_records
+
+
+
+# convert list of fighter stats into a structured dataframe
+def convert_fight_stats_to_df(clean_fighter_stats: List[List[str]], totals_column_names: List[str], significant_strikes_column_names: List[str]) -> pd.DataFrame:
+    '''
+    convert a list of fighter stats from organise_fight_stats() into a structured dataframe
+    convert the records from convert_fight_stats_to_records() to a df
+
+    arguments:
+    clean_fighter_stats (list): list of fighter stats from organise_fight_stats()
+    totals_column_names (list): list of column names for totals type stats
+    significant_strikes_column_names (list): list of column names for significant strike type stats
+
+    returns:
+    a dataframe of fight stats
+    '''
+
+    # create df from records of stats
+    fighter_stats_df = pd.DataFrame(
+        convert_fight_stats_to_records(clean_fighter_stats, totals_column_names, significant_strikes_column_names),
+        columns=get_fighter_stats_column_names(totals_column_names, significant_strikes_column_names)
+    )
 
     # return
     return fighter_stats_df
 
 
 
+# combine fighter stats into one
+def combine_fighter_stats_records(fighter_a_stats_records: List[list], fighter_b_stats_records: List[list], event: str, bout: str) -> List[list]:
+    '''
+    combine both fighter's records of stats into one list
+    add event and bout to the start of each record as a key
+
+    arguments:
+    fighter_a_stats_records (list): records output from convert_fight_stats_to_records()
+    fighter_b_stats_records (list): records output from convert_fight_stats_to_records()
+    event (str): name of event
+    bout (str): name of bout
+
+    returns
+    a list of records of stats for the fight
+    '''
+
+    # return
+    return [[event, bout] + record for record in fighter_a_stats_records + fighter_b_stats_records]
+
+
+
 # combine fighter stats into one
 def combine_fighter_stats_dfs(fighter_a_stats_df: pd.DataFrame, fighter_b_stats_df: pd.DataFrame, soup: BeautifulSoup) -> pd.DataFrame:
     '''
@@ -406,14 +801,8 @@ def combine_fighter_stats_dfs(fighter_a_stats_df: pd.DataFrame, fighter_b_stats_
     # get name of event from soup
     fight_stats['EVENT'] = soup.find('h2', class_='b-content__title').text.strip()
 
-    # create empty list to store fighters' names
-    fighters_names = []
-    # parse fighters' name from soup
-    for tag in soup.find_all('a', class_='b-link b-fight-details__person-link'):
-        fighters_names.append(tag.text.strip())
-
     # get name of bout with using fighters' names
-    fight_stats['BOUT'] = ' vs. '.join(fighters_names)
+    fight_stats['BOUT'] = parse_bout(soup)
 
     # reorder columns
     fight_stats = move_columns(fight_stats, ['EVENT', 'BOUT'], 'ROUND', 'before')
@@ -423,24 +812,25 @@ def combine_fighter_stats_dfs(fighter_a_stats_df: pd.DataFrame, fighter_b_stats_
 
 
 
-# parse and organise fight results and fight stats
-def parse_organise_fight_results_and_stats(soup: BeautifulSoup, url: str, fight_results_column_names: List[str], totals_column_names: List[str], significant_strikes_column_names: List[str]) -> Tuple[pd.DataFrame, pd.DataFrame]:
+# parse and organise fight results and fight stats into records
+@METRICS.instrument
+def parse_organise_fight_results_and_stats_records(soup: BeautifulSoup, url: str, totals_column_names: List[str], significant_strikes_column_names: List[str], id_columns: bool = False) -> Tuple[List[str], List[list]]:
     '''
-    parse and organise fight results and fight stats from soup
+    parse and organise fight results and fight stats from soup into records
     this function combines other functions that parse fight results and stats into one
-    and returns two dfs, one for fight results and the other for fight stats
+    and returns a record of fight results and a list of records of fight stats
+    records are appended to a RecordAccumulator and converted to a df once all fights are parsed
+    with id_columns, records end with the ids of fight_results_id_column_names and fight_stats_id_column_names
 
     arguments:
     soup (html): output of get_soup() parser
     url (str): url of fight
-    fight_results_df (df): an df
-    fight_results_column_names (list): list of column names for fight results
-    fight_stats_df (df):
     totals_column_names (list): list of column names for totals type stats
     significant_strikes_column_names (list): list of column names for significant strike type stats
+    id_columns (bool): add ids of event, fight and fighters to records
 
     returns:
-    two dfs for fight results and stats
+    a record of fight results and a list of records of fight stats
     '''
 
     # parse fight results
@@ -450,7 +840,7 @@ def parse_organise_fight_results_and_stats(soup: BeautifulSoup, url: str, fight_
     # append fight url 
     fight_results.append('URL:'+url)
     # organise fight results
-    fight_results_df = organise_fight_results(fight_results, fight_results_column_names)
+    fight_results_record = organise_fight_results_record(fight_results)
 
     # parse fight stats
 
@@ -459,11 +849,59 @@ def parse_organise_fight_results_and_stats(soup: BeautifulSoup, url: str, fight_
     # organise stats extracted from soup
     fighter_a_stats_clean = organise_fight_stats(fighter_a_stats)
     fighter_b_stats_clean = organise_fight_stats(fighter_b_stats)
-    # convert list of fighter stats into a structured dataframe
-    fighter_a_stats_df = convert_fight_stats_to_df(fighter_a_stats_clean, totals_column_names, significant_strikes_column_names)
-    fighter_b_stats_df = convert_fight_stats_to_df(fighter_b_stats_clean, totals_column_names, significant_strikes_column_names)
+    # convert list of fighter stats into records
+    fighter_a_stats_records = convert_fight_stats_to_records(fighter_a_stats_clean, totals_column_names, significant_strikes_column_names)
+    fighter_b_stats_records = convert_fight_stats_to_records(fighter_b_stats_clean, totals_column_names, significant_strikes_column_names)
+
+    # add ids of event, fight and fighters
+    if id_columns:
+        event_id, fight_id, fighter_a_id, fighter_b_id = parse_fight_ids(soup, url)
+        fight_results_record.extend([event_id, fight_id, fighter_a_id, fighter_b_id])
+        fighter_a_stats_records = [record + [event_id, fight_id, fighter_a_id] for record in fighter_a_stats_records]
+        fighter_b_stats_records = [record + [event_id, fight_id, fighter_b_id] for record in fighter_b_stats_records]
+
     # combine fighter stats into one
-    fight_stats_df = combine_fighter_stats_dfs(fighter_a_stats_df, fighter_b_stats_df, soup)
+    fight_stats_records = combine_fighter_stats_records(
+        fighter_a_stats_records,
+        fighter_b_stats_records,
+        soup.find('h2', class_='b-content__title').text.strip(),
+        parse_bout(soup)
+    )
+
+    # return
+    return fight_results_record, fight_stats_records
+
+
+
+# parse and organise fight results and fight stats
+@METRICS.instrument
+def parse_organise_fight_results_and_stats(soup: BeautifulSoup, url: str, fight_results_column_names: List[str], totals_column_names: List[str], significant_strikes_column_names: List[str], id_columns: bool = False) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    '''
+    parse and organise fight results and fight stats from soup
+    convert the records from parse_organise_fight_results_and_stats_records() to dfs
+    and returns two dfs, one for fight results and the other for fight stats
+
+    arguments:
+    soup (html): output of get_soup() parser
+    url (str): url of fight
+    fight_results_column_names (list): list of column names for fight results
+    totals_column_names (list): list of column names for totals type stats
+    significant_strikes_column_names (list): list of column names for significant strike type stats
+    id_columns (bool): add ids of event, fight and fighters as columns
+
+    returns:
+    two dfs for fight results and stats
+    '''
+
+    # parse and organise fight results and fight stats into records
+    fight_results_record, fight_stats_records = parse_organise_fight_results_and_stats_records(soup, url, totals_column_names, significant_strikes_column_names, id_columns)
+
+    # convert records to dfs
+    fight_results_df = pd.DataFrame([fight_results_record], columns=fight_results_column_names + (fight_results_id_column_names if id_columns else []))
+    fight_stats_df = pd.DataFrame(
+        fight_stats_records,
+        columns=['EVENT', 'BOUT'] + get_fighter_stats_column_names(totals_column_names, significant_strikes_column_names) + (fight_stats_id_column_names if id_columns else [])
+    )
 
     # return
     return fight_results_df, fight_stats_df
@@ -498,6 +936,7 @@ def generate_alphabetical_urls() -> List[str]:
 
 
 # parse fighter details
+@METRICS.instrument
 def parse_fighter_details(soup: BeautifulSoup, fighter_details_column_names: List[str]) -> pd.DataFrame:
     '''
     parse fighter details from soup
@@ -510,20 +949,14 @@ def parse_fighter_details(soup: BeautifulSoup, fighter_details_column_names: Lis
     returns:
     a dataframe of fighter details
     '''
-    # parse fighter name
-    # create empty list to store fighters' names
+    # create empty lists to store fighters' names and urls
     fighter_names = []
-    # loop through and get fighter's first name, last name, nickname
+    fighter_urls = []
+    # loop through and get fighter's first name, last name, nickname and url in one pass
     for tag in soup.find_all('a', class_='b-link b-link_style_black'):
         # append name to fighter_names
         fighter_names.append(tag.text.strip())
-
-    # parse fighter url
-    # create empty list to store fighters' urls
-    fighter_urls = []
-    # loop through and get fighter url
-    for tag in soup.find_all('a', class_='b-link b-link_style_black'):
-        # append url to list_of_fighter_urls
+        # append url to fighter_urls
         # each tag will have three urls that are duplicated
         fighter_urls.append(tag['href'])
 
@@ -541,7 +974,30 @@ def parse_fighter_details(soup: BeautifulSoup, fighter_details_column_names: Lis
 
 
 
+# stream fighter details
+def iter_fighter_details(chunks: Iterable[bytes]) -> Iterator[List[str]]:
+    '''
+    parse fighter details from an alphabetical page of fighters while it is streamed, in a single pass
+    gives the same records as parse_fighter_details(), each record is yielded as soon as its row of the page is read
+
+    arguments:
+    chunks (iterable): chunks of content of page, e.g. from FETCH.iter_page_chunks()
+
+    returns:
+    an iterator of records of first name, last name, nickname and url
+    '''
+    # each fighter has three links, first name, last name and nickname, all with the fighter's url
+    links = []
+    for _, text, attributes in SOUP.iter_tags(chunks, [('a', 'b-link b-link_style_black')]):
+        links.append((text.strip(), attributes.get('href')))
+        if len(links) == 3:
+            yield [links[0][0], links[1][0], links[2][0], links[0][1]]
+            links = []
+
+
+
 # parse fighter tale of the tape
+@METRICS.instrument
 def parse_fighter_tott(soup: BeautifulSoup) -> List[str]:
     '''
     parse fighter tale of the tape from soup
@@ -578,36 +1034,166 @@ def parse_fighter_tott(soup: BeautifulSoup) -> List[str]:
 
 
 
-# organise fighter tale of the tape
-def organise_fighter_tott(tott_from_soup: List[str], fighter_tott_column_names: List[str], url: str) -> pd.DataFrame:
+# organise fighter tale of the tape into a record
+@METRICS.instrument
+def organise_fighter_tott_record(tott_from_soup: List[str], url: str) -> List[str]:
     '''
-    organise list of fighter tale of the tape
+    organise list of fighter tale of the tape into one record
     remove label of tale of the tape using regex
     e.g. 'Height:5'7"' to '5'7"
-    convert and return list as df
+    append url to the end of the record
 
     arguments:
     tott_from_soup (list): list of fighter tale of the tale from parse_fighter_tott()
-    fighter_tott_column_names (list): list of column names for fighter tale of the tape
     url (str): url of fighter
 
     results:
-    a df of fighter tale of the tape
+    a record of fighter tale of the tape
     '''
     # remove label of results using regex
     fighter_tott_clean = [re.sub('^(.+?): ?', '', text) for text in tott_from_soup]
     # append url to fighter_tott_clean
     fighter_tott_clean.append(url)
-    # create empty df to store fighter's details
-    fighter_tott_df = pd.DataFrame(columns=fighter_tott_column_names)
-    # append fighter's details to fighter_details_df
-    fighter_tott_df.loc[(len(fighter_tott_df))] = fighter_tott_clean
+
+    # return
+    return fighter_tott_clean
+
+
+
+# organise fighter tale of the tape
+@METRICS.instrument
+def organise_fighter_tott(tott_from_soup: List[str], fighter_tott_column_names: List[str], url: str) -> pd.DataFrame:
+    '''
+    organise list of fighter tale of the tape
+    convert the record from organise_fighter_tott_record() to a df
+
+    arguments:
+    tott_from_soup (list): list of fighter tale of the tale from parse_fighter_tott()
+    fighter_tott_column_names (list): list of column names for fighter tale of the tape
+    url (str): url of fighter
+
+    results:
+    a df of fighter tale of the tape
+    '''
+    # create df from record of fighter's details
+    fighter_tott_df = pd.DataFrame([organise_fighter_tott_record(tott_from_soup, url)], columns=fighter_tott_column_names)
 
     # return
     return fighter_tott_df
 
 
 
+# parse fighter career averages
+@METRICS.instrument
+def parse_fighter_averages(soup: BeautifulSoup) -> List[str]:
+    '''
+    parse fighter career averages from soup, the career statistics block of the fighter page
+    career averages contain fighter, slpm, str. acc., sapm, str. def, td avg., td acc., td def., sub. avg.
+    they are in the lists of the page after the tale of the tape, and are cleaned the same way
+    so they are organised into a record with organise_fighter_tott_record()
+
+    arguments:
+    soup (html): output of get_soup() parser
+
+    returns:
+    a list of fighter career averages
+    '''
+    # create empty list to store fighter career averages
+    fighter_averages = []
+
+    # parse fighter name
+    fighter_name = soup.find('span', class_='b-content__title-highlight').text
+    # append fighter's name to fighter_averages
+    fighter_averages.append('Fighter:'+fighter_name)
+
+    # parse fighter's career averages from the lists after the tale of the tape
+    for box_list in soup.find_all('ul', class_='b-list__box-list')[1:]:
+        # loop through each tag to get text and next_sibling text
+        for tag in box_list.find_all('i'):
+            # skip empty tags that only space out the lists
+            if not tag.text.strip():
+                continue
+            # add text together and append to fighter_averages
+            fighter_averages.append(tag.text.strip() + tag.next_sibling.strip())
+    # clean each element in the list, removing '\n' and '  '
+    fighter_averages = [text.replace('\n', '').replace('  ', '') for text in fighter_averages]
+
+    # return
+    return fighter_averages
+
+
+
+# parse fighter fight history
+@METRICS.instrument
+def parse_fighter_history(soup: BeautifulSoup) -> List[List[str]]:
+    '''
+    parse fighter fight history from soup, the table of every fight of the fighter page, upcoming fights first
+    each column of a row has up to two lines, e.g. the fighter and the opponent, or the event and its date
+    returns a list of rows, each the url of the fight and the two lines of each column
+    e.g. [url, 'win', '', 'Jose Aldo', 'Max Holloway', '0', '0', ..., 'KO/TKO', 'Punches', '3', '', '4:13', '']
+
+    arguments:
+    soup (html): output of get_soup() parser
+
+    returns:
+    a list of fighter fight history
+    '''
+    # create empty list to store fighter fight history
+    fighter_history = []
+
+    # loop through rows of fights, the first row of the table is empty and has no link
+    for row in soup.find_all('tr', class_='b-fight-details__table-row__hover'):
+        # the url of the fight is the link of the row
+        row_texts = [row.get('data-link')]
+        # loop through each column to get the text of each line
+        for column in row.find_all('td', class_='b-fight-details__table-col'):
+            lines = [tag.text.strip() for tag in column.find_all('p', class_='b-fight-details__table-text')]
+            # pad columns with one line, e.g. round and time
+            row_texts.extend((lines + ['', ''])[:2])
+        fighter_history.append(row_texts)
+
+    # return
+    return fighter_history
+
+
+
+# organise fighter fight history into records
+@METRICS.instrument
+def organise_fighter_history_records(history_from_soup: List[List[str]], fighter: str, url: str) -> List[list]:
+    '''
+    organise fighter fight history into one record for each fight
+    the lines of the fighter's own column are kept next to the opponent's
+    e.g. the two lines of KD into KD and OPPONENT KD
+    records are fighter, result, opponent, kd, opponent kd, str., opponent str., td, opponent td, sub., opponent sub.,
+    event, event date, method, method details, round, time, url of fight and url of fighter
+
+    arguments:
+    history_from_soup (list): list of fighter fight history from parse_fighter_history()
+    fighter (str): fighter of the page, the first value of the record from organise_fighter_tott_record()
+    url (str): url of fighter
+
+    returns:
+    a list of records of fighter fight history
+    '''
+    # create empty list to store records of fighter fight history
+    fighter_history_records = []
+
+    for fight_url, *texts in history_from_soup:
+        # pad rows of upcoming fights, which can have fewer columns
+        texts = (texts + [''] * 20)[:20]
+        result, _, _, opponent, kd, opponent_kd, strikes, opponent_strikes, td, opponent_td, sub, opponent_sub, event, event_date, method, method_details, round_, _, time, _ = texts
+        fighter_history_records.append([
+            fighter, result, opponent,
+            kd, opponent_kd, strikes, opponent_strikes, td, opponent_td, sub, opponent_sub,
+            event, event_date, method, method_details, round_, time,
+            fight_url, url
+        ])
+
+    # return
+    return fighter_history_records
+
+
+
 # reorder columns
 def move_columns(df: pd.DataFrame, cols_to_move: List[str], ref_col: str, place: str) -> pd.DataFrame:
     '''
@@ -636,4 +1222,208 @@ def move_columns(df: pd.DataFrame, cols_to_move: List[str], ref_col: str, place:
     seg3 = [i for i in cols if i not in seg1 + seg2]
 
     # return
-    return(df[seg1 + seg2 + seg3])
\ No newline at end of file
+    return(df[seg1 + seg2 + seg3])
+
+
+
+# get types of normalised fight stats columns
+def get_normalised_fight_stats_column_types(normalised_fight_stats_columns: Dict[str, List[str]]) -> Dict[str, str]:
+    '''
+    get the name and type of each column created by normalise_fight_stats()
+    landed and attempted columns, counts and seconds are int16, percentages are float32
+
+    arguments:
+    normalised_fight_stats_columns (dict): lists of fight stats columns by type, landed_attempted, percentage, time and count
+
+    returns:
+    a dict of column name to type
+    '''
+    column_types = {}
+    for column in normalised_fight_stats_columns['landed_attempted']:
+        column_types[column+' LANDED'] = 'Int16'
+        column_types[column+' ATTEMPTED'] = 'Int16'
+    for column in normalised_fight_stats_columns['percentage']:
+        column_types[column] = 'float32'
+    for column in normalised_fight_stats_columns['time']:
+        column_types[column+' SECONDS'] = 'Int16'
+    for column in normalised_fight_stats_columns['count']:
+        column_types[column] = 'Int16'
+
+    # return
+    return column_types
+
+
+
+# extract numbers from a column of text
+def extract_numbers(values: pd.Series, pattern: str) -> np.ndarray:
+    '''
+    extract the numbers captured by the groups of a regex pattern from every value of a column
+    stats repeat often, e.g. '0 of 0', so each unique value is matched once
+    and the numbers are copied to every row with numpy indexing
+    values that do not match, e.g. '---', give nans
+
+    arguments:
+    values (series): column of text values
+    pattern (str): regex pattern with a group for each number, e.g. r'^(\d+) of (\d+)$'
+
+    returns:
+    an array of floats with a row for each value and a column for each group
+    '''
+    # get code of each value and list of unique values
+    codes, uniques = pd.factorize(values.astype('string'))
+    # match unique values and convert groups to numbers
+    numbers = pd.Series(uniques, dtype='string').str.extract(pattern).astype('float64').to_numpy()
+    # add a row of nans for missing values, which have code -1
+    numbers = np.vstack([numbers, np.full((1, numbers.shape[1]), np.nan)])
+
+    # return
+    return numbers[codes]
+
+
+
+# normalise fight stats into numeric columns
+@METRICS.instrument
+def normalise_fight_stats(fight_stats_df: pd.DataFrame, normalised_fight_stats_columns: Dict[str, List[str]]) -> pd.DataFrame:
+    '''
+    convert text columns of fight stats into numeric columns
+    each column is converted at once with vectorised string methods and numpy indexing, not one cell at a time
+    landed_attempted columns, e.g. SIG.STR. '19 of 32', are split into SIG.STR. LANDED 19 and SIG.STR. ATTEMPTED 32
+    percentage columns, e.g. SIG.STR. % '59%', become fractions, 0.59
+    time columns, e.g. CTRL '2:13', become CTRL SECONDS 133
+    count columns, e.g. KD '1', become integers
+    missing stats, e.g. '---' or '--', become nulls
+    new columns take the place of the columns they replace, other columns are unchanged
+    columns that are already normalised keep their values, so a normalised df can be normalised again
+
+    arguments:
+    fight_stats_df (df): df of fight stats with text columns
+    normalised_fight_stats_columns (dict): lists of fight stats columns by type, landed_attempted, percentage, time and count
+
+    returns:
+    a df of fight stats with numeric columns
+    '''
+    column_types = get_normalised_fight_stats_column_types(normalised_fight_stats_columns)
+
+    # convert each column, keeping the order of columns
+    columns = {}
+    for column in fight_stats_df.columns:
+        values = fight_stats_df[column]
+        # split 'x of y' into landed and attempted
+        if column in normalised_fight_stats_columns['landed_attempted']:
+            landed_attempted = extract_numbers(values, r'^\s*(\d+) of (\d+)\s*$')
+            columns[column+' LANDED'] = pd.array(landed_attempted[:, 0]).astype(column_types[column+' LANDED'])
+            columns[column+' ATTEMPTED'] = pd.array(landed_attempted[:, 1]).astype(column_types[column+' ATTEMPTED'])
+        # keep percentages that are already fractions
+        elif column in normalised_fight_stats_columns['percentage'] and pd.api.types.is_numeric_dtype(values):
+            columns[column] = values.astype(column_types[column])
+        # convert 'x%' to a fraction
+        elif column in normalised_fight_stats_columns['percentage']:
+            percentage = extract_numbers(values, r'^\s*(\d+(?:\.\d+)?)%\s*$')[:, 0]
+            columns[column] = (percentage / 100).astype(column_types[column])
+        # convert 'm:ss' to seconds
+        elif column in normalised_fight_stats_columns['time']:
+            minutes_seconds = extract_numbers(values, r'^\s*(\d+):(\d+)\s*$')
+            seconds = minutes_seconds[:, 0] * 60 + minutes_seconds[:, 1]
+            columns[column+' SECONDS'] = pd.array(seconds).astype(column_types[column+' SECONDS'])
+        # convert counts to integers, counts read back from a csv file may be floats, e.g. 1.0
+        elif column in normalised_fight_stats_columns['count']:
+            columns[column] = pd.array(extract_numbers(values, r'^\s*(\d+)(?:\.0+)?\s*$')[:, 0]).astype(column_types[column])
+        # keep columns that are already normalised with their type, e.g. read back from a csv file as floats
+        elif column in column_types:
+            columns[column] = pd.to_numeric(values, errors='coerce').astype(column_types[column])
+        # keep other columns
+        else:
+            columns[column] = values
+
+    # return
+    return pd.DataFrame(columns, index=fight_stats_df.index)
+
+
+
+# accumulate records column by column
+class RecordAccumulator:
+    '''
+    accumulate records into lists of values, one list for each column
+    records are appended as they are parsed and converted to a df only once
+    this avoids growing a df one row or one pd.concat at a time, which slows down as the df grows
+    use flush() to convert records to a df in chunks and start again with empty lists
+    with compact columns, text values of categorical columns, e.g. EVENT and BOUT, are interned as they are appended
+    so each repeated value is held once, and they are converted to categoricals with the categories of STORE
+
+    arguments:
+    column_names (list): list of column names, each record has one value for each column
+    '''
+
+    def __init__(self, column_names: List[str]):
+        self.column_names = list(column_names)
+        self.columns = [[] for _ in self.column_names]
+        self.categorical_positions = [i for i, column in enumerate(self.column_names) if column in STORE.settings['categorical_column_names']]
+
+    def __len__(self) -> int:
+        return len(self.columns[0]) if self.columns else 0
+
+    # append one record
+    def append(self, record: list) -> None:
+        '''
+        append one record, the values of the record are in the order of column_names
+
+        arguments:
+        record (list): list of values
+
+        returns:
+        none
+        '''
+        if len(record) != len(self.column_names):
+            raise ValueError(f'record has {len(record)} values but there are {len(self.column_names)} columns')
+        if self.categorical_positions:
+            record = list(record)
+            for i in self.categorical_positions:
+                if type(record[i]) is str:
+                    record[i] = sys.intern(record[i])
+        for column, value in zip(self.columns, record):
+            column.append(value)
+
+    # append list of records
+    def extend(self, records: Iterable[list]) -> None:
+        '''
+        append a list of records
+
+        arguments:
+        records (list): list of records
+
+        returns:
+        none
+        '''
+        for record in records:
+            self.append(record)
+
+    # convert records to df
+    @METRICS.instrument
+    def to_df(self) -> pd.DataFrame:
+        '''
+        convert all accumulated records to a df, with categorical columns as categoricals with compact columns
+
+        arguments:
+        none
+
+        returns:
+        a df of records, with object columns when there are no records so .str works on text columns
+        '''
+        # without records pandas makes float64 columns
+        dtype = None if len(self) else object
+        return STORE.to_categorical_df(pd.DataFrame(dict(zip(self.column_names, self.columns)), columns=self.column_names, dtype=dtype))
+
+    # convert records to df and clear
+    def flush(self) -> pd.DataFrame:
+        '''
+        convert all accumulated records to a df and clear the accumulator
+
+        arguments:
+        none
+
+        returns:
+        a df of records
+        '''
+        df = self.to_df()
+        self.columns = [[] for _ in self.column_names]
+        return df
@@ -0,0 +1,235 @@
+'''
+Overview
+
+manifest of fingerprints for finding changed events and fights
+the manifest is a json file that records a fingerprint of each event page and of each fight on it
+{"events": {event url: {"fingerprint": ..., "fights": {fight url: fingerprint, ...}}}}
+
+a fight's fingerprint is a hash of its row on the event page, from LIB.parse_fight_fingerprints()
+the row includes the fighters and the result, so a fingerprint changes when a bout is changed or its result is overturned
+an event's fingerprint is a hash of the fingerprints of its fights, so it changes when a fight is added, removed or changed
+
+each run compares event pages of new and recent events with the manifest
+only events whose fingerprint changed are parsed again, and only their new or changed fights are fetched again
+
+the fighter index is a json file that records the hash of content of each alphabetical page of fighters and the fighter details on it
+{"pages": {alphabetical url: {"hash": ..., "fighters": [[FIRST, LAST, NICKNAME, URL], ...]}}}
+
+alphabetical pages whose hash has not changed are not parsed again, their fighter details are read from the index
+new fighters are found by checking the url of each fighter in the index against a set of parsed fighter urls
+
+'''
+
+# imports
+from typing import Dict, List, Set, Tuple
+import hashlib
+import json
+import os
+import pandas as pd
+
+
+
+# load manifest
+def load_manifest(file_name: str) -> dict:
+    '''
+    load manifest of fingerprints from file
+
+    arguments:
+    file_name (str): json file of manifest
+
+    returns:
+    a dict of manifest, with no events if the file does not exist
+    '''
+    if not os.path.exists(file_name):
+        return {'events': {}}
+
+    # return
+    with open(file_name) as file:
+        return json.load(file)
+
+
+
+# save manifest
+def save_manifest(manifest: dict, file_name: str) -> None:
+    '''
+    save manifest of fingerprints to file
+    the file is written under a temporary name and then renamed, so a failed run never leaves a partly written manifest
+
+    arguments:
+    manifest (dict): manifest of fingerprints
+    file_name (str): json file of manifest
+
+    returns:
+    none
+    '''
+    with open(file_name + '.tmp', 'w') as file:
+        json.dump(manifest, file, indent=1, sort_keys=True)
+    os.replace(file_name + '.tmp', file_name)
+
+
+
+# get fingerprint of event
+def get_event_fingerprint(fight_fingerprints: Dict[str, str]) -> str:
+    '''
+    get fingerprint of an event from the fingerprints of its fights, in order of fights on the page
+
+    arguments:
+    fight_fingerprints (dict): fight url to fingerprint, from LIB.parse_fight_fingerprints()
+
+    returns:
+    fingerprint of event
+    '''
+    fights = '\n'.join(f'{fight_url} {fingerprint}' for fight_url, fingerprint in fight_fingerprints.items())
+
+    # return
+    return hashlib.sha256(fights.encode()).hexdigest()[:16]
+
+
+
+# list recent events
+def list_recheck_events(event_details_df: pd.DataFrame, recheck_days: int) -> List[str]:
+    '''
+    list events held in the last recheck_days days
+    results of recent events are the most likely to change, e.g. overturned to a no contest
+
+    arguments:
+    event_details_df (df): event details with EVENT and DATE columns, e.g. 'November 19, 2022'
+    recheck_days (int): number of days events are checked for changes
+
+    returns:
+    a list of events
+    '''
+    event_dates = pd.to_datetime(event_details_df['DATE'], format='%B %d, %Y', errors='coerce')
+    first_date = pd.Timestamp.today().normalize() - pd.Timedelta(days=recheck_days)
+
+    # return
+    return list(event_details_df['EVENT'][event_dates >= first_date])
+
+
+
+# find changed fights of event
+def find_changed_fights(manifest: dict, event_url: str, fight_fingerprints: Dict[str, str], parsed_fight_urls: Set[str]) -> Tuple[bool, List[str]]:
+    '''
+    compare fingerprints of an event page with the manifest
+    an event that is not in the manifest yet is compared with the urls of its parsed fights
+    it is only changed if fights were added or removed, as the fingerprints of its fights are not known
+
+    arguments:
+    manifest (dict): manifest of fingerprints
+    event_url (str): url of event
+    fight_fingerprints (dict): fight url to fingerprint, from LIB.parse_fight_fingerprints()
+    parsed_fight_urls (set): urls of fights of the event that have been parsed
+
+    returns:
+    true if the event has changed, and a list of urls of fights that are new or changed
+    '''
+    manifest_event = manifest['events'].get(event_url)
+
+    # event is not in manifest, compare with parsed fights
+    if manifest_event is None:
+        new_fight_urls = [fight_url for fight_url in fight_fingerprints if fight_url not in parsed_fight_urls]
+        return set(fight_fingerprints) != parsed_fight_urls, new_fight_urls
+
+    # event has not changed
+    if manifest_event['fingerprint'] == get_event_fingerprint(fight_fingerprints):
+        return False, []
+
+    # return
+    return True, [fight_url for fight_url, fingerprint in fight_fingerprints.items() if manifest_event['fights'].get(fight_url) != fingerprint]
+
+
+
+# update event in manifest
+def update_manifest_event(manifest: dict, event_url: str, fight_fingerprints: Dict[str, str]) -> None:
+    '''
+    record fingerprints of an event page and its fights in the manifest
+
+    arguments:
+    manifest (dict): manifest of fingerprints
+    event_url (str): url of event
+    fight_fingerprints (dict): fight url to fingerprint, from LIB.parse_fight_fingerprints()
+
+    returns:
+    none
+    '''
+    manifest['events'][event_url] = {
+        'fingerprint': get_event_fingerprint(fight_fingerprints),
+        'fights': dict(fight_fingerprints),
+    }
+
+
+
+# load fighter index
+def load_fighter_index(file_name: str) -> dict:
+    '''
+    load index of fighters on alphabetical pages from file
+
+    arguments:
+    file_name (str): json file of fighter index
+
+    returns:
+    a dict of fighter index, with no pages if the file does not exist
+    '''
+    if not os.path.exists(file_name):
+        return {'pages': {}}
+
+    # return
+    with open(file_name) as file:
+        return json.load(file)
+
+
+
+# save fighter index
+def save_fighter_index(fighter_index: dict, file_name: str) -> None:
+    '''
+    save index of fighters on alphabetical pages to file
+    the file is written under a temporary name and then renamed, as in save_manifest()
+    records are written without indents as there is one for each fighter
+
+    arguments:
+    fighter_index (dict): fighter index
+    file_name (str): json file of fighter index
+
+    returns:
+    none
+    '''
+    with open(file_name + '.tmp', 'w') as file:
+        json.dump(fighter_index, file, sort_keys=True)
+    os.replace(file_name + '.tmp', file_name)
+
+
+
+# get hashes of alphabetical pages
+def get_fighter_page_hashes(fighter_index: dict) -> Dict[str, str]:
+    '''
+    get the hash of content of each alphabetical page when it was last parsed
+
+    arguments:
+    fighter_index (dict): fighter index
+
+    returns:
+    a dict of alphabetical url to hash of content
+    '''
+    # return
+    return {url: page['hash'] for url, page in fighter_index['pages'].items() if page['hash'] is not None}
+
+
+
+# update alphabetical page in fighter index
+def update_fighter_index_page(fighter_index: dict, url: str, content_hash: str, fighter_details_records: List[list]) -> None:
+    '''
+    record the hash of content of an alphabetical page and the fighter details parsed from it in the fighter index
+
+    arguments:
+    fighter_index (dict): fighter index
+    url (str): url of alphabetical page
+    content_hash (str): hash of content of page, from FETCH.get_page_hash(), none if it is not known
+    fighter_details_records (list): records of fighter details, from LIB.iter_fighter_details()
+
+    returns:
+    none
+    '''
+    fighter_index['pages'][url] = {
+        'hash': content_hash,
+        'fighters': [list(record) for record in fighter_details_records],
+    }
@@ -0,0 +1,514 @@
+'''
+Overview
+
+metrics of scraping runs
+counters and histograms of each stage of a run and of the library's fetch, soup, parse, organise and storage functions
+metrics are recorded in memory while the run goes and written once at the end of the run with finish_run()
+recording is off until configure(enabled=True), so the library can be used without metrics
+
+metrics
+stage_seconds{stage} - histogram of time of each stage of a run, e.g. check events or parse fighters
+function_seconds{function} - histogram of time of each call of an instrumented function, including functions it calls
+fetch_request_seconds{status} - histogram of time of each request to the network, to the headers for streamed pages
+fetch_pages_total{source} - counter of pages from the cache, revalidated not modified, or downloaded from the network
+fetch_bytes_total{source} - counter of bytes of pages by source
+soup_seconds{backend} - histogram of time of creating each soup
+store_seconds{operation, table} - histogram of time of reading, writing or appending each table
+
+metrics of pages parsed by parser processes are sent back with the parsed page and merged into the metrics of the main process
+
+formats
+jsonl - one json line per metric appended to the file with the time of the run, so runs can be compared over time
+prometheus - a textfile in the prometheus exposition format replaced on each run, e.g. for the node exporter textfile collector
+
+profiling
+a run can also be profiled with cProfile, or with pyinstrument if it is installed (pip install pyinstrument)
+both profile the main thread, pages fetched by fetch threads show up as time waiting for them
+
+'''
+
+# imports
+from typing import Callable, Dict, Iterator, List, Tuple
+from contextlib import contextmanager
+import functools
+import json
+import os
+import threading
+import time
+
+
+
+# metrics settings, update with configure()
+# enabled records metrics, otherwise instrumented functions are only called
+# metrics_file_name is the file metrics are written to at the end of a run, None does not write them
+# metrics_format is one of metrics_formats
+# profiler is one of profilers, None does not profile
+# profile_file_name is the file name of the profile without its extension
+settings = {
+    'enabled': False,
+    'metrics_file_name': None,
+    'metrics_format': 'jsonl',
+    'profiler': None,
+    'profile_file_name': 'ufc_profile',
+}
+
+# available formats of metrics files and profilers
+metrics_formats = ['jsonl', 'prometheus']
+profilers = ['cprofile', 'pyinstrument']
+
+# upper bounds of buckets of histograms in seconds
+histogram_buckets = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0]
+
+# prefix of names of metrics in prometheus textfiles
+prometheus_prefix = 'ufc_scraper_'
+
+# counters and histograms by name and labels, a histogram is a list of count, sum, max and counts of each bucket
+_counters: Dict[Tuple[str, tuple], float] = {}
+_histograms: Dict[Tuple[str, tuple], list] = {}
+_metrics_lock = threading.Lock()
+
+# current run, the current stage and its start of each thread, and the running profiler
+_run = {'started_at': None, 'stages': {}}
+_profiler = None
+
+
+
+# configure metrics settings
+def configure(enabled: bool = None, metrics_file_name: str = None, metrics_format: str = None, profiler: str = None, profile_file_name: str = None) -> None:
+    '''
+    update metrics settings
+
+    arguments:
+    enabled (bool): record metrics
+    metrics_file_name (str): file metrics are written to at the end of a run, an empty string does not write them
+    metrics_format (str): one of jsonl or prometheus
+    profiler (str): one of cprofile or pyinstrument, an empty string does not profile
+    profile_file_name (str): file name of the profile without its extension
+
+    returns:
+    none
+    '''
+    if enabled is not None:
+        settings['enabled'] = enabled
+    if metrics_file_name is not None:
+        settings['metrics_file_name'] = metrics_file_name or None
+    if metrics_format is not None:
+        if metrics_format not in metrics_formats:
+            raise ValueError(f'metrics_format must be one of {metrics_formats}, not {metrics_format}')
+        settings['metrics_format'] = metrics_format
+    if profiler is not None:
+        if profiler and profiler not in profilers:
+            raise ValueError(f'profiler must be one of {profilers}, not {profiler}')
+        settings['profiler'] = profiler or None
+    if profile_file_name is not None:
+        settings['profile_file_name'] = profile_file_name
+
+
+
+# clear metrics
+def reset() -> None:
+    '''
+    remove all recorded counters and histograms
+
+    arguments:
+    none
+
+    returns:
+    none
+    '''
+    with _metrics_lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+
+# add to counter
+def increment(name: str, value: float = 1, **labels) -> None:
+    '''
+    add value to a counter
+
+    arguments:
+    name (str): name of counter, e.g. fetch_bytes_total
+    value (float): amount added
+    labels: labels of counter, e.g. source='network'
+
+    returns:
+    none
+    '''
+    if not settings['enabled']:
+        return
+
+    key = (name, tuple(sorted(labels.items())))
+    with _metrics_lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+
+# add observation to histogram
+def observe(name: str, value: float, **labels) -> None:
+    '''
+    add an observation, e.g. seconds taken, to a histogram
+
+    arguments:
+    name (str): name of histogram, e.g. function_seconds
+    value (float): value observed
+    labels: labels of histogram, e.g. function='parse_fight_stats'
+
+    returns:
+    none
+    '''
+    if not settings['enabled']:
+        return
+
+    key = (name, tuple(sorted(labels.items())))
+    with _metrics_lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = [0, 0.0, 0.0, [0] * len(histogram_buckets)]
+        histogram[0] += 1
+        histogram[1] += value
+        histogram[2] = max(histogram[2], value)
+        # count observation in the first bucket it fits in, buckets are made cumulative when written
+        for i, bucket in enumerate(histogram_buckets):
+            if value <= bucket:
+                histogram[3][i] += 1
+                break
+
+
+
+# time block of code
+@contextmanager
+def timed(name: str, **labels) -> Iterator[None]:
+    '''
+    time a block of code and add its seconds to a histogram, also when the block raises or returns
+
+    arguments:
+    name (str): name of histogram, e.g. store_seconds
+    labels: labels of histogram
+
+    returns:
+    a context manager
+    '''
+    if not settings['enabled']:
+        yield
+        return
+
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - started_at, **labels)
+
+
+
+# instrument function
+def instrument(function: Callable) -> Callable:
+    '''
+    decorator that adds the seconds of each call of a function to function_seconds, labelled with the name of the function
+    the function is only called when metrics are not enabled
+
+    arguments:
+    function (function): function to instrument
+
+    returns:
+    the instrumented function
+    '''
+    name = function.__qualname__
+
+    @functools.wraps(function)
+    def instrumented_function(*args, **kwargs):
+        if not settings['enabled']:
+            return function(*args, **kwargs)
+        started_at = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            observe('function_seconds', time.perf_counter() - started_at, function=name)
+
+    # return
+    return instrumented_function
+
+
+
+# get snapshot of metrics
+def get_snapshot() -> dict:
+    '''
+    get a copy of the recorded counters and histograms, e.g. to send them from a parser process to the main process
+
+    arguments:
+    none
+
+    returns:
+    a dict of lists of counters and histograms
+    '''
+    with _metrics_lock:
+        snapshot = {
+            'counters': [(name, labels, value) for (name, labels), value in _counters.items()],
+            'histograms': [(name, labels, [count, total, maximum, list(buckets)]) for (name, labels), (count, total, maximum, buckets) in _histograms.items()],
+        }
+
+    # return
+    return snapshot
+
+
+
+# merge snapshot of metrics
+def merge(snapshot: dict) -> None:
+    '''
+    add counters and histograms of a snapshot from get_snapshot() to the recorded metrics
+
+    arguments:
+    snapshot (dict): snapshot of metrics
+
+    returns:
+    none
+    '''
+    if not settings['enabled']:
+        return
+
+    with _metrics_lock:
+        for name, labels, value in snapshot['counters']:
+            _counters[(name, labels)] = _counters.get((name, labels), 0) + value
+        for name, labels, (count, total, maximum, buckets) in snapshot['histograms']:
+            histogram = _histograms.get((name, labels))
+            if histogram is None:
+                histogram = _histograms[(name, labels)] = [0, 0.0, 0.0, [0] * len(histogram_buckets)]
+            histogram[0] += count
+            histogram[1] += total
+            histogram[2] = max(histogram[2], maximum)
+            histogram[3] = [a + b for a, b in zip(histogram[3], buckets)]
+
+
+
+# start run
+def start_run() -> None:
+    '''
+    start recording a run, clearing metrics of any previous run and starting the profiler if one is set
+
+    arguments:
+    none
+
+    returns:
+    none
+    '''
+    global _profiler
+
+    reset()
+    _run.update(started_at=time.time(), stages={})
+
+    # start profiler
+    if settings['profiler'] == 'cprofile':
+        import cProfile
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+    elif settings['profiler'] == 'pyinstrument':
+        try:
+            from pyinstrument import Profiler
+        except ImportError as error:
+            raise ImportError('profiler pyinstrument needs pyinstrument, pip install pyinstrument') from error
+        _profiler = Profiler()
+        _profiler.start()
+
+
+
+# start stage of run
+def start_stage(stage: str) -> None:
+    '''
+    end the current stage of the run, adding its seconds to stage_seconds, and start the next stage
+    each thread has its own current stage, so chains of stages that run at the same time in threads are timed on their own
+
+    arguments:
+    stage (str): name of stage, none only ends the current stage
+
+    returns:
+    none
+    '''
+    now = time.perf_counter()
+    with _metrics_lock:
+        current_stage = _run['stages'].pop(threading.get_ident(), None)
+        if stage is not None:
+            _run['stages'][threading.get_ident()] = (stage, now)
+    if current_stage is not None:
+        observe('stage_seconds', now - current_stage[1], stage=current_stage[0])
+
+
+
+# finish run
+def finish_run() -> None:
+    '''
+    end the last stage of the run, stop the profiler and write the profile, and write the metrics
+    print a summary of where the run spent its time
+
+    arguments:
+    none
+
+    returns:
+    none
+    '''
+    global _profiler
+
+    # end the current stage of every thread
+    now = time.perf_counter()
+    with _metrics_lock:
+        current_stages = list(_run['stages'].values())
+        _run['stages'].clear()
+    for stage, stage_started_at in current_stages:
+        observe('stage_seconds', now - stage_started_at, stage=stage)
+
+    # stop profiler and write profile
+    if _profiler is not None:
+        if settings['profiler'] == 'cprofile':
+            import pstats
+            _profiler.disable()
+            _profiler.dump_stats(settings['profile_file_name'] + '.prof')
+            pstats.Stats(_profiler).sort_stats('cumulative').print_stats(20)
+            print(f'profile written to {settings["profile_file_name"]}.prof')
+        else:
+            _profiler.stop()
+            with open(settings['profile_file_name'] + '.html', 'w') as file:
+                file.write(_profiler.output_html())
+            print(f'profile written to {settings["profile_file_name"]}.html')
+        _profiler = None
+
+    if not settings['enabled']:
+        return
+
+    print_summary()
+    if settings['metrics_file_name']:
+        write_metrics(settings['metrics_file_name'], settings['metrics_format'])
+        print(f'metrics written to {settings["metrics_file_name"]}')
+
+
+
+# print summary of metrics
+def print_summary(number_of_functions: int = 15) -> None:
+    '''
+    print seconds of each stage, the functions and requests with the most total seconds, and pages and bytes fetched by source
+
+    arguments:
+    number_of_functions (int): number of functions printed
+
+    returns:
+    none
+    '''
+    with _metrics_lock:
+        histograms = {key: (count, total) for key, (count, total, _, _) in _histograms.items()}
+        counters = dict(_counters)
+
+    print(f'{"stage":<48} {"seconds":>10}')
+    for (name, labels), (_, total) in histograms.items():
+        if name == 'stage_seconds':
+            print(f'{dict(labels)["stage"]:<48} {total:>10.2f}')
+
+    print(f'{"function":<48} {"calls":>8} {"seconds":>10} {"ms/call":>9}')
+    functions = sorted(((key, value) for key, value in histograms.items() if key[0] != 'stage_seconds'), key=lambda item: -item[1][1])
+    for (name, labels), (count, total) in functions[:number_of_functions]:
+        label = name if name != 'function_seconds' else ''
+        label = ' '.join([label] + [str(value) for _, value in labels]).strip()
+        print(f'{label:<48} {count:>8} {total:>10.2f} {1000 * total / count:>9.2f}')
+
+    for (name, labels), value in counters.items():
+        if name.startswith('fetch_'):
+            print(f'{name} {dict(labels)}: {value:.0f}')
+
+
+
+# write metrics to file
+def write_metrics(file_name: str, metrics_format: str = 'jsonl') -> None:
+    '''
+    write the recorded counters and histograms
+    jsonl appends one line per metric to the file, with the time the run started
+    prometheus replaces the file with a textfile in the prometheus exposition format, written under a temporary name and renamed
+
+    arguments:
+    file_name (str): file metrics are written to
+    metrics_format (str): one of jsonl or prometheus
+
+    returns:
+    none
+    '''
+    with _metrics_lock:
+        counters = sorted(_counters.items())
+        histograms = sorted((key, (count, total, maximum, list(buckets))) for key, (count, total, maximum, buckets) in _histograms.items())
+    run_started_at = _run['started_at'] or time.time()
+
+    # json lines
+    if metrics_format == 'jsonl':
+        with open(file_name, 'a') as file:
+            for (name, labels), value in counters:
+                file.write(json.dumps({'run_started_at': run_started_at, 'type': 'counter', 'name': name, 'labels': dict(labels), 'value': value}) + '\n')
+            for (name, labels), (count, total, maximum, buckets) in histograms:
+                file.write(json.dumps({
+                    'run_started_at': run_started_at, 'type': 'histogram', 'name': name, 'labels': dict(labels),
+                    'count': count, 'sum': total, 'max': maximum,
+                    'buckets': {str(bucket): number for bucket, number in zip(histogram_buckets, get_cumulative_counts(buckets))},
+                }) + '\n')
+        return
+
+    # prometheus textfile
+    lines = []
+    for metric_type, metrics in [('counter', counters), ('histogram', histograms)]:
+        for name in sorted({name for (name, _), _ in metrics}):
+            lines.append(f'# TYPE {prometheus_prefix}{name} {metric_type}')
+            for (metric_name, labels), value in metrics:
+                if metric_name != name:
+                    continue
+                if metric_type == 'counter':
+                    lines.append(f'{prometheus_prefix}{name}{format_labels(labels)} {value}')
+                    continue
+                count, total, _, buckets = value
+                for bucket, number in zip(histogram_buckets, get_cumulative_counts(buckets)):
+                    lines.append(f'{prometheus_prefix}{name}_bucket{format_labels(labels + (("le", str(bucket)),))} {number}')
+                lines.append(f'{prometheus_prefix}{name}_bucket{format_labels(labels + (("le", "+Inf"),))} {count}')
+                lines.append(f'{prometheus_prefix}{name}_sum{format_labels(labels)} {total}')
+                lines.append(f'{prometheus_prefix}{name}_count{format_labels(labels)} {count}')
+    lines.append(f'# TYPE {prometheus_prefix}run_started_at_seconds gauge')
+    lines.append(f'{prometheus_prefix}run_started_at_seconds {run_started_at}')
+    with open(file_name + '.tmp', 'w') as file:
+        file.write('\n'.join(lines) + '\n')
+    os.replace(file_name + '.tmp', file_name)
+
+
+
+# get cumulative counts of buckets
+def get_cumulative_counts(buckets: List[int]) -> List[int]:
+    '''
+    get the number of observations at or below each bucket from the number in each bucket
+
+    arguments:
+    buckets (list): number of observations in each bucket
+
+    returns:
+    a list of cumulative numbers of observations
+    '''
+    cumulative_counts = []
+    number = 0
+    for bucket_count in buckets:
+        number += bucket_count
+        cumulative_counts.append(number)
+
+    # return
+    return cumulative_counts
+
+
+
+# format labels for prometheus
+def format_labels(labels: tuple) -> str:
+    '''
+    format labels of a metric for a prometheus textfile, e.g. {function="parse_bout"}
+
+    arguments:
+    labels (tuple): tuples of name and value of labels
+
+    returns:
+    labels as text, empty if there are no labels
+    '''
+    if not labels:
+        return ''
+    escaped_labels = [
+        f'{name}="' + str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+        for name, value in labels
+    ]
+
+    # return
+    return '{' + ','.join(escaped_labels) + '}'
@@ -0,0 +1,964 @@
+'''
+Overview
+
+pipeline for scraping ufc stats
+fetching and parsing pages run as separate stages so parsing can use every core
+
+fetch threads from scrape_ufc_stats_fetch download raw pages ahead of the parse stage
+raw pages are handed to a pool of parser processes that turn each page into records
+records are yielded in the same order as the urls to a single writer, the caller
+only a bounded number of pages are fetched ahead and parsed ahead of the writer
+so memory stays flat however long the list of urls is
+
+a full backfill of all historical data can be run from the command line with checkpoints in a job journal
+records are flushed to the journal in chunks as they are parsed, and written to the output tables at the end
+a backfill that is stopped, e.g. by a crash or a network error, picks up where it stopped with --resume
+python scrape_ufc_stats_pipeline.py
+python scrape_ufc_stats_pipeline.py --resume
+
+each stage has a parser version, and the config keys that change its output, recorded with the tables in a json file
+when the parsing of a stage or its columns change, its pages are parsed again from the page cache, which keeps the raw html of every page
+only the tables of those stages are rewritten, with the same rows in the same order, e.g. a change to fight stats rewrites the tables of fights
+python scrape_ufc_stats_runner.py reparse
+
+'''
+
+# imports
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+import pandas as pd
+from tqdm import tqdm
+
+# import library
+import scrape_ufc_stats_library as LIB
+import scrape_ufc_stats_fetch as FETCH
+import scrape_ufc_stats_soup as SOUP
+import scrape_ufc_stats_storage as STORE
+import scrape_ufc_stats_manifest as MANIFEST
+import scrape_ufc_stats_journal as JOURNAL
+import scrape_ufc_stats_career as CAREER
+import scrape_ufc_stats_changes as CHANGES
+import scrape_ufc_stats_metrics as METRICS
+
+
+
+# pipeline settings, update with configure()
+# start_method is how parser processes are started, fork by default on linux
+# forkserver is used when stages run at the same time in threads, as forking a process while other threads hold locks is not safe
+settings = {
+    'start_method': None,
+}
+
+# version of the parsing of each stage, raise the version of a stage when a change to the library changes what it parses
+# e.g. raise fight after a fix to LIB.parse_fight_stats, so python scrape_ufc_stats_runner.py reparse parses fight pages again from the page cache
+parser_versions = {
+    'events': 1,
+    'event': 1,
+    'fight': 1,
+    'fighters': 1,
+    'fighter': 2,
+}
+
+# keys of the config that change what each stage parses
+stage_config_keys = {
+    'events': ['id_columns'],
+    'event': ['fight_details_column_names', 'id_columns'],
+    'fight': ['fight_results_column_names', 'fight_stats_column_names', 'totals_column_names', 'significant_strikes_column_names', 'normalise_fight_stats', 'normalised_fight_stats_columns', 'id_columns'],
+    'fighters': ['fighter_details_column_names', 'id_columns'],
+    'fighter': ['fighter_tott_column_names', 'fighter_history', 'fighter_averages_column_names', 'fighter_history_column_names', 'id_columns'],
+}
+
+# keys of the config of file names of the tables written from each stage
+stage_tables = {
+    'events': ['event_details_file_name'],
+    'event': ['fight_details_file_name'],
+    'fight': ['fight_details_file_name', 'fight_results_file_name', 'fight_stats_file_name'],
+    'fighters': ['fighter_details_file_name'],
+    'fighter': ['fighter_tott_file_name', 'fighter_averages_file_name', 'fighter_history_file_name'],
+}
+
+
+
+# configure pipeline settings
+def configure(start_method: str = None) -> None:
+    '''
+    update pipeline settings
+
+    arguments:
+    start_method (str): one of the start methods of multiprocessing, e.g. fork, forkserver or spawn
+
+    returns:
+    none
+    '''
+    if start_method is not None:
+        if start_method not in multiprocessing.get_all_start_methods():
+            raise ValueError(f'start_method must be one of {multiprocessing.get_all_start_methods()}, not {start_method}')
+        settings['start_method'] = start_method
+
+
+
+# set up parser process
+def init_parser_process(parser_backend: str, metrics_enabled: bool) -> None:
+    '''
+    set up a new parser process with the parser backend and metrics settings of the main process
+    processes started with forkserver or spawn do not inherit the settings of the main process
+
+    arguments:
+    parser_backend (str): parser backend of main process
+    metrics_enabled (bool): record metrics while parsing
+
+    returns:
+    none
+    '''
+    SOUP.configure(parser_backend)
+    METRICS.configure(enabled=metrics_enabled)
+
+
+
+# get column names of fight results and fight stats
+def get_fight_column_names(config: dict) -> Tuple[List[str], List[str]]:
+    '''
+    get the column names of the records of fight results and fight stats returned by parse_fight_page()
+    with id_columns, the records end with the ids of events, fights and fighters parsed from fight pages
+
+    arguments:
+    config (dict): config from scrape_ufc_stats_config.yaml
+
+    returns:
+    column names of fight results and of fight stats
+    '''
+    if not config['id_columns']:
+        return config['fight_results_column_names'], config['fight_stats_column_names']
+
+    # return
+    return config['fight_results_column_names'] + LIB.fight_results_id_column_names, config['fight_stats_column_names'] + LIB.fight_stats_id_column_names
+
+
+
+# parse page of all events into event details
+def parse_events_page(page: bytes, url: str) -> Dict[str, list]:
+    '''
+    parse event details from the raw content of the page of all events in a single pass, without building a soup
+
+    arguments:
+    page (bytes): raw content of page of all events
+    url (str): url of page
+
+    returns:
+    a dict of column name to list of values of event details
+    '''
+    event_details_records = LIB.RecordAccumulator(LIB.event_details_column_names)
+    event_details_records.extend(LIB.iter_event_details([page]))
+
+    # return
+    return event_details_records.to_df().to_dict('list')
+
+
+
+# parse event page into fight details
+def parse_event_page(page: bytes, url: str) -> Tuple[Dict[str, list], Dict[str, str]]:
+    '''
+    parse fight details and fingerprints of fights from the raw content of an event page
+
+    arguments:
+    page (bytes): raw content of event page
+    url (str): url of event
+
+    returns:
+    a dict of column name to list of values of fight details, and a dict of fight url to fingerprint
+    '''
+    # create soup
+    soup = SOUP.make_soup(page)
+
+    # return
+    return LIB.parse_fight_details(soup).to_dict('list'), LIB.parse_fight_fingerprints(soup)
+
+
+
+# parse fight page into records
+def parse_fight_page(page: bytes, url: str, totals_column_names: List[str], significant_strikes_column_names: List[str], id_columns: bool = False) -> Tuple[str, List[str], List[list]]:
+    '''
+    parse bout, fight results and fight stats from the raw content of a fight page
+    runs in a parser process, so only plain records are returned
+
+    arguments:
+    page (bytes): raw content of fight page
+    url (str): url of fight
+    totals_column_names (list): list of column names for totals type stats
+    significant_strikes_column_names (list): list of column names for significant strike type stats
+    id_columns (bool): add ids of event, fight and fighters to records
+
+    returns:
+    bout, a record of fight results and a list of records of fight stats
+    '''
+    # create soup
+    soup = SOUP.make_soup(page)
+    # parse fight results and fight stats into records
+    fight_results_record, fight_stats_records = LIB.parse_organise_fight_results_and_stats_records(
+        soup,
+        url,
+        totals_column_names,
+        significant_strikes_column_names,
+        id_columns
+    )
+
+    # return
+    return LIB.parse_bout(soup), fight_results_record, fight_stats_records
+
+
+
+# parse fighter page into records
+def parse_fighter_page(page: bytes, url: str, fighter_history: bool = False) -> Tuple[List[str], Optional[List[str]], List[list]]:
+    '''
+    parse fighter tale of the tape, and with fighter_history career averages and fight history, from the raw content of a fighter page
+    runs in a parser process, so only plain records are returned
+
+    arguments:
+    page (bytes): raw content of fighter page
+    url (str): url of fighter
+    fighter_history (bool): parse career averages and fight history of the same page
+
+    returns:
+    a record of fighter tale of the tape, a record of career averages and a list of records of fight history
+    career averages are none and fight history is empty without fighter_history
+    '''
+    # create soup
+    soup = SOUP.make_soup(page)
+    # parse tale of the tape
+    fighter_tott_record = LIB.organise_fighter_tott_record(LIB.parse_fighter_tott(soup), url)
+    if not fighter_history:
+        return fighter_tott_record, None, []
+
+    # parse career averages and fight history, fight history gets the fighter of the tale of the tape
+    fighter_averages_record = LIB.organise_fighter_tott_record(LIB.parse_fighter_averages(soup), url)
+    fighter_history_records = LIB.organise_fighter_history_records(LIB.parse_fighter_history(soup), fighter_tott_record[0], url)
+
+    # return
+    return fighter_tott_record, fighter_averages_record, fighter_history_records
+
+
+
+# parse alphabetical page into fighter details
+def parse_fighters_page(page: bytes, url: str, fighter_details_column_names: List[str]) -> Dict[str, list]:
+    '''
+    parse fighter details from the raw content of an alphabetical page of fighters in a single pass, without building a soup
+
+    arguments:
+    page (bytes): raw content of alphabetical page
+    url (str): url of page
+    fighter_details_column_names (list): list of column names of fighter details
+
+    returns:
+    a dict of column name to list of values of fighter details
+    '''
+    fighter_details_records = LIB.RecordAccumulator(fighter_details_column_names)
+    fighter_details_records.extend(LIB.iter_fighter_details([page]))
+
+    # return
+    return fighter_details_records.to_df().to_dict('list')
+
+
+
+# parse alphabetical page into fighter details and hash of page
+def parse_fighters_page_with_hash(page: bytes, url: str, fighter_details_column_names: List[str]) -> Tuple[str, Dict[str, list]]:
+    '''
+    parse fighter details from the raw content of an alphabetical page of fighters, with the hash of its content for the fighter index
+    the hash is the sha256 hex digest the page cache keys content by, so the page is not read from the cache again for its hash
+
+    arguments:
+    page (bytes): raw content of alphabetical page
+    url (str): url of page
+    fighter_details_column_names (list): list of column names of fighter details
+
+    returns:
+    sha256 hex digest of page and a dict of column name to list of values of fighter details
+    '''
+    # return
+    return hashlib.sha256(page).hexdigest(), parse_fighters_page(page, url, fighter_details_column_names)
+
+
+
+# parse page and collect its metrics
+def parse_page_with_metrics(parse_function: Callable, page: bytes, url: str, *args) -> Tuple[object, dict]:
+    '''
+    parse a page in a parser process with parse_function and get the metrics recorded while it was parsed
+    the metrics are merged into the metrics of the main process, which writes them at the end of the run
+
+    arguments:
+    parse_function (function): module level function that takes the page, url and args
+    page (bytes): raw content of page
+    url (str): url of page
+    args: extra arguments of parse_function
+
+    returns:
+    output of parse_function and a snapshot of metrics from METRICS.get_snapshot()
+    '''
+    METRICS.reset()
+    output = parse_function(page, url, *args)
+
+    # return
+    return output, METRICS.get_snapshot()
+
+
+
+# fetch and parse pages
+def iter_parsed_pages(urls: List[str], parse_function: Callable, args: tuple = (), workers: int = 0, on_fetched: Callable = None, quarantine: bool = False) -> Iterator:
+    '''
+    fetch pages from a list of urls and parse each page with parse_function(page, url, *args)
+    pages are fetched concurrently by the fetch threads
+    with workers > 0 pages are parsed by a pool of that many parser processes, otherwise they are parsed in this process
+    outputs are yielded in the same order as the urls
+    at most workers * 2 pages are waiting to be parsed, the rest wait to be fetched, which limits memory
+    with metrics enabled, metrics of pages parsed by parser processes are merged into the metrics of this process
+    with quarantine a page that could not be fetched is added to the retry queue of scrape_ufc_stats_fetch and none is yielded in its place
+
+    arguments:
+    urls (list): list of urls of pages
+    parse_function (function): module level function that takes the page, url and args
+    args (tuple): extra arguments of parse_function
+    workers (int): number of parser processes, 0 parses in this process
+    on_fetched (function): called with the url of each page once it is fetched, before it is parsed
+    quarantine (bool): skip pages that could not be fetched instead of raising
+
+    returns:
+    an iterator of outputs of parse_function, or none for quarantined pages
+    '''
+    # parse in this process
+    if not workers:
+        for url, page in zip(urls, FETCH.iter_pages(urls, quarantine=quarantine)):
+            if page is None:
+                yield None
+                continue
+            if on_fetched:
+                on_fetched(url)
+            yield parse_function(page, url, *args)
+        return
+
+    # get output of a parsed page, merging metrics recorded by its parser process
+    collect_metrics = METRICS.settings['enabled']
+    def get_output(future):
+        if future is None:
+            return None
+        if not collect_metrics:
+            return future.result()
+        output, snapshot = future.result()
+        METRICS.merge(snapshot)
+        return output
+
+    # parse in a pool of parser processes using the same parser backend as this process
+    with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context(settings['start_method']),
+            initializer=init_parser_process,
+            initargs=(SOUP.settings['parser_backend'], collect_metrics)
+            ) as executor:
+        # start parser processes before the fetch threads start, so no fetch thread is running when they are forked
+        executor.submit(int).result()
+        # queue of futures of parsed pages in order of urls
+        futures = deque()
+        for url, page in zip(urls, FETCH.iter_pages(urls, quarantine=quarantine)):
+            # quarantined pages keep their place in the queue
+            if page is None:
+                futures.append(None)
+            else:
+                if on_fetched:
+                    on_fetched(url)
+                if collect_metrics:
+                    futures.append(executor.submit(parse_page_with_metrics, parse_function, page, url, *args))
+                else:
+                    futures.append(executor.submit(parse_function, page, url, *args))
+            # yield oldest parsed page once the queue is full, this holds back fetching until the writer catches up
+            if len(futures) >= workers * 2:
+                yield get_output(futures.popleft())
+        # yield remaining parsed pages
+        while futures:
+            yield get_output(futures.popleft())
+
+
+
+# run stage of backfill
+def run_stage(journal: JOURNAL.Journal, stage: str, urls: List[str], parse_function: Callable, args: tuple = (), workers: int = 0, chunk_size: int = 100) -> None:
+    '''
+    fetch and parse the urls of a stage that are not parsed yet, recording progress in the journal
+    urls are added to the journal the first time the stage runs, later runs only parse urls left pending or fetched
+    outputs are flushed to the journal every chunk_size urls
+    pages that could not be fetched are quarantined and retried once after the other urls
+    pages still missing stop the backfill, with the parsed pages kept in the journal
+
+    arguments:
+    journal (journal): job journal of the backfill
+    stage (str): name of stage
+    urls (list): list of urls of stage
+    parse_function (function): module level function that takes the page, url and args
+    args (tuple): extra arguments of parse_function
+    workers (int): number of parser processes, 0 parses in this process
+    chunk_size (int): number of urls parsed between flushes to the journal
+
+    returns:
+    none
+    '''
+    # add urls of stage
+    journal.add_urls(stage, urls)
+    METRICS.start_stage(stage)
+
+    # fetch and parse urls not parsed yet, then give urls quarantined in the first pass one more pass
+    for _ in range(2):
+        unparsed_urls = journal.list_urls(stage, ['pending', 'fetched'])
+        if not unparsed_urls:
+            break
+        FETCH.release_quarantined_urls(unparsed_urls)
+
+        # create empty lists to store fetched urls and outputs of the current chunk
+        fetched_urls = []
+        outputs = []
+        # loop through outputs of each url and flush them to the journal in chunks, quarantined pages have no output
+        parsed_outputs = iter_parsed_pages(unparsed_urls, parse_function, args, workers, fetched_urls.append, quarantine=True)
+        for url, output in tqdm(zip(unparsed_urls, parsed_outputs), desc=stage, total=len(urls), initial=len(urls) - len(unparsed_urls)):
+            if output is None:
+                continue
+            outputs.append((url, output))
+            if len(outputs) >= chunk_size:
+                journal.save_outputs(stage, outputs, fetched_urls)
+                fetched_urls.clear()
+                outputs.clear()
+        # flush last chunk
+        journal.save_outputs(stage, outputs, fetched_urls)
+
+    # stop before writing tables with missing pages, the pages are fetched again with --resume
+    unparsed_urls = journal.list_urls(stage, ['pending', 'fetched'])
+    if unparsed_urls:
+        quarantined_urls = FETCH.list_quarantined_urls()
+        raise RuntimeError(
+            f'{len(unparsed_urls)} pages of stage {stage} could not be fetched, '
+            f'e.g. {unparsed_urls[0]} ({quarantined_urls.get(unparsed_urls[0])}), run again with --resume'
+        )
+
+
+
+# start backfill
+def start_backfill(config: dict, resume: bool = False) -> bool:
+    '''
+    start a new backfill in the job journal, config['journal_file_name'], or continue the previous one
+    with resume the backfill continues from the journal of the previous run, otherwise the journal is cleared first
+
+    arguments:
+    config (dict): config from scrape_ufc_stats_config.yaml
+    resume (bool): continue the previous backfill
+
+    returns:
+    true if the backfill has stages left to run, false if the previous backfill is already complete
+    '''
+    journal = JOURNAL.Journal(config['journal_file_name'])
+    try:
+        # start a new backfill, or continue the previous one
+        if not resume or journal.get_value('started_at') is None:
+            journal.reset()
+            journal.set_value('started_at', time.time())
+        elif journal.get_value('finished_at') is not None:
+            print('backfill is already complete, run without --resume to start a new backfill')
+            return False
+        else:
+            print('resuming backfill', journal.count_states())
+    finally:
+        journal.close()
+
+    # return
+    return True
+
+
+
+# backfill events and fights
+def backfill_fights(config: dict, workers: int = 0, chunk_size: int = 100) -> None:
+    '''
+    parse all past events and fights and write the tables of events and fights and the manifest
+    stages already written in the journal are skipped
+    the journal is opened on its own connection, so the fights and fighters of a backfill can run at the same time in threads
+
+    arguments:
+    config (dict): config from scrape_ufc_stats_config.yaml
+    workers (int): number of parser processes, 0 parses in this process
+    chunk_size (int): number of urls parsed between flushes to the journal
+
+    returns:
+    none
+    '''
+    journal = JOURNAL.Journal(config['journal_file_name'])
+    try:
+        if not journal.is_written('fight'):
+            # parse event details
+            run_stage(journal, 'events', [config['completed_events_all_url']], parse_events_page)
+            event_details_df = pd.concat([pd.DataFrame(output) for _, output in journal.iter_outputs('events')], ignore_index=True)
+
+            # parse fight details and fingerprints of fights of each event
+            run_stage(journal, 'event', list(event_details_df['URL']), parse_event_page, (), workers, chunk_size)
+            # create empty manifest to store fingerprints of event pages and fights
+            list_of_fight_details_dfs = [pd.DataFrame(columns=config['fight_details_column_names'])]
+            manifest = {'events': {}}
+            for url, (fight_details, fight_fingerprints) in journal.iter_outputs('event'):
+                list_of_fight_details_dfs.append(pd.DataFrame(fight_details))
+                MANIFEST.update_manifest_event(manifest, url, fight_fingerprints)
+            all_fight_details_df = pd.concat(list_of_fight_details_dfs, ignore_index=True)
+
+            # parse bout, fight results and fight stats of each fight
+            run_stage(
+                journal,
+                'fight',
+                list(all_fight_details_df['URL']),
+                parse_fight_page,
+                (config['totals_column_names'], config['significant_strikes_column_names'], config['id_columns']),
+                workers,
+                chunk_size
+            )
+            bouts = {}
+            fight_results_column_names, fight_stats_column_names = get_fight_column_names(config)
+            fight_results_records = LIB.RecordAccumulator(fight_results_column_names)
+            fight_stats_records = LIB.RecordAccumulator(fight_stats_column_names)
+            for url, (bout, fight_results_record, fight_stats_record_list) in journal.iter_outputs('fight'):
+                bouts[url] = bout
+                fight_results_records.append(fight_results_record)
+                fight_stats_records.extend(fight_stats_record_list)
+            all_fight_results_df = fight_results_records.to_df()
+            all_fight_stats_df = fight_stats_records.to_df()
+
+            # normalise fight stats into numeric columns
+            if config['normalise_fight_stats']:
+                all_fight_stats_df = LIB.normalise_fight_stats(all_fight_stats_df, config['normalised_fight_stats_columns'])
+
+            # fill in bouts of fight details
+            all_fight_details_df['BOUT'] = all_fight_details_df['URL'].map(bouts)
+
+            # write tables of events and fights, and fingerprints of event pages and fights
+            event_years = STORE.get_event_years(event_details_df)
+            STORE.write_table(event_details_df, config['event_details_file_name'])
+            STORE.write_table(all_fight_details_df, config['fight_details_file_name'], event_years)
+            STORE.write_table(all_fight_results_df, config['fight_results_file_name'], event_years)
+            STORE.write_table(all_fight_stats_df, config['fight_stats_file_name'], event_years)
+            MANIFEST.save_manifest(manifest, config['manifest_file_name'])
+            journal.mark_written(['events', 'event', 'fight'])
+    finally:
+        journal.close()
+
+
+
+# backfill fighters
+def backfill_fighters(config: dict, workers: int = 0, chunk_size: int = 100) -> None:
+    '''
+    parse all fighters and write the tables of fighters
+    stages already written in the journal are skipped
+    the journal is opened on its own connection, so the fights and fighters of a backfill can run at the same time in threads
+
+    arguments:
+    config (dict): config from scrape_ufc_stats_config.yaml
+    workers (int): number of parser processes, 0 parses in this process
+    chunk_size (int): number of urls parsed between flushes to the journal
+
+    returns:
+    none
+    '''
+    journal = JOURNAL.Journal(config['journal_file_name'])
+    try:
+        if not journal.is_written('fighter'):
+            # parse fighter details from each alphabetical page
+            run_stage(journal, 'fighters', LIB.generate_alphabetical_urls(), parse_fighters_page, (config['fighter_details_column_names'],))
+            all_fighter_details_df = pd.concat([pd.DataFrame(output) for _, output in journal.iter_outputs('fighters')])
+
+            # parse tale of the tape, career averages and fight history of each fighter
+            run_stage(journal, 'fighter', list(all_fighter_details_df['URL']), parse_fighter_page, (config['fighter_history'],), workers, chunk_size)
+            fighter_tott_records = LIB.RecordAccumulator(config['fighter_tott_column_names'])
+            fighter_averages_records = LIB.RecordAccumulator(config['fighter_averages_column_names'])
+            fighter_history_records = LIB.RecordAccumulator(config['fighter_history_column_names'])
+            for _, (fighter_tott_record, fighter_averages_record, fighter_history_record_list) in journal.iter_outputs('fighter'):
+                fighter_tott_records.append(fighter_tott_record)
+                if config['fighter_history']:
+                    fighter_averages_records.append(fighter_averages_record)
+                    fighter_history_records.extend(fighter_history_record_list)
+
+            # write tables of fighters
+            STORE.write_table(all_fighter_details_df, config['fighter_details_file_name'])
+            STORE.write_table(fighter_tott_records.to_df(), config['fighter_tott_file_name'])
+            if config['fighter_history']:
+                STORE.write_table(fighter_averages_records.to_df(), config['fighter_averages_file_name'])
+                STORE.write_table(fighter_history_records.to_df(), config['fighter_history_file_name'])
+            journal.mark_written(['fighters', 'fighter'])
+    finally:
+        journal.close()
+
+
+
+# finish backfill
+def finish_backfill(config: dict) -> None:
+    '''
+    compute career stats of all fighters from the written tables, record the parser versions of the tables and mark the backfill finished in the journal
+
+    arguments:
+    config (dict): config from scrape_ufc_stats_config.yaml
+
+    returns:
+    none
+    '''
+    if config['fighter_career_stats']:
+        METRICS.start_stage('careers')
+        CAREER.update_career_stats(config)
+
+    # all tables are written with the current parser
+    save_parser_versions(config, list(parser_versions))
+
+    journal = JOURNAL.Journal(config['journal_file_name'])
+    journal.set_value('finished_at', time.time())
+    print('backfill is complete', journal.count_states())
+    journal.close()
+
+
+
+# backfill all historical data
+def backfill(config: dict, resume: bool = False, workers: int = 0, chunk_size: int = 100) -> None:
+    '''
+    parse all past events, fights and fighters and write them to the output tables
+    the same output as the notebooks scrape_ufc_stats_all_historical_data.ipynb and scrape_ufc_stats_fighter_tott.ipynb
+    progress is checkpointed in the job journal, config['journal_file_name']
+    records of each stage are kept in the journal until the tables of the stage are written
+    with resume the backfill continues from the journal of the previous run, otherwise the journal is cleared first
+    fights and fighters run one after the other, scrape_ufc_stats_runner.py runs them at the same time
+
+    arguments:
+    config (dict): config from scrape_ufc_stats_config.yaml
+    resume (bool): continue the previous backfill
+    workers (int): number of parser processes, 0 parses in this process
+    chunk_size (int): number of urls parsed between flushes to the journal
+
+    returns:
+    none
+    '''
+    if not start_backfill(config, resume):
+        return
+    backfill_fights(config, workers, chunk_size)
+    backfill_fighters(config, workers, chunk_size)
+    finish_backfill(config)
+
+
+
+# get parser versions
+def get_parser_versions(config: dict) -> Dict[str, str]:
+    '''
+    get the current parser version of each stage, the version in parser_versions and a hash of the config keys of the stage
+    e.g. '1 5d41402abc4b2a76', a change to the columns of a stage in the config changes its version
+
+    arguments:
+    config (dict): config from scrape_ufc_stats_config.yaml
+
+    returns:
+    a dict of stage to parser version
+    '''
+    versions = {}
+    for stage, version in parser_versions.items():
+        stage_config = json.dumps([config[key] for key in stage_config_keys[stage]], sort_keys=True)
+        versions[stage] = f'{version} {hashlib.sha256(stage_config.encode()).hexdigest()[:16]}'
+
+    # return
+    return versions
+
+
+
+# load parser versions of tables
+def load_parser_versions(file_name: str) -> Dict[str, str]:
+    '''
+    load the parser version each stage had when its tables were last written in full
+
+    arguments:
+    file_name (str): json file of parser versions
+
+    returns:
+    a dict of stage to parser version, empty if the file does not exist
+    '''
+    if not os.path.exists(file_name):
+        return {}
+
+    # return
+    with open(file_name) as file:
+        return json.load(file)
+
+
+
+# record parser versions of tables
+def save_parser_versions(config: dict, stages: List[str]) -> None:
+    '''
+    record the current parser version of stages whose tables were written in full, e.g. by a backfill or a reparse
+    the file is written under a temporary name and then renamed, as in MANIFEST.save_manifest()
+
+    arguments:
+    config (dict): config from scrape_ufc_stats_config.yaml
+    stages (list): stages whose tables were written
+
+    returns:
+    none
+    '''
+    file_name = config['parser_versions_file_name']
+    versions = load_parser_versions(file_name)
+    current_versions = get_parser_versions(config)
+    versions.update({stage: current_versions[stage] for stage in stages})
+    with open(file_name + '.tmp', 'w') as file:
+        json.dump(versions, file, indent=1, sort_keys=True)
+    os.replace(file_name + '.tmp', file_name)
+
+
+
+# list stages whose parser changed
+def list_changed_stages(config: dict) -> List[str]:
+    '''
+    list the stages whose tables were written with another parser version or other columns than the current ones
+    stages with no recorded version are listed, as the version of their tables is not known
+
+    arguments:
+    config (dict): config from scrape_ufc_stats_config.yaml
+
+    returns:
+    a list of stages, in order of parser_versions
+    '''
+    versions = load_parser_versions(config['parser_versions_file_name'])
+
+    # return
+    return [stage for stage, version in get_parser_versions(config).items() if versions.get(stage) != version]
+
+
+
+# list pages of stages to reparse
+def list_reparse_urls(config: dict, stages: List[str]) -> List[str]:
+    '''
+    list the urls of the pages that reparse_fights() and reparse_fighters() parse again for stages, from the rows of their tables
+    so pages missing from the page cache are found before any table is rewritten
+
+    arguments:
+    config (dict): config from scrape_ufc_stats_config.yaml
+    stages (list): stages to parse again
+
+    returns:
+    a list of urls of pages, in order of stages
+    '''
+    urls = []
+    if 'events' in stages:
+        urls.append(config['completed_events_all_url'])
+    if 'event' in stages or 'fight' in stages:
+        fight_details_df = STORE.read_table(config['fight_details_file_name'], columns=['EVENT', 'URL'])
+        if 'event' in stages:
+            event_details_df = STORE.read_table(config['event_details_file_name'], columns=['EVENT', 'URL'])
+            set_of_parsed_events = set(fight_details_df['EVENT'])
+            urls.extend(url for event, url in zip(event_details_df['EVENT'], event_details_df['URL']) if event in set_of_parsed_events)
+        if 'fight' in stages:
+            urls.extend(fight_details_df['URL'])
+    if 'fighters' in stages:
+        urls.extend(LIB.generate_alphabetical_urls())
+    if 'fighter' in stages:
+        urls.extend(STORE.read_table(config['fighter_tott_file_name'], columns=['URL'])['URL'])
+
+    # return
+    return urls
+
+
+
+# reparse events and fights
+def reparse_fights(config: dict, stages: List[str], workers: int = 0) -> None:
+    '''
+    parse the pages of the stages of events and fights again from the page cache and rewrite only the tables of those stages
+    the pages of the rows of the tables are parsed again, so no rows are added or removed, and rows keep their order
+    events - event details from the page of all events
+    event - fight details and fingerprints of fights in the manifest from event pages, bouts are kept from fight details
+    fight - bouts of fight details, fight results and fight stats from fight pages
+    fetch is expected to be offline, a page that is not in the page cache raises LookupError, so pages are checked with list_reparse_urls() first
+
+    arguments:
+    config (dict): config from scrape_ufc_stats_config.yaml
+    stages (list): stages to parse again
+    workers (int): number of parser processes, 0 parses in this process
+
+    returns:
+    none
+    '''
+    # parse event details
+    if 'events' in stages:
+        METRICS.start_stage('reparse events')
+        [event_details] = iter_parsed_pages([config['completed_events_all_url']], parse_events_page)
+        STORE.write_table(pd.DataFrame(event_details), config['event_details_file_name'])
+    if 'event' not in stages and 'fight' not in stages:
+        return
+    event_details_df = STORE.read_table(config['event_details_file_name'])
+    event_years = STORE.get_event_years(event_details_df)
+    fight_details_df = STORE.read_table(config['fight_details_file_name'], columns=config['fight_details_column_names'])
+
+    # parse fight details of events that have fight details
+    if 'event' in stages:
+        METRICS.start_stage('reparse event')
+        set_of_parsed_events = set(fight_details_df['EVENT'])
+        event_urls = [url for event, url in zip(event_details_df['EVENT'], event_details_df['URL']) if event in set_of_parsed_events]
+        list_of_fight_details_dfs = [pd.DataFrame(columns=config['fight_details_column_names'])]
+        manifest = MANIFEST.load_manifest(config['manifest_file_name'])
+        for url, (fight_details, fight_fingerprints) in tqdm(zip(event_urls, iter_parsed_pages(event_urls, parse_event_page, (), workers)), desc='event', total=len(event_urls)):
+            list_of_fight_details_dfs.append(pd.DataFrame(fight_details))
+            MANIFEST.update_manifest_event(manifest, url, fight_fingerprints)
+        reparsed_fight_details_df = pd.concat(list_of_fight_details_dfs, ignore_index=True)[config['fight_details_column_names']]
+
+        # keep bouts parsed from fight pages and the order of rows of fight details
+        reparsed_fight_details_df['BOUT'] = reparsed_fight_details_df['URL'].map(dict(zip(fight_details_df['URL'], fight_details_df['BOUT'])))
+        row_order = {url: i for i, url in enumerate(fight_details_df['URL'])}
+        fight_details_df = reparsed_fight_details_df.sort_values('URL', key=lambda urls: urls.map(row_order).fillna(len(row_order)), kind='stable', ignore_index=True)
+        MANIFEST.save_manifest(manifest, config['manifest_file_name'])
+
+    # parse bout, fight results and fight stats of each fight of fight details
+    if 'fight' in stages:
+        METRICS.start_stage('reparse fight')
+        fight_urls = list(fight_details_df['URL'])
+        bouts = []
+        fight_results_column_names, fight_stats_column_names = get_fight_column_names(config)
+        fight_results_records = LIB.RecordAccumulator(fight_results_column_names)
+        fight_stats_records = LIB.RecordAccumulator(fight_stats_column_names)
+        for bout, fight_results_record, fight_stats_record_list in tqdm(iter_parsed_pages(
+                fight_urls,
+                parse_fight_page,
+                (config['totals_column_names'], config['significant_strikes_column_names'], config['id_columns']),
+                workers
+                ), desc='fight', total=len(fight_urls)):
+            bouts.append(bout)
+            fight_results_records.append(fight_results_record)
+            fight_stats_records.extend(fight_stats_record_list)
+        fight_details_df['BOUT'] = bouts
+        fight_stats_df = fight_stats_records.to_df()
+
+        # normalise fight stats into numeric columns
+        if config['normalise_fight_stats']:
+            fight_stats_df = LIB.normalise_fight_stats(fight_stats_df, config['normalised_fight_stats_columns'])
+        STORE.write_table(fight_results_records.to_df(), config['fight_results_file_name'], event_years)
+        STORE.write_table(fight_stats_df, config['fight_stats_file_name'], event_years)
+    STORE.write_table(fight_details_df, config['fight_details_file_name'], event_years)
+
+
+
+# reparse fighters
+def reparse_fighters(config: dict, stages: List[str], workers: int = 0) -> None:
+    '''
+    parse the pages of the stages of fighters again from the page cache and rewrite only the tables of those stages
+    the pages of the rows of the tables are parsed again, so no rows are added or removed, and rows keep their order
+    fighters - fighter details and the fighter index from alphabetical pages
+    fighter - fighter tale of the tape, and with fighter_history career averages and fight history, from fighter pages
+    fetch is expected to be offline, a page that is not in the page cache raises LookupError, so pages are checked with list_reparse_urls() first
+
+    arguments:
+    config (dict): config from scrape_ufc_stats_config.yaml
+    stages (list): stages to parse again
+    workers (int): number of parser processes, 0 parses in this process
+
+    returns:
+    none
+    '''
+    # parse fighter details of fighters in fighter details
+    if 'fighters' in stages:
+        METRICS.start_stage('reparse fighters')
+        fighter_details_df = STORE.read_table(config['fighter_details_file_name'], columns=['URL'])
+        alphabetical_urls = LIB.generate_alphabetical_urls()
+        fighter_index = {'pages': {}}
+        list_of_fighter_details_dfs = [pd.DataFrame(columns=config['fighter_details_column_names'])]
+        for url, (content_hash, fighter_details) in zip(alphabetical_urls, iter_parsed_pages(alphabetical_urls, parse_fighters_page_with_hash, (config['fighter_details_column_names'],))):
+            page_fighter_details_df = pd.DataFrame(fighter_details, columns=config['fighter_details_column_names'])
+            MANIFEST.update_fighter_index_page(fighter_index, url, content_hash, page_fighter_details_df.values.tolist())
+            list_of_fighter_details_dfs.append(page_fighter_details_df)
+        all_fighter_details_df = pd.concat(list_of_fighter_details_dfs, ignore_index=True)
+        STORE.write_table(all_fighter_details_df[all_fighter_details_df['URL'].isin(set(fighter_details_df['URL']))], config['fighter_details_file_name'])
+        MANIFEST.save_fighter_index(fighter_index, config['fighter_index_file_name'])
+
+    # parse tale of the tape, career averages and fight history of fighters in fighter tale of the tape
+    if 'fighter' in stages:
+        METRICS.start_stage('reparse fighter')
+        fighter_urls = list(STORE.read_table(config['fighter_tott_file_name'], columns=['URL'])['URL'])
+        fighter_tott_records = LIB.RecordAccumulator(config['fighter_tott_column_names'])
+        fighter_averages_records = LIB.RecordAccumulator(config['fighter_averages_column_names'])
+        fighter_history_records = LIB.RecordAccumulator(config['fighter_history_column_names'])
+        for fighter_tott_record, fighter_averages_record, fighter_history_record_list in tqdm(iter_parsed_pages(fighter_urls, parse_fighter_page, (config['fighter_history'],), workers), desc='fighter', total=len(fighter_urls)):
+            fighter_tott_records.append(fighter_tott_record)
+            if config['fighter_history']:
+                fighter_averages_records.append(fighter_averages_record)
+                fighter_history_records.extend(fighter_history_record_list)
+        STORE.write_table(fighter_tott_records.to_df(), config['fighter_tott_file_name'])
+        if config['fighter_history']:
+            STORE.write_table(fighter_averages_records.to_df(), config['fighter_averages_file_name'])
+            STORE.write_table(fighter_history_records.to_df(), config['fighter_history_file_name'])
+
+
+
+# finish reparse
+def finish_reparse(config: dict, stages: List[str]) -> None:
+    '''
+    compute career stats of all fighters again if tables they are computed from were rewritten, and record the parser versions of the stages
+
+    arguments:
+    config (dict): config from scrape_ufc_stats_config.yaml
+    stages (list): stages that were parsed again
+
+    returns:
+    none
+    '''
+    if config['fighter_career_stats'] and {'fight', 'fighter'} & set(stages):
+        METRICS.start_stage('careers')
+        CAREER.update_career_stats(config)
+    save_parser_versions(config, stages)
+    print(f'### Tables of stages {stages} parsed again from the page cache. ###')
+    print('\n')
+
+
+
+if __name__ == '__main__':
+    # import config
+    import yaml
+    config = yaml.safe_load(open('scrape_ufc_stats_config.yaml'))
+
+    # read arguments
+    parser = argparse.ArgumentParser(description='backfill all past ufc events, fights and fighters with checkpoints')
+    parser.add_argument('--resume', action='store_true', help='continue the previous backfill from its journal')
+    parser.add_argument('--workers', type=int, default=config['parse_workers'], help='number of parser processes, 0 parses in the main process')
+    parser.add_argument('--chunk-size', type=int, default=config['journal_chunk_size'], help='number of pages parsed between flushes to the journal')
+    parser.add_argument('--profile', choices=METRICS.profilers, default=config['profiler'] or None, help='profile the backfill with cprofile or pyinstrument')
+    args = parser.parse_args()
+
+    # configure fetch engine
+    FETCH.configure(
+        max_workers=config['max_workers'],
+        requests_per_second=config['requests_per_second'],
+        page_cache_file_name=config['page_cache_file_name'],
+        page_cache_ttls=config['page_cache_ttls'],
+        request_timeout=config['request_timeout'],
+        max_retries=config['max_retries'],
+        backoff_seconds=config['backoff_seconds'],
+        min_requests_per_second=config['min_requests_per_second']
+        )
+    # configure parser backend
+    SOUP.configure(config['parser_backend'])
+    # configure storage backend
+    STORE.configure(config['storage_backend'], database_file_name=config['database_file_name'], id_columns=config['id_columns'])
+    # store normalised fight stats columns with their types
+    if config['normalise_fight_stats']:
+        STORE.configure(column_types=LIB.get_normalised_fight_stats_column_types(config['normalised_fight_stats_columns']))
+    # store career stats columns with their types
+    if config['fighter_career_stats']:
+        STORE.configure(column_types=CAREER.get_career_column_types(config['normalised_fight_stats_columns']))
+    # keep repeated text columns as categoricals
+    if config['compact_columns']:
+        STORE.configure(categorical_column_names=config['categorical_column_names'], categories_file_name=config['categories_file_name'])
+    # record rows inserted, updated or deleted by the backfill
+    CHANGES.configure(config['change_log_file_name'], config['change_log_format'])
+
+    # configure metrics
+    METRICS.configure(
+        enabled=bool(config['metrics_file_name']),
+        metrics_file_name=config['metrics_file_name'],
+        metrics_format=config['metrics_format'],
+        profiler=args.profile or '',
+        profile_file_name=config['profile_file_name']
+        )
+
+    METRICS.start_run()
+    backfill(config, args.resume, args.workers, args.chunk_size)
+    METRICS.finish_run()
@@ -0,0 +1,1384 @@
+'''
+Overview
+
+runner for full and incremental runs from the command line, e.g. under cron or in a container
+python scrape_ufc_stats_runner.py update
+python scrape_ufc_stats_runner.py update --quick
+python scrape_ufc_stats_runner.py fighters
+python scrape_ufc_stats_runner.py reparse
+python scrape_ufc_stats_runner.py reparse 'UFC 300: Pereira vs. Hill'
+python scrape_ufc_stats_runner.py backfill --resume
+python scrape_ufc_stats_runner.py watch
+
+update - parse new, incomplete and changed events and their fights, and new fighters, the same as scrape_ufc_stats_unparsed_data.py
+fighters - parse new fighters only
+reparse - parse the tables of stages whose parser version or columns changed again from the page cache, without the network
+          stages can be given with --stage, or all with --all, e.g. after a change to the columns of fight stats in the config
+          only stages with a recorded parser version are found changed, and no table is rewritten unless every page of the stages is cached
+          or parse events again with their names, the same as update but only for those events
+backfill - parse all past events, fights and fighters with checkpoints, the same as scrape_ufc_stats_pipeline.py
+watch - follow the upcoming event on fight night, writing the results and stats of each bout soon after it has a result
+
+a run has two chains of stages
+events - check events, then parse events and their fights
+fighters - check fighters, then parse fighters
+the chains share nothing until career stats are updated, so they run at the same time in threads under asyncio
+each chain fetches with the fetch threads and rate limit of scrape_ufc_stats_fetch and parses with its own pool of parser processes
+fight history of fighters of new fights and career stats are updated once both chains are done
+with fighter_history, update first parses events again whose fights are in fight history but not in fight details
+
+the stages are importable functions, scrape_ufc_stats_unparsed_data.py runs them one after the other
+
+update --quick is for frequent polling, it first compares fingerprints of what ufcstats.com shows now with those of the last update
+the top of the page of all events, and a few alphabetical pages of fighters in turn, by the etag or last modified date in their headers, or a hash of their content
+if nothing changed it exits without parsing pages, reading tables or importing pandas, numpy and bs4, which are only loaded on first use
+pages that changed are expired in the page cache, so the update reads them fresh instead of a copy within its time to live
+the fingerprints are only saved once the update has read them fresh, so a change the update missed is found again by the next check
+
+watch polls the event page of the upcoming event, which the tables of events skip until it is completed, every watch_interval_seconds
+each poll is a conditional request for the event page, and only the fight pages of bouts that gained a result since the last poll are fetched
+rows of the event in the tables of fights are replaced on each poll that finds a result, and the update after the event replaces them again
+
+'''
+
+# imports
+from types import ModuleType
+from typing import Callable, Iterable, List, Optional, Set, Tuple
+import argparse
+import asyncio
+import hashlib
+import importlib.util
+import json
+import multiprocessing
+import os
+import re
+import sys
+import time
+from tqdm.auto import tqdm
+
+# import fetch engine and metrics, all a quick check needs
+import scrape_ufc_stats_fetch as FETCH
+import scrape_ufc_stats_metrics as METRICS
+
+
+
+# import module on first use
+def lazy_import(module_name: str) -> ModuleType:
+    '''
+    import a module that is only loaded when one of its attributes is first used
+    modules that import pandas, numpy or bs4 are imported this way, so a quick check that finds nothing new exits before they are loaded
+
+    arguments:
+    module_name (str): name of module
+
+    returns:
+    the module, loaded on first use
+    '''
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    spec = importlib.util.find_spec(module_name)
+    spec.loader = importlib.util.LazyLoader(spec.loader)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+
+    # return
+    return module
+
+
+
+# import library, loaded on first use
+pd = lazy_import('pandas')
+LIB = lazy_import('scrape_ufc_stats_library')
+SOUP = lazy_import('scrape_ufc_stats_soup')
+PIPE = lazy_import('scrape_ufc_stats_pipeline')
+STORE = lazy_import('scrape_ufc_stats_storage')
+MANIFEST = lazy_import('scrape_ufc_stats_manifest')
+CAREER = lazy_import('scrape_ufc_stats_career')
+CHANGES = lazy_import('scrape_ufc_stats_changes')
+
+# ids of events on the page of all events, in order of the page
+event_id_pattern = re.compile(rb'event-details/([0-9a-f]{16})')
+
+
+
+# configure fetch engine and metrics
+def configure_fetch(config: dict, profile: str = None) -> None:
+    '''
+    configure the fetch engine and metrics from the config, all a quick check needs
+
+    arguments:
+    config (dict): config from scrape_ufc_stats_config.yaml
+    profile (str): profiler of the run, cprofile or pyinstrument, defaults to config['profiler']
+
+    returns:
+    none
+    '''
+    # configure fetch engine
+    FETCH.configure(
+        max_workers=config['max_workers'],
+        requests_per_second=config['requests_per_second'],
+        page_cache_file_name=config['page_cache_file_name'],
+        page_cache_ttls=config['page_cache_ttls'],
+        request_timeout=config['request_timeout'],
+        max_retries=config['max_retries'],
+        backoff_seconds=config['backoff_seconds'],
+        min_requests_per_second=config['min_requests_per_second']
+        )
+    # configure metrics of stages and library functions, written at the end of the run
+    METRICS.configure(
+        enabled=bool(config['metrics_file_name']),
+        metrics_file_name=config['metrics_file_name'],
+        metrics_format=config['metrics_format'],
+        profiler=profile or config['profiler'] or '',
+        profile_file_name=config['profile_file_name']
+        )
+
+
+
+# configure library
+def configure_library(config: dict) -> None:
+    '''
+    configure the parser and storage backends and the change log from the config
+    the library modules are loaded here, before stages use them from more than one thread
+
+    arguments:
+    config (dict): config from scrape_ufc_stats_config.yaml
+
+    returns:
+    none
+    '''
+    # configure parser backend
+    SOUP.configure(config['parser_backend'])
+    # configure storage backend
+    STORE.configure(config['storage_backend'], database_file_name=config['database_file_name'], id_columns=config['id_columns'])
+    # store normalised fight stats columns with their types
+    if config['normalise_fight_stats']:
+        STORE.configure(column_types=LIB.get_normalised_fight_stats_column_types(config['normalised_fight_stats_columns']))
+    # store career stats columns with their types
+    if config['fighter_career_stats']:
+        STORE.configure(column_types=CAREER.get_career_column_types(config['normalised_fight_stats_columns']))
+    # keep repeated text columns as categoricals
+    if config['compact_columns']:
+        STORE.configure(categorical_column_names=config['categorical_column_names'], categories_file_name=config['categories_file_name'])
+    # record rows inserted, updated or deleted by each run
+    CHANGES.configure(config['change_log_file_name'], config['change_log_format'])
+    # load the other modules of the stages, a lazily imported module is not safe to load from two threads at once
+    for module in [pd, LIB, PIPE, MANIFEST, CAREER]:
+        dir(module)
+
+
+
+# configure modules
+def configure(config: dict, profile: str = None) -> None:
+    '''
+    configure the fetch engine, parser backend, storage backend and metrics from the config
+
+    arguments:
+    config (dict): config from scrape_ufc_stats_config.yaml
+    profile (str): profiler of the run, cprofile or pyinstrument, defaults to config['profiler']
+
+    returns:
+    none
+    '''
+    configure_fetch(config, profile)
+    configure_library(config)
+
+
+
+# load quick check state
+def load_quick_check_state(file_name: str) -> dict:
+    '''
+    load the fingerprints of the top of the page of all events and of the alphabetical pages of fighters from the last update
+
+    arguments:
+    file_name (str): json file of quick check state
+
+    returns:
+    a dict of quick check state, none if the file does not exist
+    '''
+    if not os.path.exists(file_name):
+        return None
+
+    # return
+    with open(file_name) as file:
+        return json.load(file)
+
+
+
+# save quick check state
+def save_quick_check_state(state: dict, file_name: str) -> None:
+    '''
+    save the quick check state to file
+    the file is written under a temporary name and then renamed, as in MANIFEST.save_manifest()
+
+    arguments:
+    state (dict): quick check state
+    file_name (str): json file of quick check state
+
+    returns:
+    none
+    '''
+    with open(file_name + '.tmp', 'w') as file:
+        json.dump(state, file, indent=1, sort_keys=True)
+    os.replace(file_name + '.tmp', file_name)
+
+
+
+# get fingerprint of top of page of all events
+def get_events_fingerprint(config: dict) -> str:
+    '''
+    get a fingerprint of the newest events on the page of all events
+    only the first quick_check_bytes bytes of the page are downloaded, and only the ids of the events in them are hashed
+
+    arguments:
+    config (dict): config from scrape_ufc_stats_config.yaml
+
+    returns:
+    fingerprint of the top of the page of all events
+    '''
+    head = FETCH.get_page_head(config['completed_events_all_url'], config['quick_check_bytes'])
+    event_ids = b'\n'.join(event_id_pattern.findall(head))
+
+    # return
+    return hashlib.sha256(event_ids).hexdigest()[:16]
+
+
+
+# quick check
+def quick_check(config: dict) -> Tuple[bool, dict, List[str]]:
+    '''
+    check if anything may have changed since the last update without parsing pages or reading tables
+    the top of the page of all events is compared on every check
+    quick_check_fighter_pages alphabetical pages of fighters are compared on each check, in turn, by FETCH.get_page_fingerprint()
+    an update is due if a fingerprint changed, there is no state of a last update or it is older than quick_check_full_hours
+    results changed on event pages of recent events are not on the page of all events, so they are found by the update that runs every quick_check_full_hours
+
+    arguments:
+    config (dict): config from scrape_ufc_stats_config.yaml
+
+    returns:
+    true if an update is due, the state to save once the update is done, and urls of pages that changed, for the update to read fresh
+    '''
+    METRICS.start_stage('quick check')
+    state = load_quick_check_state(config['quick_check_file_name'])
+    events_fingerprint = get_events_fingerprint(config)
+
+    # no update yet, fingerprint all alphabetical pages
+    if state is None:
+        alphabetical_urls = LIB.generate_alphabetical_urls()
+        fighter_page_fingerprints = dict(zip(alphabetical_urls, [FETCH.get_page_fingerprint(url) for url in alphabetical_urls]))
+        new_state = {'events': events_fingerprint, 'fighter_pages': fighter_page_fingerprints, 'next_fighter_page': 0, 'updated_at': time.time()}
+        return True, new_state, [config['completed_events_all_url']] + alphabetical_urls
+
+    # fingerprint the next alphabetical pages in turn
+    alphabetical_urls = sorted(state['fighter_pages'])
+    number_of_pages = min(config['quick_check_fighter_pages'], len(alphabetical_urls))
+    checked_urls = [alphabetical_urls[(state['next_fighter_page'] + i) % len(alphabetical_urls)] for i in range(number_of_pages)]
+    checked_fingerprints = {url: FETCH.get_page_fingerprint(url) for url in checked_urls}
+
+    # find what changed
+    changed_fighter_pages = [url for url, fingerprint in checked_fingerprints.items() if fingerprint != state['fighter_pages'][url]]
+    events_changed = events_fingerprint != state['events']
+    update_due = time.time() - state['updated_at'] >= config['quick_check_full_hours'] * 3600
+    if events_changed:
+        print('### The newest events have changed since the last update. ###')
+        print('\n')
+    if changed_fighter_pages:
+        print(f'### Alphabetical pages of fighters have changed since the last update: {changed_fighter_pages} ###')
+        print('\n')
+    if update_due and not events_changed and not changed_fighter_pages:
+        print(f'### The last update was more than {config["quick_check_full_hours"]} hours ago. ###')
+        print('\n')
+
+    # new state, the update time is only changed by an update
+    new_state = {
+        'events': events_fingerprint,
+        'fighter_pages': {**state['fighter_pages'], **checked_fingerprints},
+        'next_fighter_page': (state['next_fighter_page'] + number_of_pages) % max(len(alphabetical_urls), 1),
+        'updated_at': state['updated_at'],
+    }
+
+    # pages that changed, which the page cache may still hold an old copy of
+    changed_urls = ([config['completed_events_all_url']] if events_changed else []) + changed_fighter_pages
+
+    # return
+    return events_changed or bool(changed_fighter_pages) or update_due, new_state, changed_urls
+
+
+
+# check fight history
+def check_fighter_history(config: dict) -> List[str]:
+    '''
+    find parsed events with fights in fighter history that are not in fight details, e.g. a fight added to an event after it was parsed
+    fight history is an index of fights by fighter, so fights missing from fight details are found without fetching every event page
+    upcoming fights, with the result 'next', and events not in event details yet are left to check_events()
+
+    arguments:
+    config (dict): config from scrape_ufc_stats_config.yaml
+
+    returns:
+    a list of names of events to parse again, in order of event details
+    '''
+    if not config['fighter_history']:
+        return []
+
+    METRICS.start_stage('check fighter history')
+    # read fights of fight history, and events and fights that have been parsed
+    try:
+        fighter_history_df = STORE.read_table(config['fighter_history_file_name'], columns=['RESULT', 'EVENT', 'FIGHT URL'])
+        parsed_event_details_df = STORE.read_table(config['event_details_file_name'], columns=['EVENT'])
+        parsed_fight_details_df = STORE.read_table(config['fight_details_file_name'], columns=['URL'])
+    except FileNotFoundError:
+        return []
+
+    # find events of past fights that are not in fight details, events are matched without surrounding whitespace
+    set_of_parsed_fight_urls = set(parsed_fight_details_df['URL'])
+    missing_fights_df = fighter_history_df[
+        (fighter_history_df['RESULT'] != 'next')
+        & fighter_history_df['FIGHT URL'].notna()
+        & ~fighter_history_df['FIGHT URL'].isin(set_of_parsed_fight_urls)
+    ]
+    set_of_stripped_events = set(missing_fights_df['EVENT'].astype('string').str.strip().dropna())
+    list_of_events = [event for event in parsed_event_details_df['EVENT'] if event.strip() in set_of_stripped_events]
+    if list_of_events:
+        print(f'Events with fights in fight history that are not in fight details: {list_of_events}')
+        print('\n')
+
+    # return
+    return list_of_events
+
+
+
+# check events
+def check_events(config: dict, reparse_events: Iterable[str] = ()) -> dict:
+    '''
+    check for events to parse
+    new events are on the page of all events but not in event details, rows of their fights written by watch are replaced
+    incomplete events are in event details but have no fight details
+    changed events are recent events whose fights were added, removed or changed since the last run, found with the manifest
+    reparsed events are parsed events in reparse_events, parsed again from the page cache
+    event details are written if there are events to parse
+
+    arguments:
+    config (dict): config from scrape_ufc_stats_config.yaml
+    reparse_events (list): names of events to parse again
+
+    returns:
+    a dict of events to parse, fight details and fingerprints of checked events and the manifest, for parse_events()
+    '''
+    print('### Checking for unparsed or changed events... ###')
+    print('\n')
+    METRICS.start_stage('check events')
+
+    # read existing event details
+    parsed_event_details_df = STORE.read_table(config['event_details_file_name'], columns=['EVENT'])
+    # read events and urls of existing fight details to verify completeness
+    parsed_fight_details_df = STORE.read_table(config['fight_details_file_name'], columns=['EVENT', 'URL'])
+    # read fingerprints of event pages and fights from previous runs
+    manifest = MANIFEST.load_manifest(config['manifest_file_name'])
+
+    # get set of events that have been parsed (have event details)
+    set_of_events_with_event_details = set(parsed_event_details_df['EVENT'])
+    # get set of fight urls of each event that has fight details (complete parsing)
+    dict_of_parsed_fight_urls = parsed_fight_details_df.groupby('EVENT', observed=True)['URL'].agg(set).to_dict()
+
+    # stream event details from the page of all events, each event is parsed as the page is downloaded
+    event_details_records = LIB.RecordAccumulator(LIB.event_details_column_names)
+    event_details_records.extend(LIB.iter_event_details(FETCH.iter_page_chunks(config['completed_events_all_url'])))
+    updated_event_details_df = event_details_records.to_df()
+    # get list of all event names
+    list_of_all_events = list(updated_event_details_df['EVENT'])
+
+    # find events that are completely new (not in event details at all)
+    list_of_new_events = [event for event in list_of_all_events
+                          if event not in set_of_events_with_event_details]
+
+    # find events that have event details but no fight details (incomplete parsing)
+    list_of_incomplete_events = [event for event in parsed_event_details_df['EVENT']
+                                 if event not in dict_of_parsed_fight_urls]
+
+    # find new events whose fights were written while they were upcoming, by watch, their rows are replaced
+    list_of_watched_events = [event for event in list_of_new_events
+                              if event in dict_of_parsed_fight_urls]
+
+    # find parsed events to parse again, events are matched without surrounding whitespace
+    set_of_new_and_incomplete_events = set(list_of_new_events) | set(list_of_incomplete_events)
+    set_of_stripped_reparse_events = {event.strip() for event in reparse_events}
+    list_of_reparse_events = [event for event in parsed_event_details_df['EVENT']
+                              if event.strip() in set_of_stripped_reparse_events and event not in set_of_new_and_incomplete_events]
+    set_of_missing_reparse_events = set_of_stripped_reparse_events - {event.strip() for event in parsed_event_details_df['EVENT']}
+    if set_of_missing_reparse_events:
+        print(f'Events to parse again that are not in event details: {sorted(set_of_missing_reparse_events)}')
+        print('\n')
+
+    # find recent events that have been parsed, to check for fights that are added, removed or changed
+    list_of_recheck_events = [event for event in MANIFEST.list_recheck_events(updated_event_details_df, config['recheck_days'])
+                              if event not in set_of_new_and_incomplete_events]
+
+    # get event details of events to check, in order of event details
+    set_of_events_to_check = set_of_new_and_incomplete_events | set(list_of_recheck_events) | set(list_of_reparse_events)
+    events_to_check_df = updated_event_details_df[updated_event_details_df['EVENT'].isin(set_of_events_to_check)]
+
+    # create empty dicts to store fight details and fingerprints of fights of each event
+    dict_of_fight_details_dfs = {}
+    dict_of_fight_fingerprints = {}
+
+    # loop through soup of each event to check and parse fight details and fingerprints of fights
+    # event pages that could not be fetched are quarantined, their events are left for the next run
+    for event, event_url, soup in tqdm(zip(events_to_check_df['EVENT'], events_to_check_df['URL'], LIB.iter_soups(events_to_check_df['URL'], quarantine=True)), total=len(events_to_check_df)):
+        if soup is None:
+            continue
+        # parse fight links
+        dict_of_fight_details_dfs[event] = LIB.parse_fight_details(soup)
+        # parse fingerprints of fights
+        dict_of_fight_fingerprints[event_url] = LIB.parse_fight_fingerprints(soup)
+
+    # compare fingerprints of recent events with the manifest
+    list_of_changed_events = []
+    list_of_changed_fight_urls = []
+    for event, event_url in zip(events_to_check_df['EVENT'], events_to_check_df['URL']):
+        if event in set_of_new_and_incomplete_events or event_url not in dict_of_fight_fingerprints:
+            continue
+        changed, changed_fight_urls = MANIFEST.find_changed_fights(manifest, event_url, dict_of_fight_fingerprints[event_url], dict_of_parsed_fight_urls.get(event, set()))
+        if changed:
+            list_of_changed_events.append(event)
+            list_of_changed_fight_urls.extend(changed_fight_urls)
+
+    # events to parse again that have not changed, whose event pages could be fetched
+    set_of_changed_events = set(list_of_changed_events)
+    list_of_reparsed_events = [event for event in list_of_reparse_events
+                               if event not in set_of_changed_events and event in dict_of_fight_details_dfs]
+
+    # combine lists to get all events that need parsing
+    list_of_unparsed_events = list_of_new_events + list_of_incomplete_events + list_of_changed_events + list_of_reparsed_events
+
+    # if list_of_unparsed_events is empty then all available events have been parsed
+    if not list_of_unparsed_events:
+        print('### All available events have been fully parsed. ###')
+        print('\n')
+    else:
+        # show list of unparsed events
+        print('### There are unparsed, incomplete or changed events. ###')
+        print('\n')
+        if list_of_new_events:
+            print(f'New events (not in event details): {list_of_new_events}')
+            print('\n')
+        if list_of_incomplete_events:
+            print(f'Incomplete events (no fight details): {list_of_incomplete_events}')
+            print('\n')
+        if list_of_changed_events:
+            print(f'Changed events (fights added, removed or changed): {list_of_changed_events}')
+            print('\n')
+        if list_of_reparsed_events:
+            print(f'Events parsed again: {list_of_reparsed_events}')
+            print('\n')
+        # write event details to file
+        STORE.write_table(updated_event_details_df, config['event_details_file_name'])
+
+    # return
+    return {
+        'event_details_df': updated_event_details_df,
+        'unparsed_events': list_of_unparsed_events,
+        'replaced_events': list_of_watched_events + list_of_incomplete_events + list_of_changed_events + list_of_reparsed_events,
+        'changed_fight_urls': list_of_changed_fight_urls,
+        'events_to_check_df': events_to_check_df,
+        'fight_details_dfs': dict_of_fight_details_dfs,
+        'fight_fingerprints': dict_of_fight_fingerprints,
+        'manifest': manifest,
+    }
+
+
+
+# parse events
+def parse_events(config: dict, events: dict, workers: int = 0) -> Set[str]:
+    '''
+    parse the fights of events found by check_events() and add them to the tables of fights
+    rows of incomplete, changed and reparsed events are replaced
+    events with a fight that could not be fetched are not written, so they are parsed again on the next run
+    fingerprints of checked events are recorded in the manifest once their fights are written
+
+    arguments:
+    config (dict): config from scrape_ufc_stats_config.yaml
+    events (dict): events to parse, from check_events()
+    workers (int): number of parser processes, 0 parses in this process
+
+    returns:
+    a set of fighters of fights that are added, changed or removed, whose career stats and fight history change
+    '''
+    set_of_career_fighters = set()
+    dict_of_fight_fingerprints = events['fight_fingerprints']
+
+    if events['unparsed_events']:
+        METRICS.start_stage('parse events')
+        # get year of each event to partition tables of fights
+        event_years = STORE.get_event_years(events['event_details_df'])
+        # get list of events whose rows are replaced
+        list_of_replaced_events = list(events['replaced_events'])
+
+        # concat fight details of all unparsed events once, in order of event details
+        set_of_unparsed_events = set(events['unparsed_events'])
+        unparsed_fight_details_df = pd.concat(
+            [pd.DataFrame(columns=config['fight_details_column_names'])]
+            + [fight_details_df for event, fight_details_df in events['fight_details_dfs'].items() if event in set_of_unparsed_events],
+            ignore_index=True
+            )
+
+        # fetch new and changed fights of changed events again, other fights can be read from the page cache
+        FETCH.expire_cached_pages(events['changed_fight_urls'])
+
+        ### parse fight results and fight stats
+        print('### Parsing Fight Results and Fight Stats... ###')
+        print('\n')
+
+        # define list of urls of fights to parse
+        list_of_unparsed_fight_details_urls = list(unparsed_fight_details_df['URL'])
+
+        # create empty lists to store bouts and urls of fights that could not be fetched
+        list_of_unparsed_bouts = []
+        list_of_quarantined_fight_urls = []
+        # create accumulators to store records of fight results and fight stats
+        fight_results_column_names, fight_stats_column_names = PIPE.get_fight_column_names(config)
+        fight_results_records = LIB.RecordAccumulator(fight_results_column_names)
+        fight_stats_records = LIB.RecordAccumulator(fight_stats_column_names)
+
+        # fetch and parse each fight into bout, fight results and stats
+        # each fight page is fetched once and all fight data is parsed from the same page
+        # pages are parsed by workers parser processes and records are returned in order of urls
+        for url, output in tqdm(zip(list_of_unparsed_fight_details_urls, PIPE.iter_parsed_pages(
+                list_of_unparsed_fight_details_urls,
+                PIPE.parse_fight_page,
+                (config['totals_column_names'], config['significant_strikes_column_names'], config['id_columns']),
+                workers,
+                quarantine=True
+                )), total=len(list_of_unparsed_fight_details_urls)):
+            # fight page could not be fetched and is quarantined
+            if output is None:
+                list_of_unparsed_bouts.append(None)
+                list_of_quarantined_fight_urls.append(url)
+                continue
+            bout, fight_results_record, fight_stats_record_list = output
+            # append bout for fight details
+            list_of_unparsed_bouts.append(bout)
+            # append fight results
+            fight_results_records.append(fight_results_record)
+            # append fight stats
+            fight_stats_records.extend(fight_stats_record_list)
+
+        # convert records of fight results and fight stats to dfs
+        unparsed_fight_results_df = fight_results_records.to_df()
+        unparsed_fight_stats_df = fight_stats_records.to_df()
+
+        # normalise fight stats into numeric columns
+        if config['normalise_fight_stats']:
+            unparsed_fight_stats_df = LIB.normalise_fight_stats(unparsed_fight_stats_df, config['normalised_fight_stats_columns'])
+
+        # fill in bouts of fight details
+        unparsed_fight_details_df['BOUT'] = list_of_unparsed_bouts
+
+        # events with a fight that could not be fetched are not written, so they are parsed again on the next run
+        if list_of_quarantined_fight_urls:
+            set_of_quarantined_events = set(unparsed_fight_details_df['EVENT'][unparsed_fight_details_df['URL'].isin(list_of_quarantined_fight_urls)])
+            set_of_stripped_quarantined_events = {event.strip() for event in set_of_quarantined_events}
+            unparsed_fight_details_df = unparsed_fight_details_df[~unparsed_fight_details_df['EVENT'].isin(set_of_quarantined_events)]
+            unparsed_fight_results_df = unparsed_fight_results_df[~unparsed_fight_results_df['EVENT'].astype('string').str.strip().isin(set_of_stripped_quarantined_events)]
+            unparsed_fight_stats_df = unparsed_fight_stats_df[~unparsed_fight_stats_df['EVENT'].astype('string').str.strip().isin(set_of_stripped_quarantined_events)]
+            list_of_replaced_events = [event for event in list_of_replaced_events if event not in set_of_quarantined_events]
+            # fingerprints of changed events are not recorded, so they are found changed again
+            events_to_check_df = events['events_to_check_df']
+            for event, event_url in zip(events_to_check_df['EVENT'], events_to_check_df['URL']):
+                if event in set_of_quarantined_events:
+                    dict_of_fight_fingerprints.pop(event_url, None)
+            print(f'Events left for the next run (fights could not be fetched): {sorted(set_of_quarantined_events)}')
+            print('\n')
+
+        # fighters of fights that are added, changed or removed have new career stats and fight history
+        if config['fighter_career_stats'] or config['fighter_history']:
+            set_of_career_fighters |= CAREER.get_fight_fighters(unparsed_fight_results_df, unparsed_fight_stats_df)
+            if list_of_replaced_events:
+                parsed_fight_results_df = STORE.read_table(config['fight_results_file_name'], columns=['EVENT', 'BOUT'])
+                set_of_stripped_replaced_events = {event.strip() for event in list_of_replaced_events}
+                set_of_career_fighters |= CAREER.get_fight_fighters(parsed_fight_results_df[parsed_fight_results_df['EVENT'].str.strip().isin(set_of_stripped_replaced_events)])
+
+        # add unparsed fight details on top of parsed fight details
+        # old rows of incomplete, changed and reparsed events are removed before new rows are added
+        STORE.append_table(unparsed_fight_details_df, config['fight_details_file_name'], event_years, list_of_replaced_events)
+        print(unparsed_fight_details_df)
+        print('\n')
+
+        # add unparsed fight results and fight stats on top of parsed fight results and fight stats
+        STORE.append_table(unparsed_fight_results_df, config['fight_results_file_name'], event_years, list_of_replaced_events)
+        STORE.append_table(unparsed_fight_stats_df, config['fight_stats_file_name'], event_years, list_of_replaced_events)
+        print(unparsed_fight_results_df)
+        print('\n')
+        print(unparsed_fight_stats_df)
+        print('\n')
+
+    # record fingerprints of checked events once their fights have been written
+    manifest = events['manifest']
+    for event_url, fight_fingerprints in dict_of_fight_fingerprints.items():
+        MANIFEST.update_manifest_event(manifest, event_url, fight_fingerprints)
+    MANIFEST.save_manifest(manifest, config['manifest_file_name'])
+
+    # return
+    return set_of_career_fighters
+
+
+
+# check fighters
+def check_fighters(config: dict) -> dict:
+    '''
+    check the alphabetical pages of fighters for fighters that are not in fighter details
+    alphabetical pages whose hash has not changed since the last run are not parsed, their fighters are read from the fighter index
+
+    arguments:
+    config (dict): config from scrape_ufc_stats_config.yaml
+
+    returns:
+    a dict of fighter details of all alphabetical pages and urls of fighters to parse, for parse_fighters()
+    '''
+    print('### Checking for unparsed fighters... ###')
+    print('\n')
+    METRICS.start_stage('check fighters')
+
+    # read urls of existing fighter details
+    parsed_fighter_details_df = STORE.read_table(config['fighter_details_file_name'], columns=['URL'])
+    # get set of parsed fighter urls
+    set_of_parsed_urls = set(parsed_fighter_details_df['URL'])
+    # read hashes of alphabetical pages and fighters on them from previous runs
+    fighter_index = MANIFEST.load_fighter_index(config['fighter_index_file_name'])
+
+    # generate list of urls for fighter details
+    list_of_alphabetical_urls = LIB.generate_alphabetical_urls()
+
+    # create accumulator to store records of fighter details of each alphabetical url
+    fighter_details_records = LIB.RecordAccumulator(config['fighter_details_column_names'])
+    number_of_alphabetical_pages = 0
+    number_of_unchanged_alphabetical_pages = 0
+
+    # loop through records of each alphabetical url, pages are streamed and parsed concurrently in a single pass
+    # alphabetical pages that could not be fetched are quarantined
+    for url, output in tqdm(zip(list_of_alphabetical_urls, LIB.iter_changed_page_records(
+            list_of_alphabetical_urls,
+            LIB.iter_fighter_details,
+            MANIFEST.get_fighter_page_hashes(fighter_index),
+            quarantine=True
+            )), total=len(list_of_alphabetical_urls)):
+        if output is None:
+            continue
+        content_hash, records = output
+        # page has not changed, read its fighters from the fighter index
+        if records is None:
+            records = fighter_index['pages'][url]['fighters']
+            number_of_unchanged_alphabetical_pages += 1
+        # page has changed, record its hash and fighters
+        else:
+            MANIFEST.update_fighter_index_page(fighter_index, url, content_hash, records)
+        # append fighter details
+        fighter_details_records.extend(records)
+        number_of_alphabetical_pages += 1
+
+    # record hashes of alphabetical pages and their fighters
+    # fighters are checked against parsed fighter details below, so fighters left for the next run are still found on unchanged pages
+    MANIFEST.save_fighter_index(fighter_index, config['fighter_index_file_name'])
+    print(f'Alphabetical pages unchanged since the last run: {number_of_unchanged_alphabetical_pages} of {len(list_of_alphabetical_urls)}')
+    print('\n')
+
+    # convert fighter details of all alphabetical urls to df once
+    all_fighter_details_df = fighter_details_records.to_df()
+
+    # get list of unparsed fighter urls, each url is looked up in the set of parsed urls
+    list_of_unparsed_fighter_urls = [url for url in all_fighter_details_df['URL'] if url not in set_of_parsed_urls]
+
+    # fighter details are rewritten in full, so fighters are left for the next run if any alphabetical page is missing
+    if number_of_alphabetical_pages < len(list_of_alphabetical_urls):
+        print('### Fighters are left for the next run (alphabetical pages could not be fetched). ###')
+        print('\n')
+        list_of_unparsed_fighter_urls = []
+    # if list_of_unparsed_fighter_urls is empty then all available fighters have been parsed
+    elif not list_of_unparsed_fighter_urls:
+        print('### All available fighters have been parsed. ###')
+        print('\n')
+    else:
+        # show list of unparsed fighters
+        print('### There are unparsed fighters. ###')
+        print('\n')
+        print(list_of_unparsed_fighter_urls)
+        print('\n')
+
+    # return
+    return {
+        'fighter_details_df': all_fighter_details_df,
+        'unparsed_fighter_urls': list_of_unparsed_fighter_urls,
+    }
+
+
+
+# parse fighter pages
+def parse_fighter_pages(config: dict, urls: List[str], workers: int = 0) -> Tuple['pd.DataFrame', 'pd.DataFrame', 'pd.DataFrame', List[str]]:
+    '''
+    fetch and parse the tale of the tape, and with fighter_history the career averages and fight history, of fighter pages
+    each page is fetched once and all its tables are parsed from the same page
+
+    arguments:
+    config (dict): config from scrape_ufc_stats_config.yaml
+    urls (list): urls of fighters
+    workers (int): number of parser processes, 0 parses in this process
+
+    returns:
+    dfs of fighter tale of the tape, career averages and fight history, and a list of urls of fighters that could not be fetched
+    '''
+    # create accumulators to store records of fighters' tale of the tape, career averages and fight history
+    fighter_tott_records = LIB.RecordAccumulator(config['fighter_tott_column_names'])
+    fighter_averages_records = LIB.RecordAccumulator(config['fighter_averages_column_names'])
+    fighter_history_records = LIB.RecordAccumulator(config['fighter_history_column_names'])
+
+    # create empty list to store urls of fighters that could not be fetched
+    list_of_quarantined_fighter_urls = []
+
+    # fetch and parse each fighter
+    for url, output in tqdm(zip(urls, PIPE.iter_parsed_pages(urls, PIPE.parse_fighter_page, (config['fighter_history'],), workers, quarantine=True)), total=len(urls)):
+        # fighter page could not be fetched and is quarantined
+        if output is None:
+            list_of_quarantined_fighter_urls.append(url)
+            continue
+        fighter_tott_record, fighter_averages_record, fighter_history_record_list = output
+        # append record of fighter tale of the tape
+        fighter_tott_records.append(fighter_tott_record)
+        # append records of career averages and fight history
+        if config['fighter_history']:
+            fighter_averages_records.append(fighter_averages_record)
+            fighter_history_records.extend(fighter_history_record_list)
+
+    # return
+    return fighter_tott_records.to_df(), fighter_averages_records.to_df(), fighter_history_records.to_df(), list_of_quarantined_fighter_urls
+
+
+
+# replace rows of fighters
+def replace_fighter_rows(df: 'pd.DataFrame', file_name: str, urls: Iterable[str]) -> None:
+    '''
+    replace the rows of fighters in a table of fighter pages, career averages or fight history, with their new rows
+    rows are matched by the url of the fighter, so a fighter with no fights left has no rows
+    the table is written whole, and is created if it does not exist yet
+
+    arguments:
+    df (df): new rows of the fighters
+    file_name (str): file name of table in the config
+    urls (list): urls of fighters whose rows are replaced
+
+    returns:
+    none
+    '''
+    try:
+        parsed_df = STORE.read_table(file_name)
+    except FileNotFoundError:
+        parsed_df = df.iloc[:0]
+    parsed_df = parsed_df[~parsed_df['URL'].isin(set(urls))]
+
+    # write rows of other fighters and new rows
+    STORE.write_table(pd.concat([parsed_df, df], ignore_index=True) if len(parsed_df) else df, file_name)
+
+
+
+# parse fighters
+def parse_fighters(config: dict, fighters: dict, workers: int = 0) -> Set[str]:
+    '''
+    parse the tale of the tape of fighters found by check_fighters(), write fighter details and add to fighter tale of the tape
+    fighters that could not be fetched are left out, so they are parsed on the next run
+
+    arguments:
+    config (dict): config from scrape_ufc_stats_config.yaml
+    fighters (dict): fighters to parse, from check_fighters()
+    workers (int): number of parser processes, 0 parses in this process
+
+    returns:
+    a set of new fighters, whose url is added to career stats
+    '''
+    list_of_unparsed_fighter_urls = fighters['unparsed_fighter_urls']
+    if not list_of_unparsed_fighter_urls:
+        return set()
+
+    print('### Parsing Fighter ToTT... ###')
+    print('\n')
+    METRICS.start_stage('parse fighters')
+    # fetch and parse tale of the tape, career averages and fight history of each fighter
+    unparsed_fighter_tott_df, unparsed_fighter_averages_df, unparsed_fighter_history_df, list_of_quarantined_fighter_urls = parse_fighter_pages(config, list_of_unparsed_fighter_urls, workers)
+
+    # write fighter details to file
+    all_fighter_details_df = fighters['fighter_details_df']
+    STORE.write_table(all_fighter_details_df[~all_fighter_details_df['URL'].isin(list_of_quarantined_fighter_urls)], config['fighter_details_file_name'])
+    if list_of_quarantined_fighter_urls:
+        print(f'Fighters left for the next run (pages could not be fetched): {list_of_quarantined_fighter_urls}')
+        print('\n')
+
+    # add unparsed fighter tale of the tape below parsed fighter tale of the tape
+    STORE.append_table(unparsed_fighter_tott_df, config['fighter_tott_file_name'])
+    print(unparsed_fighter_tott_df)
+    print('\n')
+
+    # add career averages and fight history of unparsed fighters
+    if config['fighter_history']:
+        replace_fighter_rows(unparsed_fighter_averages_df, config['fighter_averages_file_name'], unparsed_fighter_tott_df['URL'])
+        replace_fighter_rows(unparsed_fighter_history_df, config['fighter_history_file_name'], unparsed_fighter_tott_df['URL'])
+
+    # return
+    return set(unparsed_fighter_tott_df['FIGHTER'].astype('string').str.strip().dropna())
+
+
+
+# update fight history of fighters
+def update_fighter_histories(config: dict, fighters: Iterable[str], workers: int = 0) -> None:
+    '''
+    parse the fighter pages of fighters of new, changed or removed fights again and replace their career averages and fight history
+    their pages are fetched again, as the pages in the page cache are from before the fights
+    fighters are matched by name with fighter tale of the tape, fighters with no tale of the tape yet are parsed by parse_fighters()
+    fighters that could not be fetched keep their rows until their next fight
+
+    arguments:
+    config (dict): config from scrape_ufc_stats_config.yaml
+    fighters (list): fighters of fights that are added, changed or removed, from parse_events()
+    workers (int): number of parser processes, 0 parses in this process
+
+    returns:
+    none
+    '''
+    fighters = set(fighters)
+    if not config['fighter_history'] or not fighters:
+        return
+
+    METRICS.start_stage('update fighter histories')
+    # get urls of fighters from tale of the tape
+    fighter_tott_df = STORE.read_table(config['fighter_tott_file_name'], columns=['FIGHTER', 'URL'])
+    list_of_fighter_urls = list(fighter_tott_df['URL'][fighter_tott_df['FIGHTER'].astype('string').str.strip().isin(fighters)])
+    if not list_of_fighter_urls:
+        return
+
+    print('### Parsing Fight History of Fighters of New Fights... ###')
+    print('\n')
+    # fetch and parse the pages of the fighters again
+    FETCH.expire_cached_pages(list_of_fighter_urls)
+    _, fighter_averages_df, fighter_history_df, list_of_quarantined_fighter_urls = parse_fighter_pages(config, list_of_fighter_urls, workers)
+    if list_of_quarantined_fighter_urls:
+        print(f'Fighters whose fight history is not updated (pages could not be fetched): {list_of_quarantined_fighter_urls}')
+        print('\n')
+
+    # replace career averages and fight history of the fighters
+    set_of_parsed_fighter_urls = set(list_of_fighter_urls) - set(list_of_quarantined_fighter_urls)
+    replace_fighter_rows(fighter_averages_df, config['fighter_averages_file_name'], set_of_parsed_fighter_urls)
+    replace_fighter_rows(fighter_history_df, config['fighter_history_file_name'], set_of_parsed_fighter_urls)
+    print(f'### Fight history updated for {len(set_of_parsed_fighter_urls)} fighters. ###')
+    print('\n')
+
+
+
+# update career stats
+def update_careers(config: dict, fighters: Iterable[str]) -> None:
+    '''
+    compute career stats again for fighters of new, changed or removed fights and new fighters
+    the whole table is computed if it does not exist yet
+
+    arguments:
+    config (dict): config from scrape_ufc_stats_config.yaml
+    fighters (list): fighters whose career stats change, from parse_events() and parse_fighters()
+
+    returns:
+    none
+    '''
+    if not config['fighter_career_stats']:
+        return
+
+    METRICS.start_stage('update careers')
+    updated_career_df = CAREER.update_career_stats(config, fighters)
+    print(f'### Career stats updated for {len(updated_career_df)} fighters. ###')
+    print('\n')
+
+
+
+# update events and fights
+def update_events(config: dict, workers: int = 0, reparse_events: Iterable[str] = ()) -> Set[str]:
+    '''
+    chain of stages of events, check events and then parse them
+
+    arguments:
+    config (dict): config from scrape_ufc_stats_config.yaml
+    workers (int): number of parser processes, 0 parses in this process
+    reparse_events (list): names of events to parse again
+
+    returns:
+    a set of fighters whose career stats change
+    '''
+    # return
+    return parse_events(config, check_events(config, reparse_events), workers)
+
+
+
+# update fighters
+def update_fighters(config: dict, workers: int = 0) -> Set[str]:
+    '''
+    chain of stages of fighters, check fighters and then parse them
+
+    arguments:
+    config (dict): config from scrape_ufc_stats_config.yaml
+    workers (int): number of parser processes, 0 parses in this process
+
+    returns:
+    a set of new fighters
+    '''
+    # return
+    return parse_fighters(config, check_fighters(config), workers)
+
+
+
+# find event to watch
+def find_watch_event(config: dict) -> Optional[List[str]]:
+    '''
+    find the upcoming event at the top of the page of all events, which is also the event in progress on fight night
+    only the first quick_check_bytes bytes of the page are downloaded
+
+    arguments:
+    config (dict): config from scrape_ufc_stats_config.yaml
+
+    returns:
+    a record of event name, url, date and location, or none if there is no upcoming event
+    '''
+    head = FETCH.get_page_head(config['completed_events_all_url'], config['quick_check_bytes'])
+
+    # return
+    return LIB.parse_upcoming_event([head])
+
+
+
+# start watch of event
+def start_watch(config: dict, event_record: List[str]) -> dict:
+    '''
+    start watching an event
+    fingerprints of fights written by an earlier watch of the event are read from the manifest
+    so the fight pages of fights whose result has not changed since are read from the page cache
+
+    arguments:
+    config (dict): config from scrape_ufc_stats_config.yaml
+    event_record (list): record of event name, url, date and location, from find_watch_event()
+
+    returns:
+    a dict of the state of the watch, for poll_watched_event()
+    '''
+    event_url = event_record[1]
+    manifest = MANIFEST.load_manifest(config['manifest_file_name'])
+
+    # return
+    return {
+        'event': event_record[0],
+        'url': event_url,
+        'event_years': STORE.get_event_years(pd.DataFrame([event_record], columns=LIB.event_details_column_names)),
+        # fingerprints of rows on the event page of fights that are written, from the manifest until they are written again
+        'fight_fingerprints': dict(manifest['events'].get(event_url, {}).get('fights', {})),
+        # bout, fight results and fight stats of each fight that is written
+        'fights': {},
+        # hash of the event page at the last poll whose fights were all written
+        'page_hash': None,
+        'finished': False,
+    }
+
+
+
+# write fights of watched event
+def write_watched_fights(config: dict, watch: dict, fight_urls: List[str]) -> None:
+    '''
+    replace the rows of a watched event in the tables of fights with its fights that have a result
+    the fingerprints of the written fights are recorded in the manifest, which is read again first as an update may have changed it
+
+    arguments:
+    config (dict): config from scrape_ufc_stats_config.yaml
+    watch (dict): state of the watch, from start_watch()
+    fight_urls (list): urls of fights with a result, in order of fights on the event page
+
+    returns:
+    none
+    '''
+    # create accumulators to store records of fight results and fight stats
+    fight_results_column_names, fight_stats_column_names = PIPE.get_fight_column_names(config)
+    fight_results_records = LIB.RecordAccumulator(fight_results_column_names)
+    fight_stats_records = LIB.RecordAccumulator(fight_stats_column_names)
+    list_of_bouts = []
+
+    # append records of each fight
+    for url in fight_urls:
+        bout, fight_results_record, fight_stats_record_list = watch['fights'][url]
+        list_of_bouts.append(bout)
+        fight_results_records.append(fight_results_record)
+        fight_stats_records.extend(fight_stats_record_list)
+
+    # convert records to dfs
+    fight_details_df = pd.DataFrame({'EVENT': watch['event'], 'BOUT': list_of_bouts, 'URL': fight_urls}, columns=config['fight_details_column_names'])
+    fight_results_df = fight_results_records.to_df()
+    fight_stats_df = fight_stats_records.to_df()
+
+    # normalise fight stats into numeric columns
+    if config['normalise_fight_stats']:
+        fight_stats_df = LIB.normalise_fight_stats(fight_stats_df, config['normalised_fight_stats_columns'])
+
+    # replace rows of the event
+    STORE.append_table(fight_details_df, config['fight_details_file_name'], watch['event_years'], [watch['event']])
+    STORE.append_table(fight_results_df, config['fight_results_file_name'], watch['event_years'], [watch['event']])
+    STORE.append_table(fight_stats_df, config['fight_stats_file_name'], watch['event_years'], [watch['event']])
+
+    # record fingerprints of written fights
+    manifest = MANIFEST.load_manifest(config['manifest_file_name'])
+    MANIFEST.update_manifest_event(manifest, watch['url'], {url: watch['fight_fingerprints'][url] for url in fight_urls})
+    MANIFEST.save_manifest(manifest, config['manifest_file_name'])
+
+
+
+# poll watched event
+def poll_watched_event(config: dict, watch: dict) -> bool:
+    '''
+    poll the event page of a watched event and write the fights that gained or changed a result since the last poll
+    the event page is revalidated with a conditional request, so until a result is added the server replies not modified and nothing is parsed
+    only fight pages of fights whose row on the event page changed are fetched, written fights are kept in the state of the watch
+    fights that lost their result or were removed from the card are removed, fights that could not be fetched are fetched again on the next poll
+    pages are parsed in this process, a pool of parser processes would take longer to start than the few fight pages of a poll take to parse
+
+    arguments:
+    config (dict): config from scrape_ufc_stats_config.yaml
+    watch (dict): state of the watch, from start_watch(), updated in place
+
+    returns:
+    true once every fight on the event page has a result and is written
+    '''
+    METRICS.start_stage('poll watched event')
+    # revalidate event page with the server
+    FETCH.expire_cached_pages([watch['url']])
+    page = FETCH.get_page(watch['url'])
+    page_hash = hashlib.sha256(page).hexdigest()
+    if page_hash == watch['page_hash']:
+        METRICS.start_stage(None)
+        return watch['finished']
+
+    # parse fingerprints of fights and fights with a result
+    soup = SOUP.make_soup(page)
+    fight_fingerprints = LIB.parse_fight_fingerprints(soup)
+    list_of_finished_fight_urls = LIB.parse_finished_fight_urls(soup)
+    set_of_finished_fight_urls = set(list_of_finished_fight_urls)
+
+    # find fights that gained or changed a result, and written fights that lost their result or were removed
+    list_of_changed_fight_urls = [url for url in list_of_finished_fight_urls
+                                  if url not in watch['fights'] or watch['fight_fingerprints'].get(url) != fight_fingerprints[url]]
+    list_of_removed_fight_urls = [url for url in watch['fights'] if url not in set_of_finished_fight_urls]
+
+    # fetch fight pages of new and changed results, fight pages of results written by an earlier watch are read from the page cache
+    FETCH.expire_cached_pages([url for url in list_of_changed_fight_urls if watch['fight_fingerprints'].get(url) != fight_fingerprints[url]])
+    FETCH.release_quarantined_urls(list_of_changed_fight_urls)
+    list_of_written_bouts = []
+    list_of_quarantined_fight_urls = []
+    for url, output in zip(list_of_changed_fight_urls, PIPE.iter_parsed_pages(
+            list_of_changed_fight_urls,
+            PIPE.parse_fight_page,
+            (config['totals_column_names'], config['significant_strikes_column_names'], config['id_columns']),
+            quarantine=True
+            )):
+        # fight page could not be fetched, it is fetched again on the next poll
+        if output is None:
+            list_of_quarantined_fight_urls.append(url)
+            continue
+        watch['fights'][url] = output
+        watch['fight_fingerprints'][url] = fight_fingerprints[url]
+        list_of_written_bouts.append(output[0])
+    for url in list_of_removed_fight_urls:
+        watch['fights'].pop(url)
+        watch['fight_fingerprints'].pop(url, None)
+
+    # write fights with a result, in order of the event page, as a run of its own in the change log
+    if list_of_written_bouts or list_of_removed_fight_urls:
+        CHANGES.start_run()
+        write_watched_fights(config, watch, [url for url in fight_fingerprints if url in watch['fights']])
+        print(f'### {len(watch["fights"])} of {len(fight_fingerprints)} bouts of {watch["event"]} written. ###')
+        print('\n')
+        if list_of_written_bouts:
+            print(f'New or changed results: {list_of_written_bouts}')
+            print('\n')
+    if list_of_quarantined_fight_urls:
+        print(f'Fights left for the next poll (fight pages could not be fetched): {list_of_quarantined_fight_urls}')
+        print('\n')
+
+    # the event page is parsed again on the next poll until all its fights are written
+    if not list_of_quarantined_fight_urls:
+        watch['page_hash'] = page_hash
+    watch['finished'] = bool(fight_fingerprints) and not list_of_quarantined_fight_urls and len(list_of_finished_fight_urls) == len(fight_fingerprints)
+    METRICS.start_stage(None)
+
+    # return
+    return watch['finished']
+
+
+
+# run chains of stages at the same time
+async def run_chains(chains: List[Tuple[Callable, tuple]], workers: int = 0) -> list:
+    '''
+    run chains of stages at the same time, each in its own thread
+    every chain runs to its end before the first error of a chain is raised, so no chain is left half written
+    with more than one chain and parser processes, parser processes are started with forkserver
+    so no parser process is forked while a thread of another chain holds a lock
+
+    arguments:
+    chains (list): list of tuples of function and its arguments
+    workers (int): number of parser processes of each chain
+
+    returns:
+    a list of the outputs of the chains
+    '''
+    if workers and len(chains) > 1:
+        start_methods = multiprocessing.get_all_start_methods()
+        PIPE.configure(start_method='forkserver' if 'forkserver' in start_methods else 'spawn')
+
+    outputs = await asyncio.gather(*[asyncio.to_thread(function, *args) for function, args in chains], return_exceptions=True)
+    for output in outputs:
+        if isinstance(output, BaseException):
+            raise output
+
+    # return
+    return outputs
+
+
+
+# run update
+async def run_update(config: dict, workers: int = 0, events: bool = True, fighters: bool = True, reparse_events: Iterable[str] = ()) -> None:
+    '''
+    run the chains of events and fighters at the same time, then update fight history and career stats of the fighters they changed
+    a plain update first finds events whose fights are in fight history but not in fight details, and parses them again
+
+    arguments:
+    config (dict): config from scrape_ufc_stats_config.yaml
+    workers (int): number of parser processes of each chain, 0 parses in the thread of the chain
+    events (bool): run the chain of events
+    fighters (bool): run the chain of fighters
+    reparse_events (list): names of events to parse again
+
+    returns:
+    none
+    '''
+    # new rows are parsed with the current parser, so tables of stages whose parser changed are parsed again with reparse
+    recorded_parser_versions = PIPE.load_parser_versions(config['parser_versions_file_name'])
+    changed_stages = [stage for stage in PIPE.list_changed_stages(config) if stage in recorded_parser_versions]
+    if changed_stages:
+        print(f'### The parser or columns of stages {changed_stages} changed since their tables were written, run reparse to parse them again. ###')
+        print('\n')
+
+    # events with fights in fight history that are not in fight details are parsed again, before the chain of fighters writes fight history
+    if events and not reparse_events:
+        reparse_events = check_fighter_history(config)
+
+    chains = []
+    if events:
+        chains.append((update_events, (config, workers, list(reparse_events))))
+    if fighters:
+        chains.append((update_fighters, (config, workers)))
+    outputs = await run_chains(chains, workers)
+
+    # update fight history of fighters of new fights, fighters parsed by the chain of fighters have it already
+    fight_fighters = outputs[0] if events else set()
+    new_fighters = outputs[-1] if fighters else set()
+    await asyncio.to_thread(update_fighter_histories, config, fight_fighters - new_fighters, workers)
+    # update career stats once fights and fighters are written
+    await asyncio.to_thread(update_careers, config, set().union(*outputs))
+
+
+
+# run backfill
+async def run_backfill(config: dict, resume: bool = False, workers: int = 0, chunk_size: int = 100) -> None:
+    '''
+    run a backfill of scrape_ufc_stats_pipeline.py with the fights and fighters running at the same time
+
+    arguments:
+    config (dict): config from scrape_ufc_stats_config.yaml
+    resume (bool): continue the previous backfill
+    workers (int): number of parser processes of each chain, 0 parses in the thread of the chain
+    chunk_size (int): number of urls parsed between flushes to the journal
+
+    returns:
+    none
+    '''
+    if not PIPE.start_backfill(config, resume):
+        return
+    await run_chains([
+        (PIPE.backfill_fights, (config, workers, chunk_size)),
+        (PIPE.backfill_fighters, (config, workers, chunk_size)),
+    ], workers)
+    await asyncio.to_thread(PIPE.finish_backfill, config)
+
+
+
+# run reparse
+async def run_reparse(config: dict, stages: List[str], workers: int = 0) -> None:
+    '''
+    parse the pages of stages again from the page cache and rewrite only their tables, without using the network
+    the stages of events and fights and the stages of fighters run at the same time, then career stats are computed again
+
+    arguments:
+    config (dict): config from scrape_ufc_stats_config.yaml
+    stages (list): stages to parse again, from PIPE.parser_versions
+    workers (int): number of parser processes of each chain, 0 parses in the thread of the chain
+
+    returns:
+    none
+    '''
+    FETCH.configure(offline=True)
+    chains = []
+    if {'events', 'event', 'fight'} & set(stages):
+        chains.append((PIPE.reparse_fights, (config, stages, workers)))
+    if {'fighters', 'fighter'} & set(stages):
+        chains.append((PIPE.reparse_fighters, (config, stages, workers)))
+    await run_chains(chains, workers)
+    await asyncio.to_thread(PIPE.finish_reparse, config, stages)
+
+
+
+# run watch
+async def run_watch(config: dict, interval: float = None, hours: float = None) -> None:
+    '''
+    watch the upcoming event while it is held, writing the results and stats of each bout soon after they appear on its event page
+    its event page is polled every interval seconds, with a conditional request that the server answers not modified until the page changes
+    rows are written on every poll that finds a new result, so the watch can be stopped at any time
+    career stats and fight history of its fighters are updated by the next update, which parses the completed event again from the page cache
+
+    arguments:
+    config (dict): config from scrape_ufc_stats_config.yaml
+    interval (float): seconds between polls, defaults to config['watch_interval_seconds']
+    hours (float): hours after which the watch stops, defaults to config['watch_hours']
+
+    returns:
+    none
+    '''
+    interval = config['watch_interval_seconds'] if interval is None else interval
+    hours = config['watch_hours'] if hours is None else hours
+
+    # find the upcoming event
+    event_record = await asyncio.to_thread(find_watch_event, config)
+    if event_record is None:
+        print('### There is no upcoming event to watch. ###')
+        print('\n')
+        return
+    print(f'### Watching {event_record[0]} every {interval} seconds... ###')
+    print('\n')
+    watch = await asyncio.to_thread(start_watch, config, event_record)
+
+    # poll the event page until every bout has a result or the watch is over
+    stop_at = time.time() + hours * 3600
+    while True:
+        try:
+            finished = await asyncio.to_thread(poll_watched_event, config, watch)
+        except FETCH.FetchError as error:
+            print(f'Event page could not be fetched, it is polled again in {interval} seconds: {error}')
+            print('\n')
+            finished = False
+        if finished:
+            print(f'### Every bout of {watch["event"]} has a result. ###')
+            print('\n')
+            return
+        if time.time() >= stop_at:
+            print(f'### Stopped watching {watch["event"]} after {hours} hours. ###')
+            print('\n')
+            return
+        await asyncio.sleep(interval)
+
+
+
+# run command line
+def main(argv: List[str] = None) -> None:
+    '''
+    run a command from the command line, update, fighters, reparse, backfill or watch
+
+    arguments:
+    argv (list): command line arguments, defaults to sys.argv
+
+    returns:
+    none
+    '''
+    # read arguments
+    parser = argparse.ArgumentParser(description='scrape ufc events, fights and fighters')
+    parser.add_argument('--config', default='scrape_ufc_stats_config.yaml', help='config file')
+    parser.add_argument('--workers', type=int, default=None, help='number of parser processes of each chain, 0 parses in the main process, defaults to parse_workers of the config')
+    parser.add_argument('--profile', choices=METRICS.profilers, default=None, help='profile the run with cprofile or pyinstrument')
+    commands = parser.add_subparsers(dest='command', required=True)
+    update_parser = commands.add_parser('update', help='parse new, incomplete and changed events and new fighters')
+    update_parser.add_argument('--quick', action='store_true', help='exit without loading the library if the newest events and alphabetical pages of fighters have not changed')
+    commands.add_parser('fighters', help='parse new fighters')
+    reparse_parser = commands.add_parser('reparse', help='parse tables whose parser or columns changed, or events, again from the page cache')
+    reparse_parser.add_argument('events', nargs='*', help='names of events to parse again, with their event pages fetched if they expired')
+    reparse_parser.add_argument('--stage', action='append', default=[], help='stage to parse again, events, event, fight, fighters or fighter, can be given more than once, defaults to stages whose recorded parser or columns changed')
+    reparse_parser.add_argument('--all', action='store_true', help='parse all stages again')
+    backfill_parser = commands.add_parser('backfill', help='parse all past events, fights and fighters with checkpoints')
+    backfill_parser.add_argument('--resume', action='store_true', help='continue the previous backfill from its journal')
+    backfill_parser.add_argument('--chunk-size', type=int, default=None, help='number of pages parsed between flushes to the journal, defaults to journal_chunk_size of the config')
+    watch_parser = commands.add_parser('watch', help='write results and stats of bouts of the upcoming event as they finish')
+    watch_parser.add_argument('--interval', type=float, default=None, help='seconds between polls of the event page, defaults to watch_interval_seconds of the config')
+    watch_parser.add_argument('--hours', type=float, default=None, help='hours after which the watch stops, defaults to watch_hours of the config')
+    args = parser.parse_args(argv)
+
+    # import config
+    import yaml
+    with open(args.config) as file:
+        config = yaml.safe_load(file)
+    workers = config['parse_workers'] if args.workers is None else args.workers
+
+    # configure fetch engine and metrics, the library is only configured once there is something to parse
+    configure_fetch(config, args.profile)
+    METRICS.start_run()
+
+    # check if anything changed since the last update
+    if args.command == 'update' and args.quick:
+        update_due, quick_check_state, changed_urls = quick_check(config)
+        if not update_due:
+            print('### Nothing has changed since the last update. ###')
+            print('\n')
+            save_quick_check_state(quick_check_state, config['quick_check_file_name'])
+            METRICS.finish_run()
+            return
+
+    configure_library(config)
+
+    # run command
+    if args.command == 'update':
+        # read pages the quick check found changed fresh, not a copy within its time to live in the page cache
+        if args.quick:
+            FETCH.expire_cached_pages(changed_urls)
+        asyncio.run(run_update(config, workers))
+        # record fingerprints once the update is done, unless pages were left for the next run or changed pages were not read fresh
+        if args.quick and not FETCH.list_quarantined_urls() and not FETCH.list_expired_cached_urls(changed_urls):
+            save_quick_check_state({**quick_check_state, 'updated_at': time.time()}, config['quick_check_file_name'])
+    elif args.command == 'fighters':
+        asyncio.run(run_update(config, workers, events=False))
+    elif args.command == 'reparse' and args.events:
+        asyncio.run(run_update(config, workers, fighters=False, reparse_events=args.events))
+    elif args.command == 'reparse':
+        unknown_stages = [stage for stage in args.stage if stage not in PIPE.parser_versions]
+        if unknown_stages:
+            parser.error(f'unknown stages {unknown_stages}, stages are {list(PIPE.parser_versions)}')
+        # stages with no recorded version, e.g. tables of a checkout that were not written by this copy, are only parsed with --stage or --all
+        recorded_parser_versions = PIPE.load_parser_versions(config['parser_versions_file_name'])
+        stages = list(PIPE.parser_versions) if args.all else args.stage or [stage for stage in PIPE.list_changed_stages(config) if stage in recorded_parser_versions]
+        if not stages and not recorded_parser_versions:
+            print('### No parser versions are recorded, give the stages to parse again with --stage or --all. ###')
+            print('\n')
+        elif not stages:
+            print('### All tables were parsed with the current parser and columns. ###')
+            print('\n')
+        else:
+            # every page is read from the page cache, so no table is rewritten unless all pages of the stages are cached
+            missing_urls = FETCH.list_uncached_urls(PIPE.list_reparse_urls(config, stages))
+            if missing_urls:
+                parser.exit(1, f'{len(missing_urls)} pages of stages {stages} are not in the page cache, no tables were rewritten: {missing_urls[:10]}{" ..." if len(missing_urls) > 10 else ""}\n')
+            asyncio.run(run_reparse(config, stages, workers))
+    elif args.command == 'watch':
+        asyncio.run(run_watch(config, args.interval, args.hours))
+    else:
+        chunk_size = config['journal_chunk_size'] if args.chunk_size is None else args.chunk_size
+        asyncio.run(run_backfill(config, args.resume, workers, chunk_size))
+
+    # write metrics of stages and library functions of the run
+    METRICS.finish_run()
+
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,382 @@
+'''
+Overview
+
+parser backends for scraping ufc stats
+the backend used to create soups is set in the config with parser_backend
+
+html.parser
+beautifulsoup with python's built in html parser, the original and slowest backend
+
+lxml
+beautifulsoup with the lxml parser, builds the same soup faster
+
+fast
+lxml.html documents searched with compiled xpath selectors
+FastSoup wraps each lxml element with the small part of the beautifulsoup api used by the library
+find(), find_all(), text, get_text(), next_sibling and attributes
+so every parse function of the library runs unchanged and gives the same output on every backend
+
+streaming
+pages too large to hold as a soup, e.g. the index of all events, are parsed in a single pass as they are downloaded
+iter_tags() feeds chunks of a page to a parser and yields matching tags as soon as they are closed
+python's html parser for html.parser, or lxml's pull parser for lxml and fast, which drops each part of the page once it is used
+so records can be built while the rest of the page is still being fetched, and memory does not grow with the page
+
+'''
+
+# imports
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from html.parser import HTMLParser
+import codecs
+import itertools
+from bs4 import BeautifulSoup, UnicodeDammit
+
+# import metrics
+import scrape_ufc_stats_metrics as METRICS
+
+
+
+# parser settings, update with configure()
+# parser_backend is one of html.parser, lxml or fast
+settings = {
+    'parser_backend': 'html.parser',
+}
+
+# available parser backends
+parser_backends = ['html.parser', 'lxml', 'fast']
+
+
+
+# configure parser settings
+def configure(parser_backend: str = None) -> None:
+    '''
+    update parser settings
+
+    arguments:
+    parser_backend (str): one of html.parser, lxml or fast
+
+    returns:
+    none
+    '''
+    if parser_backend is not None:
+        if parser_backend not in parser_backends:
+            raise ValueError(f'parser_backend must be one of {parser_backends}, not {parser_backend}')
+        settings['parser_backend'] = parser_backend
+
+
+
+# compiled xpath selectors, keyed by tag name and class
+_selectors: Dict[Tuple[str, Optional[str]], object] = {}
+
+
+
+# get compiled xpath selector
+def get_selector(name: str, class_: str = None):
+    '''
+    get a compiled xpath selector that finds descendant tags the same way as beautifulsoup's find_all(name, class_=class_)
+    a single class matches any tag that has the class
+    several classes separated by ' ' match tags whose whole class attribute is exactly those classes in that order
+    selectors are compiled once and reused
+
+    arguments:
+    name (str): name of tag, e.g. 'a'
+    class_ (str): class of tag, e.g. 'b-link b-link_style_black'
+
+    returns:
+    a compiled xpath selector
+    '''
+    key = (name, class_)
+    if key not in _selectors:
+        from lxml import etree
+        if class_ is None:
+            _selectors[key] = etree.XPath(f'.//{name}')
+        elif ' ' in class_:
+            _selectors[key] = etree.XPath(f'.//{name}[normalize-space(@class) = "{class_}"]')
+        else:
+            _selectors[key] = etree.XPath(f'.//{name}[contains(concat(" ", normalize-space(@class), " "), " {class_} ")]')
+
+    # return
+    return _selectors[key]
+
+
+
+# lxml element with the beautifulsoup api used by the library
+class FastSoup:
+    '''
+    wrap an lxml element with the part of the beautifulsoup api used by the parse functions of the library
+
+    arguments:
+    element (lxml element): element to wrap
+    '''
+
+    __slots__ = ['element']
+
+    def __init__(self, element):
+        self.element = element
+
+    # find all descendant tags
+    def find_all(self, name: str, class_: str = None) -> List['FastSoup']:
+        return [FastSoup(element) for element in get_selector(name, class_)(self.element)]
+
+    # find first descendant tag
+    def find(self, name: str, class_: str = None) -> Optional['FastSoup']:
+        elements = get_selector(name, class_)(self.element)
+        return FastSoup(elements[0]) if elements else None
+
+    # text of tag and all descendants
+    @property
+    def text(self) -> str:
+        return str(self.element.text_content())
+
+    def get_text(self) -> str:
+        return str(self.element.text_content())
+
+    # text directly after tag
+    @property
+    def next_sibling(self) -> str:
+        return self.element.tail or ''
+
+    # attribute of tag
+    def __getitem__(self, attribute: str) -> str:
+        value = self.element.get(attribute)
+        if value is None:
+            raise KeyError(attribute)
+        return value
+
+    def get(self, attribute: str, default: str = None) -> Optional[str]:
+        return self.element.get(attribute, default)
+
+
+
+# create soup from page
+def make_soup(page: bytes, parser_backend: str = None):
+    '''
+    create soup from raw content of a page with the parser backend
+
+    arguments:
+    page (bytes): raw content of page
+    parser_backend (str): one of html.parser, lxml or fast, defaults to settings['parser_backend']
+
+    returns:
+    a beautifulsoup soup, or a FastSoup for the fast backend
+    '''
+    parser_backend = parser_backend or settings['parser_backend']
+
+    with METRICS.timed('soup_seconds', backend=parser_backend):
+        # beautifulsoup backends
+        if parser_backend != 'fast':
+            return BeautifulSoup(page, parser_backend)
+
+        # decode page the same way as beautifulsoup, then parse with lxml
+        import lxml.html
+        if isinstance(page, bytes):
+            page = UnicodeDammit(page, is_html=True).unicode_markup
+
+        # return
+        return FastSoup(lxml.html.document_fromstring(page))
+
+
+
+# check if class of tag matches
+def match_class(tag_class: Optional[str], class_: Optional[str]) -> bool:
+    '''
+    check if the class attribute of a tag matches class_ the same way as beautifulsoup's find_all(name, class_=class_)
+    a single class matches any tag that has the class
+    several classes separated by ' ' match tags whose whole class attribute is exactly those classes in that order
+
+    arguments:
+    tag_class (str): class attribute of tag, none if it has no class
+    class_ (str): class to match, none matches every tag
+
+    returns:
+    true if the tag matches
+    '''
+    if class_ is None:
+        return True
+    if tag_class is None:
+        return False
+
+    # return
+    return ' '.join(tag_class.split()) == class_ if ' ' in class_ else class_ in tag_class.split()
+
+
+
+# single pass parser of matching tags
+class TagStream(HTMLParser):
+    '''
+    find tags the same way as find_all(name, class_) for a list of selectors while a page is fed in chunks
+    a tag is collected with its attributes and text, the text of all its descendants, and is ready once it is closed
+    ready tags are kept in document order of their start tags, nothing else of the page is kept
+
+    arguments:
+    selectors (list): list of tuples of name and class of tags, e.g. ('a', 'b-link b-link_style_black')
+    '''
+
+    def __init__(self, selectors: List[Tuple[str, Optional[str]]]):
+        super().__init__(convert_charrefs=True)
+        self.selectors = selectors
+        # open tags being collected, each a list of selector index, name, depth of nested tags of the same name, attributes and text
+        self.open_tags = []
+        # tags started in document order, each is ready once its text is complete
+        self.tags = []
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        # count nested tags with the same name as an open tag
+        for open_tag in self.open_tags:
+            if open_tag[1] == tag:
+                open_tag[2] += 1
+        # collect tag if it matches a selector
+        attributes = None
+        for index, (name, class_) in enumerate(self.selectors):
+            if name == tag:
+                attributes = attributes if attributes is not None else dict(attrs)
+                if match_class(attributes.get('class'), class_):
+                    open_tag = [index, tag, 1, attributes, [], False]
+                    self.open_tags.append(open_tag)
+                    self.tags.append(open_tag)
+
+    def handle_endtag(self, tag: str) -> None:
+        # close collected tags once the end tag of their own depth is reached
+        for open_tag in self.open_tags:
+            if open_tag[1] == tag:
+                open_tag[2] -= 1
+                if not open_tag[2]:
+                    open_tag[5] = True
+        self.open_tags = [open_tag for open_tag in self.open_tags if not open_tag[5]]
+
+    def handle_data(self, data: str) -> None:
+        for open_tag in self.open_tags:
+            open_tag[4].append(data)
+
+    # get tags that are ready
+    def pop_ready_tags(self) -> List[Tuple[int, str, Dict[str, Optional[str]]]]:
+        '''
+        remove and return tags that are closed, in document order, stopping at the first tag that is still open
+
+        arguments:
+        none
+
+        returns:
+        a list of tuples of selector index, text and attributes
+        '''
+        ready = 0
+        while ready < len(self.tags) and self.tags[ready][5]:
+            ready += 1
+        ready_tags = [(tag[0], ''.join(tag[4]), tag[3]) for tag in self.tags[:ready]]
+        del self.tags[:ready]
+
+        # return
+        return ready_tags
+
+
+
+# find tags while streaming a page
+def iter_tags(chunks: Iterable[Union[bytes, str]], selectors: List[Tuple[str, Optional[str]]], parser_backend: str = None) -> Iterator[Tuple[int, str, Dict[str, Optional[str]]]]:
+    '''
+    find tags matching selectors in a page fed in chunks, in a single pass
+    tags are yielded in document order as soon as they are closed, tags left open at the end of the page are closed
+    chunks of bytes are decoded as utf-8, the encoding of ufcstats.com
+
+    arguments:
+    chunks (iterable): chunks of content of page, e.g. from FETCH.iter_page_chunks()
+    selectors (list): list of tuples of name and class of tags, e.g. ('a', 'b-link b-link_style_black')
+    parser_backend (str): html.parser uses python's html parser, lxml and fast use lxml, defaults to settings['parser_backend']
+
+    returns:
+    an iterator of tuples of index of matching selector, text and attributes of each tag
+    '''
+    parser_backend = parser_backend or settings['parser_backend']
+
+    # decode chunks, keeping bytes of a character split between chunks for the next chunk
+    def decode_chunks():
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        for chunk in chunks:
+            yield decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+        yield decoder.decode(b'', final=True)
+
+    # lxml backends
+    if parser_backend != 'html.parser':
+        yield from iter_lxml_tags(decode_chunks(), selectors)
+        return
+
+    # feed chunks and yield tags as they are closed
+    stream = TagStream(selectors)
+    for chunk in decode_chunks():
+        stream.feed(chunk)
+        yield from stream.pop_ready_tags()
+
+    # close any tags left open
+    stream.close()
+    for open_tag in stream.open_tags:
+        open_tag[5] = True
+    yield from stream.pop_ready_tags()
+
+
+
+# find tags while streaming a page with lxml
+def iter_lxml_tags(chunks: Iterable[str], selectors: List[Tuple[str, Optional[str]]]) -> Iterator[Tuple[int, str, Dict[str, Optional[str]]]]:
+    '''
+    find tags matching selectors in a page fed in chunks to lxml's pull parser, in a single pass
+    gives the same tags as TagStream, with the text of a tag taken the same way as FastSoup
+    elements are cleared once they are closed and no matching tag is open
+    after each chunk everything before the last closed element is removed, so the tree holds about one chunk of the page
+
+    arguments:
+    chunks (iterable): chunks of content of page as text
+    selectors (list): list of tuples of name and class of tags
+
+    returns:
+    an iterator of tuples of index of matching selector, text and attributes of each tag
+    '''
+    from lxml import etree
+    # only tags with the names of selectors are reported by the parser
+    selectors_by_name: Dict[str, List[Tuple[int, Optional[str]]]] = {}
+    for index, (name, class_) in enumerate(selectors):
+        selectors_by_name.setdefault(name, []).append((index, class_))
+    parser = etree.HTMLPullParser(events=('start', 'end'), tag=list(selectors_by_name))
+    # matching tags in document order of their start tags, each a list of selector index and output once it is closed
+    tags = []
+    # open matching tags of each element
+    open_tags: Dict[object, list] = {}
+
+    def read_events():
+        last_element = None
+        for event, element in parser.read_events():
+            if event == 'start':
+                for index, class_ in selectors_by_name[element.tag]:
+                    if match_class(element.get('class'), class_):
+                        tag = [index, None]
+                        tags.append(tag)
+                        open_tags.setdefault(element, []).append(tag)
+                continue
+            # close matching tags of element
+            if element in open_tags:
+                output = ''.join(element.itertext()), dict(element.attrib)
+                for tag in open_tags.pop(element):
+                    tag[1] = (tag[0],) + output
+            # drop content of element once no matching tag needs its text
+            if not open_tags:
+                element.clear(keep_tail=True)
+                last_element = element
+        # drop everything before the last closed element once no matching tag needs its text
+        if not open_tags and last_element is not None:
+            for node in itertools.chain([last_element], last_element.iterancestors()):
+                parent = node.getparent()
+                while parent is not None and node.getprevious() is not None:
+                    del parent[0]
+        # yield closed tags in document order
+        ready = 0
+        while ready < len(tags) and tags[ready][1] is not None:
+            ready += 1
+        outputs = [tag[1] for tag in tags[:ready]]
+        del tags[:ready]
+        return outputs
+
+    # feed chunks and yield tags as they are closed
+    for chunk in chunks:
+        parser.feed(chunk)
+        yield from read_events()
+
+    # close parser, which closes any tags left open
+    parser.close()
+    yield from read_events()
@@ -0,0 +1,1250 @@
+'''
+Overview
+
+storage backends for the parsed ufc stats tables
+the backend used to read and write tables is set in the config with storage_backend
+tables are named by their file names in the config, e.g. ufc_fight_stats.csv
+
+csv
+one csv file per table, the original backend
+every update reads the whole file and writes it again
+
+parquet
+one directory per table with the extension .parquet, e.g. ufc_fight_stats.parquet
+columns are typed, text columns are stored as strings and count columns as integers
+tables of fights are partitioned by the year of their event, e.g. ufc_fight_stats.parquet/YEAR=2024/part-000003.parquet
+an update only writes new part files for the new rows
+and only rewrites the partitions of events that are replaced
+readers can load only the columns and years they need
+
+sqlite
+one database file for all tables, settings['database_file_name'], with one table per table of the config, e.g. ufc_fight_stats
+rows are keyed by the ids of ufcstats.com in their urls, e.g. de1a3734be60e6a1 of http://ufcstats.com/fight-details/de1a3734be60e6a1
+tables get EVENT_ID, FIGHT_ID and FIGHTER_ID columns, fight stats get the ids of their fight through the fight details written before them
+an update is one transaction that removes rows of replaced events and rows with the same id as new rows, then inserts the new rows
+columns used for lookups are indexed, so reading the rows of one fighter or fight does not read the whole table
+
+id columns
+with settings['id_columns'], every table keeps the ids of ufcstats.com as columns on every backend
+the id of the page of each row is taken from its url when the table is written, e.g. FIGHTER_ID of fighter tale of the tape
+ids of other pages, e.g. the event and fighters of fight results and fight stats, are parsed from the links of the fight page
+IndexedTable reads a table with a hash index of each of its id columns, to find the rows of an id without a scan or a join on names
+
+compact columns
+with settings['categorical_column_names'], repeated text columns such as EVENT, BOUT and FIGHTER are read as pandas categoricals
+the categories of each column are shared by all tables and kept in settings['categories_file_name']
+new values are only ever added at the end, so a value has the same code in every table and on every run
+parquet tables store these columns dictionary encoded, csv files and the sqlite database store them as text
+
+change log
+with a change log set in scrape_ufc_stats_changes, the rows each write inserts, updates or deletes are recorded, keyed by the ids of ufcstats.com
+the rows a write replaces are read from the table first, except the csv backend's append, which reads the whole file anyway
+
+rows are returned in the same order on every backend
+tables of fights keep the newest events first, other tables keep new rows last
+
+'''
+
+# imports
+from contextlib import closing, contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import argparse
+import json
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import numpy as np
+import pandas as pd
+
+# import metrics and change log
+import scrape_ufc_stats_metrics as METRICS
+import scrape_ufc_stats_changes as CHANGES
+
+
+
+# storage settings, update with configure()
+# storage_backend is one of csv, parquet or sqlite
+# column_types maps a column name to the type it is stored as by typed backends, other columns are stored as strings
+# database_file_name is the database file of the sqlite backend
+# id_columns keeps the ids of ufcstats.com from urls as columns of every table
+# categorical_column_names are the text columns kept as categoricals, none without compact columns
+# categories_file_name is the json file of the categories of categorical columns
+settings = {
+    'storage_backend': 'csv',
+    'database_file_name': 'ufc_stats.sqlite',
+    'id_columns': False,
+    'categorical_column_names': [],
+    'categories_file_name': '',
+    'column_types': {
+        'KD': 'Int16',
+        'SUB.ATT': 'Int16',
+        'REV.': 'Int16',
+    },
+}
+
+# available storage backends
+storage_backends = ['csv', 'parquet', 'sqlite']
+
+# name of partition column of tables of fights
+partition_column_name = 'YEAR'
+
+# ids of ufcstats.com in urls, e.g. de1a3734be60e6a1 of http://ufcstats.com/fight-details/de1a3734be60e6a1
+url_id_pattern = r'/(?:event|fight|fighter)-details/([0-9a-f]+)'
+# id columns added to tables by the sqlite backend, and with id columns
+id_column_names = ['EVENT_ID', 'FIGHT_ID', 'FIGHTER_ID']
+# id columns of the fighters of fight results, parsed from fight pages with id columns
+fighter_id_column_names = ['FIGHTER_A_ID', 'FIGHTER_B_ID']
+# columns indexed by the sqlite backend, if the table has them
+indexed_column_names = ['EVENT', 'BOUT', 'URL', 'FIGHTER'] + id_column_names + fighter_id_column_names
+# column of the order of rows in tables of the sqlite backend
+row_order_column_name = 'ROW_ORDER'
+
+# categories of each categorical column in the order they were added, and their categorical dtypes
+# categories are shared by the threads of a run and only ever added to
+_categories: Dict[str, Dict[str, None]] = {}
+_categorical_dtypes: Dict[str, pd.CategoricalDtype] = {}
+_categories_changed = False
+_categories_lock = threading.Lock()
+
+
+
+# configure storage settings
+def configure(storage_backend: str = None, column_types: Dict[str, str] = None, database_file_name: str = None, id_columns: bool = None,
+              categorical_column_names: List[str] = None, categories_file_name: str = None) -> None:
+    '''
+    update storage settings
+    the categories of categorical columns are loaded from categories_file_name
+
+    arguments:
+    storage_backend (str): one of csv, parquet or sqlite
+    column_types (dict): column name to type stored by typed backends, added to the existing column types
+    database_file_name (str): database file of the sqlite backend
+    id_columns (bool): keep the ids of ufcstats.com from urls as columns of every table
+    categorical_column_names (list): text columns kept as categoricals, an empty list turns compact columns off
+    categories_file_name (str): json file of the categories of categorical columns
+
+    returns:
+    none
+    '''
+    if storage_backend is not None:
+        if storage_backend not in storage_backends:
+            raise ValueError(f'storage_backend must be one of {storage_backends}, not {storage_backend}')
+        settings['storage_backend'] = storage_backend
+    if column_types is not None:
+        settings['column_types'] = {**settings['column_types'], **column_types}
+    if database_file_name is not None:
+        settings['database_file_name'] = database_file_name
+    if id_columns is not None:
+        settings['id_columns'] = id_columns
+    if categorical_column_names is not None:
+        settings['categorical_column_names'] = list(categorical_column_names)
+    if categories_file_name is not None:
+        settings['categories_file_name'] = categories_file_name
+        load_categories()
+
+
+
+# load categories
+def load_categories() -> None:
+    '''
+    load the categories of categorical columns from settings['categories_file_name']
+    categories added since they were last saved are kept after the loaded ones
+
+    arguments:
+    none
+
+    returns:
+    none
+    '''
+    global _categories_changed
+    if not settings['categories_file_name'] or not os.path.exists(settings['categories_file_name']):
+        return
+    with open(settings['categories_file_name']) as file:
+        loaded_categories = json.load(file)
+    with _categories_lock:
+        for column, values in loaded_categories.items():
+            added_values = _categories.get(column, {})
+            _categories[column] = dict.fromkeys(values)
+            _categories[column].update(added_values)
+            _categorical_dtypes.pop(column, None)
+            _categories_changed = _categories_changed or len(_categories[column]) > len(values)
+
+
+
+# save categories
+def save_categories() -> None:
+    '''
+    save the categories of categorical columns to settings['categories_file_name'] if categories were added
+    the file is written under a temporary name and then renamed, so a failed run never leaves a partly written file
+
+    arguments:
+    none
+
+    returns:
+    none
+    '''
+    global _categories_changed
+    if not settings['categories_file_name']:
+        return
+    with _categories_lock:
+        if not _categories_changed:
+            return
+        categories = {column: list(values) for column, values in _categories.items()}
+        _categories_changed = False
+    with open(settings['categories_file_name'] + '.tmp', 'w') as file:
+        json.dump(categories, file, indent=1)
+    os.replace(settings['categories_file_name'] + '.tmp', settings['categories_file_name'])
+
+
+
+# get categorical dtype of column
+def get_categorical_dtype(column: str, values: Iterable) -> pd.CategoricalDtype:
+    '''
+    get the categorical dtype of a categorical column with all of values as categories
+    values that are not categories yet are added at the end, in the order they are first seen, missing values are skipped
+
+    arguments:
+    column (str): name of categorical column
+    values (list): values of the column
+
+    returns:
+    a categorical dtype with the categories of the column
+    '''
+    global _categories_changed
+    with _categories_lock:
+        categories = _categories.setdefault(column, {})
+        number_of_categories = len(categories)
+        categories.update(dict.fromkeys(value for value in values if isinstance(value, str)))
+        if len(categories) > number_of_categories or column not in _categorical_dtypes:
+            _categorical_dtypes[column] = pd.CategoricalDtype(list(categories))
+            _categories_changed = _categories_changed or len(categories) > number_of_categories
+
+        # return
+        return _categorical_dtypes[column]
+
+
+
+# convert categorical columns of df
+def to_categorical_df(df: pd.DataFrame) -> pd.DataFrame:
+    '''
+    convert the text columns of a df in settings['categorical_column_names'] to categoricals with the categories of their column
+    the df is returned as it is without compact columns
+
+    arguments:
+    df (df): df of table
+
+    returns:
+    a df with categorical columns
+    '''
+    columns = [column for column in settings['categorical_column_names'] if column in df.columns]
+    if not columns:
+        return df
+
+    df = df.copy(deep=False)
+    for column in columns:
+        series = df[column]
+        # only categories of a categorical are added, not each of its values
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            values = series.cat.categories
+        elif pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series):
+            values = series.dropna().unique()
+        else:
+            continue
+        df[column] = series.astype(get_categorical_dtype(column, values))
+
+    # return
+    return df
+
+
+
+# get path of table
+def get_table_path(file_name: str, storage_backend: str = None) -> str:
+    '''
+    get the path a table is stored at by a storage backend
+    e.g. ufc_fight_stats.csv is stored at ufc_fight_stats.parquet by the parquet backend
+    and at ufc_stats.sqlite:ufc_fight_stats by the sqlite backend
+
+    arguments:
+    file_name (str): file name of table in the config
+    storage_backend (str): one of csv, parquet or sqlite, defaults to settings['storage_backend']
+
+    returns:
+    path of table
+    '''
+    storage_backend = storage_backend or settings['storage_backend']
+    if storage_backend == 'csv':
+        return file_name
+    if storage_backend == 'sqlite':
+        return settings['database_file_name'] + ':' + get_table_name(file_name)
+
+    # return
+    return os.path.splitext(file_name)[0] + '.' + storage_backend
+
+
+
+# get name of table
+def get_table_name(file_name: str) -> str:
+    '''
+    get the name of a table in the sqlite database from its file name in the config
+    e.g. ufc_fight_stats.csv is named ufc_fight_stats
+
+    arguments:
+    file_name (str): file name of table in the config
+
+    returns:
+    name of table
+    '''
+    # return
+    return os.path.splitext(os.path.basename(file_name))[0]
+
+
+
+# get year of each event
+def get_event_years(event_details_df: pd.DataFrame) -> Dict[str, int]:
+    '''
+    get the year of each event from event details, used to partition tables of fights
+
+    arguments:
+    event_details_df (df): event details with EVENT and DATE columns, e.g. 'November 19, 2022'
+
+    returns:
+    a dict of event to year
+    '''
+    years = pd.to_datetime(event_details_df['DATE'], format='%B %d, %Y', errors='coerce').dt.year
+
+    # return
+    return {event.strip(): int(year) for event, year in zip(event_details_df['EVENT'], years) if pd.notna(year)}
+
+
+
+# convert columns of df to stored types
+def to_typed_df(df: pd.DataFrame) -> pd.DataFrame:
+    '''
+    convert the columns of a df to the types stored by typed backends
+    columns in settings['column_types'] are converted to their type, other columns are converted to strings
+    whole numbers read back from a csv file as floats, e.g. 3.0, are stored as '3'
+    categorical columns are converted to categoricals of strings with only the categories used by the df
+
+    arguments:
+    df (df): df of table
+
+    returns:
+    a df with typed columns
+    '''
+    typed_df = pd.DataFrame(index=df.index)
+    for column in df.columns:
+        series = df[column]
+        if column in settings['column_types']:
+            typed_df[column] = pd.to_numeric(series, errors='coerce').astype(settings['column_types'][column])
+            continue
+        # store whole floats without the decimal point
+        if pd.api.types.is_float_dtype(series) and (series.dropna() % 1 == 0).all():
+            series = series.astype('Int64')
+        typed_df[column] = series.astype('string')
+        if column in settings['categorical_column_names']:
+            typed_df[column] = typed_df[column].astype('category')
+
+    # return
+    return typed_df
+
+
+
+# split df into partitions
+def split_partitions(df: pd.DataFrame, event_years: Optional[Dict[str, int]]) -> List[Tuple[Optional[int], pd.DataFrame]]:
+    '''
+    split rows of a df by the year of their event
+    events with no known year go into partition 0
+    without event_years the df is one partition with no year
+
+    arguments:
+    df (df): df of table with an EVENT column
+    event_years (dict): event to year, from get_event_years()
+
+    returns:
+    a list of tuples of year and rows of that year, in order of first row
+    '''
+    if event_years is None:
+        return [(None, df)]
+
+    # get year of each row
+    years = df['EVENT'].str.strip().map(event_years).fillna(0).astype(int)
+
+    # return
+    return [(year, df[years == year]) for year in years.unique()]
+
+
+
+# list part files of a parquet table
+def list_part_files(path: str) -> List[Tuple[Optional[int], int, str]]:
+    '''
+    list the part files of a parquet table in the order their rows are read
+    partitioned tables are read newest year first and newest part first, as new events are added on top
+    tables with no partitions are read oldest part first, as new rows are added at the bottom
+
+    arguments:
+    path (str): path of parquet table
+
+    returns:
+    a list of tuples of year, number of part and path of part file
+    '''
+    part_files = []
+    if not os.path.isdir(path):
+        return part_files
+
+    for entry in os.listdir(path):
+        # partition of a year
+        partition = re.fullmatch(partition_column_name + r'=(-?\d+)', entry)
+        if partition:
+            for part_file in os.listdir(os.path.join(path, entry)):
+                part = re.fullmatch(r'part-(\d+)\.parquet', part_file)
+                if part:
+                    part_files.append((int(partition.group(1)), int(part.group(1)), os.path.join(path, entry, part_file)))
+            continue
+        # part file of a table with no partitions
+        part = re.fullmatch(r'part-(\d+)\.parquet', entry)
+        if part:
+            part_files.append((None, int(part.group(1)), os.path.join(path, entry)))
+
+    # partitioned tables
+    if any(year is not None for year, _, _ in part_files):
+        return sorted(part_files, key=lambda part_file: (part_file[0] or 0, part_file[1]), reverse=True)
+
+    # return
+    return sorted(part_files, key=lambda part_file: part_file[1])
+
+
+
+# write part file
+def write_part_file(df: pd.DataFrame, path: str, year: Optional[int], part: int) -> None:
+    '''
+    write rows of a table to a new part file of a parquet table
+    the file is written under a temporary name and then renamed, so readers never see a partly written file
+
+    arguments:
+    df (df): rows to write
+    path (str): path of parquet table
+    year (int): year of partition, none for a table with no partitions
+    part (int): number of part
+
+    returns:
+    none
+    '''
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    # get directory of partition
+    directory = path if year is None else os.path.join(path, f'{partition_column_name}={year}')
+    os.makedirs(directory, exist_ok=True)
+
+    # write part file
+    part_file_name = os.path.join(directory, f'part-{part:06d}.parquet')
+    pq.write_table(pa.Table.from_pandas(to_typed_df(df), preserve_index=False), part_file_name + '.tmp')
+    os.replace(part_file_name + '.tmp', part_file_name)
+
+
+
+# open transaction on database
+@contextmanager
+def database_transaction(write: bool = True) -> Iterator[sqlite3.Connection]:
+    '''
+    open the database of the sqlite backend and run the statements of the block in one transaction
+    the transaction is committed at the end of the block, or rolled back if the block raises
+    so readers never see a table partly updated
+    writers wait for each other, e.g. the tables of fights and fighters written at the same time by scrape_ufc_stats_runner.py
+    a write transaction takes the write lock when it begins, waiting up to the timeout for another writer to commit
+    a deferred transaction that reads first would fail at once when it writes after another writer committed
+
+    arguments:
+    write (bool): the block writes to the database, false for a block that only reads
+
+    returns:
+    a context manager of the connection to the database
+    '''
+    with closing(sqlite3.connect(settings['database_file_name'], isolation_level=None, timeout=600)) as connection:
+        connection.execute('PRAGMA journal_mode=WAL')
+        # tables of the database, columns of tables and ids of events and fights by name
+        connection.execute('CREATE TABLE IF NOT EXISTS _tables (name TEXT PRIMARY KEY, columns TEXT NOT NULL)')
+        connection.execute('CREATE TABLE IF NOT EXISTS _event_ids (EVENT TEXT PRIMARY KEY, EVENT_ID TEXT NOT NULL)')
+        connection.execute('CREATE TABLE IF NOT EXISTS _fight_ids (EVENT TEXT NOT NULL, BOUT TEXT NOT NULL, FIGHT_ID TEXT NOT NULL, PRIMARY KEY (EVENT, BOUT))')
+        connection.execute('BEGIN IMMEDIATE' if write else 'BEGIN')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+
+
+# get key column of table
+def get_key_column_name(columns: Iterable[str]) -> Optional[str]:
+    '''
+    get the id column that keys the rows of a table from its columns
+    event details are keyed by event, fight details, results and stats by fight, fighter tables by fighter
+    rows of fight stats share the key of their fight
+
+    arguments:
+    columns (list): columns of table
+
+    returns:
+    name of id column, none if the table has no key
+    '''
+    columns = set(columns)
+    if 'URL' in columns:
+        if 'DATE' in columns:
+            return 'EVENT_ID'
+        if 'BOUT' in columns:
+            return 'FIGHT_ID'
+        return 'FIGHTER_ID'
+    if {'EVENT', 'BOUT'} <= columns:
+        return 'FIGHT_ID'
+
+    # return
+    return None
+
+
+
+# get ids from urls
+def get_url_ids(urls: pd.Series) -> pd.Series:
+    '''
+    get the ids of ufcstats.com from urls
+    e.g. http://ufcstats.com/fight-details/de1a3734be60e6a1 has the id de1a3734be60e6a1
+
+    arguments:
+    urls (series): series of urls
+
+    returns:
+    a series of ids, missing for urls with no id
+    '''
+    # return
+    return urls.astype('string').str.extract(url_id_pattern, expand=False)
+
+
+
+# add id columns to df
+def add_id_columns(df: pd.DataFrame) -> pd.DataFrame:
+    '''
+    add the id of the page of each row of a table as a column from its url, or fill in the ids missing from the column
+    e.g. EVENT_ID of event details, FIGHT_ID of fight details and FIGHTER_ID of fighter details and tale of the tape
+    ids of fight stats and of the event and fighters of fight results are parsed from fight pages, see LIB.parse_fight_ids()
+
+    arguments:
+    df (df): df of table
+
+    returns:
+    a df with the id column, added at the end
+    '''
+    key_column_name = get_key_column_name(df.columns)
+    if 'URL' not in df.columns or key_column_name is None:
+        return df
+    ids = get_url_ids(df['URL'])
+    if key_column_name in df.columns:
+        ids = df[key_column_name].astype('string').fillna(ids)
+
+    # return
+    return df.assign(**{key_column_name: ids})
+
+
+
+# get id columns of df
+def get_id_columns(connection: sqlite3.Connection, df: pd.DataFrame) -> pd.DataFrame:
+    '''
+    get the id columns of the rows of a table that are not columns of the table yet
+    the key of the table is read from its urls
+    tables with no url get the ids of their event and fight by name, from the tables written before them
+    id columns the df already has, e.g. ids parsed with id columns, are kept as columns of the table and not added
+
+    arguments:
+    connection (connection): connection to the database
+    df (df): df of table
+
+    returns:
+    a df of id columns with the same index as df
+    '''
+    key_column_name = get_key_column_name(df.columns)
+    ids_df = pd.DataFrame(index=df.index)
+
+    # ids of events by name
+    if 'EVENT' in df.columns:
+        events = df['EVENT'].astype('string').str.strip()
+        if key_column_name == 'EVENT_ID':
+            ids_df['EVENT_ID'] = get_url_ids(df['URL'])
+        else:
+            event_ids = dict(connection.execute('SELECT EVENT, EVENT_ID FROM _event_ids'))
+            ids_df['EVENT_ID'] = events.map(event_ids).astype('string')
+
+    # ids of fights, by name for fight stats
+    if key_column_name == 'FIGHT_ID':
+        if 'URL' in df.columns:
+            ids_df['FIGHT_ID'] = get_url_ids(df['URL'])
+        else:
+            fight_ids = {(event, bout): fight_id for event, bout, fight_id in connection.execute('SELECT EVENT, BOUT, FIGHT_ID FROM _fight_ids')}
+            bouts = df['BOUT'].astype('string').str.strip()
+            ids_df['FIGHT_ID'] = pd.Series(
+                [fight_ids.get((event, bout)) for event, bout in zip(events.fillna(''), bouts.fillna(''))],
+                index=df.index,
+                dtype='string'
+            )
+
+    # ids of fighters
+    if key_column_name == 'FIGHTER_ID':
+        ids_df['FIGHTER_ID'] = get_url_ids(df['URL'])
+
+    # return
+    return ids_df.drop(columns=[column for column in ids_df.columns if column in df.columns])
+
+
+
+# save ids of events and fights by name
+def save_ids(connection: sqlite3.Connection, df: pd.DataFrame, ids_df: pd.DataFrame) -> None:
+    '''
+    save the ids of events and fights by name, from tables with urls of events and fights
+    so tables written after them with no url get their ids
+
+    arguments:
+    connection (connection): connection to the database
+    df (df): df of table
+    ids_df (df): id columns of table, its id columns and those from get_id_columns()
+
+    returns:
+    none
+    '''
+    key_column_name = get_key_column_name(df.columns)
+    if 'URL' not in df.columns or key_column_name not in ['EVENT_ID', 'FIGHT_ID']:
+        return
+
+    events = df['EVENT'].astype('string').str.strip()
+    if key_column_name == 'EVENT_ID':
+        connection.executemany(
+            'INSERT OR REPLACE INTO _event_ids (EVENT, EVENT_ID) VALUES (?, ?)',
+            [(event, event_id) for event, event_id in zip(events, ids_df['EVENT_ID']) if pd.notna(event) and pd.notna(event_id)]
+        )
+        return
+
+    bouts = df['BOUT'].astype('string').str.strip()
+    connection.executemany(
+        'INSERT OR REPLACE INTO _fight_ids (EVENT, BOUT, FIGHT_ID) VALUES (?, ?, ?)',
+        [
+            (event, bout, fight_id)
+            for event, bout, fight_id in zip(events, bouts, ids_df['FIGHT_ID'])
+            if pd.notna(event) and pd.notna(bout) and pd.notna(fight_id)
+        ]
+    )
+
+
+
+# quote columns
+def quote_columns(columns: Iterable[str]) -> str:
+    '''
+    quote the names of columns for a sql statement, as names like SUB.ATT are not valid without quotes
+
+    arguments:
+    columns (list): names of columns
+
+    returns:
+    the quoted names separated by commas
+    '''
+    # return
+    return ', '.join(f'"{column}"' for column in columns)
+
+
+
+# get type of column in database
+def get_database_column_type(column: str) -> str:
+    '''
+    get the type a column is stored as by the sqlite backend, from settings['column_types']
+
+    arguments:
+    column (str): name of column
+
+    returns:
+    one of INTEGER, REAL or TEXT
+    '''
+    column_type = str(settings['column_types'].get(column, '')).lower()
+    if column_type.startswith(('int', 'uint')):
+        return 'INTEGER'
+    if column_type.startswith('float'):
+        return 'REAL'
+
+    # return
+    return 'TEXT'
+
+
+
+# create table in database
+def create_database_table(connection: sqlite3.Connection, table_name: str, columns: List[str], id_columns: List[str]) -> List[str]:
+    '''
+    create a table in the database if it does not exist, with indexes on the columns used for lookups
+    columns missing from an existing table are added
+
+    arguments:
+    connection (connection): connection to the database
+    table_name (str): name of table
+    columns (list): columns of table
+    id_columns (list): id columns of table, from get_id_columns()
+
+    returns:
+    a list of the columns of the table, without id columns
+    '''
+    row = connection.execute('SELECT columns FROM _tables WHERE name = ?', (table_name,)).fetchone()
+    table_columns = [] if row is None else json.loads(row[0])
+    stored_columns = [column for column, in connection.execute('SELECT name FROM pragma_table_info(?)', (table_name,))]
+
+    # create table
+    if not stored_columns:
+        column_definitions = [f'"{column}" {get_database_column_type(column)}' for column in columns + id_columns]
+        connection.execute(f'CREATE TABLE "{table_name}" ({", ".join(column_definitions)}, "{row_order_column_name}" INTEGER NOT NULL)')
+        stored_columns = columns + id_columns + [row_order_column_name]
+    # add missing columns
+    for column in columns + id_columns:
+        if column not in stored_columns:
+            connection.execute(f'ALTER TABLE "{table_name}" ADD COLUMN "{column}" {get_database_column_type(column)}')
+            stored_columns.append(column)
+
+    # index columns used for lookups and order of rows
+    for column in indexed_column_names + [row_order_column_name]:
+        if column in stored_columns:
+            connection.execute(f'CREATE INDEX IF NOT EXISTS "{table_name}_{column}" ON "{table_name}" ("{column}")')
+
+    # save columns of table
+    table_columns = table_columns + [column for column in columns if column not in table_columns]
+    connection.execute('INSERT OR REPLACE INTO _tables (name, columns) VALUES (?, ?)', (table_name, json.dumps(table_columns)))
+
+    # return
+    return table_columns
+
+
+
+# write rows to table in database
+def write_database_table(df: pd.DataFrame, file_name: str, on_top: bool, replace_events: List[str] = (), replace_table: bool = False) -> None:
+    '''
+    write rows to a table of the sqlite backend in one transaction
+    rows of replace_events and rows with the same key as the new rows are removed first, so new rows update existing ones
+
+    arguments:
+    df (df): rows of table
+    file_name (str): file name of table in the config
+    on_top (bool): add the new rows before the existing rows, otherwise after them
+    replace_events (list): events whose existing rows are removed
+    replace_table (bool): remove the whole table first
+
+    returns:
+    none
+    '''
+    table_name = get_table_name(file_name)
+    with database_transaction() as connection:
+        if replace_table:
+            connection.execute(f'DROP TABLE IF EXISTS "{table_name}"')
+            connection.execute('DELETE FROM _tables WHERE name = ?', (table_name,))
+
+        # get ids of rows, ids that are columns of the df are used as they are
+        ids_df = get_id_columns(connection, df)
+        all_ids_df = pd.concat([df[[column for column in id_column_names if column in df.columns]], ids_df], axis=1)
+        save_ids(connection, df, all_ids_df)
+        create_database_table(connection, table_name, list(df.columns), list(ids_df.columns))
+
+        # remove rows of replaced events
+        if replace_events:
+            connection.executemany(f'DELETE FROM "{table_name}" WHERE TRIM("EVENT") = ?', [(event.strip(),) for event in replace_events])
+
+        # remove rows with the same key as new rows
+        key_column_name = get_key_column_name(df.columns)
+        if not replace_table and key_column_name in all_ids_df.columns:
+            keys = set(all_ids_df[key_column_name].dropna())
+            connection.executemany(f'DELETE FROM "{table_name}" WHERE "{key_column_name}" = ?', [(key,) for key in keys])
+
+        # order of new rows
+        if on_top:
+            first_row = connection.execute(f'SELECT COALESCE(MIN("{row_order_column_name}"), 0) FROM "{table_name}"').fetchone()[0] - len(df)
+        else:
+            first_row = connection.execute(f'SELECT COALESCE(MAX("{row_order_column_name}") + 1, 0) FROM "{table_name}"').fetchone()[0]
+
+        # insert new rows
+        typed_df = pd.concat([to_typed_df(df), ids_df], axis=1)
+        typed_df[row_order_column_name] = range(first_row, first_row + len(df))
+        values = zip(*[typed_df[column].to_numpy(dtype=object, na_value=None) for column in typed_df.columns])
+        connection.executemany(f'INSERT INTO "{table_name}" ({quote_columns(typed_df.columns)}) VALUES ({", ".join("?" * len(typed_df.columns))})', values)
+
+
+
+# read rows of table in database
+def read_database_table(file_name: str, columns: List[str] = None, lookup: Tuple[str, Iterable] = None) -> pd.DataFrame:
+    '''
+    read the rows of a table of the sqlite backend in order
+    id columns are only read if they are in columns
+
+    arguments:
+    file_name (str): file name of table in the config
+    columns (list): columns to read, defaults to all columns without id columns
+    lookup (tuple): column and values, only rows with one of the values in the column are read
+
+    returns:
+    a df of the table
+    '''
+    table_name = get_table_name(file_name)
+    with database_transaction(write=False) as connection:
+        row = connection.execute('SELECT columns FROM _tables WHERE name = ?', (table_name,)).fetchone()
+        if row is None:
+            raise FileNotFoundError(f'{get_table_path(file_name, "sqlite")} does not exist')
+        columns = columns or json.loads(row[0])
+        select = f'SELECT {quote_columns(columns + [row_order_column_name])} FROM "{table_name}"'
+
+        # read whole table
+        if lookup is None:
+            df = pd.read_sql_query(select, connection)
+        # read rows of values, in chunks under the limit of parameters
+        else:
+            column, values = lookup
+            values = list(dict.fromkeys(values))
+            df = pd.concat([
+                pd.read_sql_query(f'{select} WHERE "{column}" IN ({", ".join("?" * len(values[i:i + 500]))})', connection, params=values[i:i + 500])
+                for i in range(0, len(values), 500)
+            ] or [pd.DataFrame(columns=columns + [row_order_column_name])], ignore_index=True)
+
+    # return
+    return df.sort_values(row_order_column_name, kind='stable').drop(columns=row_order_column_name).reset_index(drop=True)
+
+
+
+# get keys of rows for change log
+def get_change_key_df(df: pd.DataFrame, columns: Iterable[str] = None) -> Optional[pd.DataFrame]:
+    '''
+    get the key of each row of a table for the change log, the ids of ufcstats.com of the row
+    tables with a url are keyed by the id of their url, as in get_key_column_name(), and fight history also by the FIGHT_ID of its fight url
+    fight stats are keyed by FIGHT_ID, FIGHTER_ID and ROUND with id columns, otherwise by EVENT, BOUT, FIGHTER and ROUND
+
+    arguments:
+    df (df): df of table
+    columns (list): columns that choose the key, defaults to the columns of df, e.g. of the new rows so the rows they replace get the same key
+
+    returns:
+    a df of the key columns of each row, none if the table has no key
+    '''
+    columns = set(df.columns if columns is None else columns)
+    key_column_name = get_key_column_name(columns)
+    if key_column_name is None:
+        return None
+
+    # tables with a url
+    if 'URL' in columns:
+        key_df = pd.DataFrame({key_column_name: get_url_ids(df['URL'])}, index=df.index)
+        if 'FIGHT URL' in columns:
+            key_df['FIGHT_ID'] = get_url_ids(df['FIGHT URL'])
+        return key_df
+
+    # fight stats
+    key_column_names = ['FIGHT_ID', 'FIGHTER_ID'] if {'FIGHT_ID', 'FIGHTER_ID'} <= columns else ['EVENT', 'BOUT', 'FIGHTER']
+    key_df = df[key_column_names + [column for column in ['ROUND'] if column in columns]].astype('string')
+    if 'EVENT' in key_df.columns:
+        key_df['EVENT'] = key_df['EVENT'].str.strip()
+
+    # return
+    return key_df
+
+
+
+# record changes of write
+def record_changes(df: pd.DataFrame, file_name: str, replace_events: Iterable[str] = None, parsed_df: pd.DataFrame = None) -> None:
+    '''
+    record the rows a write of a table inserts, updates or deletes in the change log of scrape_ufc_stats_changes
+    a whole table written with write_table() replaces all rows of the table
+    rows appended with append_table() replace the rows of replace_events and the rows with the same key
+    nothing is read if no change log is set or the table has no key
+
+    arguments:
+    df (df): new rows of table
+    file_name (str): file name of table in the config
+    replace_events (list): events whose rows are replaced by appended rows, none if the whole table is replaced
+    parsed_df (df): rows of the table before the write, read from the table if none
+
+    returns:
+    none
+    '''
+    if not CHANGES.settings['change_log_file_name']:
+        return
+    key_df = get_change_key_df(df)
+    if key_df is None:
+        return
+
+    # read rows of the table before the write, keyed the same way as the new rows
+    if parsed_df is None:
+        try:
+            parsed_df = read_table(file_name)
+        except FileNotFoundError:
+            parsed_df = df.iloc[:0]
+    parsed_key_df = get_change_key_df(parsed_df, df.columns)
+
+    # appended rows only replace rows of replaced events and rows with the same key
+    if replace_events is not None:
+        set_of_keys = set(key_df.astype('string').fillna('').itertuples(index=False, name=None))
+        replaced = pd.Series([values in set_of_keys for values in parsed_key_df.astype('string').fillna('').itertuples(index=False, name=None)], index=parsed_df.index, dtype=bool)
+        if replace_events and 'EVENT' in parsed_df.columns:
+            replaced |= parsed_df['EVENT'].astype('string').str.strip().isin({event.strip() for event in replace_events}).fillna(False).astype(bool)
+        parsed_df, parsed_key_df = parsed_df[replaced], parsed_key_df[replaced]
+
+    CHANGES.record_changes(get_table_name(file_name), parsed_key_df, parsed_df, key_df, df)
+
+
+
+# read table
+def read_table(file_name: str, columns: List[str] = None, years: Iterable[int] = None) -> pd.DataFrame:
+    '''
+    read a table with the storage backend
+
+    arguments:
+    file_name (str): file name of table in the config
+    columns (list): columns to read, defaults to all columns
+    years (list): years of partitions to read from a partitioned parquet table, defaults to all years
+
+    returns:
+    a df of the table
+    '''
+    with METRICS.timed('store_seconds', operation='read', table=file_name):
+        path = get_table_path(file_name)
+
+        # csv backend, categorical columns are read as categoricals so that their values are not all held as strings
+        if settings['storage_backend'] == 'csv':
+            dtype = {column: 'category' for column in settings['categorical_column_names']}
+            return to_categorical_df(pd.read_csv(path, usecols=columns, dtype=dtype)[columns] if columns else pd.read_csv(path, dtype=dtype))
+
+        # sqlite backend
+        if settings['storage_backend'] == 'sqlite':
+            return to_categorical_df(read_database_table(file_name, columns))
+
+        # parquet backend, part files are read on their own so the year of partition is not added as a column
+        import pyarrow.parquet as pq
+        if not os.path.isdir(path):
+            raise FileNotFoundError(f'{path} does not exist')
+        years = None if years is None else set(years)
+        dfs = [
+            pq.ParquetFile(part_file_name).read(columns=columns).to_pandas()
+            for year, _, part_file_name in list_part_files(path)
+            if years is None or year in years
+        ]
+        if not dfs:
+            return pd.DataFrame(columns=columns)
+
+        # add the categories of all part files first, so that parts get the same categorical dtype and stay categoricals when concatenated
+        for df in dfs:
+            for column in settings['categorical_column_names']:
+                if column in df.columns and isinstance(df[column].dtype, pd.CategoricalDtype):
+                    get_categorical_dtype(column, df[column].cat.categories)
+
+        # return
+        return to_categorical_df(pd.concat([to_categorical_df(df) for df in dfs], ignore_index=True))
+
+
+
+# write table
+def write_table(df: pd.DataFrame, file_name: str, event_years: Dict[str, int] = None) -> None:
+    '''
+    write a whole table with the storage backend, replacing the table if it exists
+    with id columns, the id of each row is added from its url
+    categories added since they were last saved are saved with the table
+
+    arguments:
+    df (df): df of table
+    file_name (str): file name of table in the config
+    event_years (dict): event to year, partitions a parquet table of fights by year, from get_event_years()
+
+    returns:
+    none
+    '''
+    with METRICS.timed('store_seconds', operation='write', table=file_name):
+        path = get_table_path(file_name)
+        save_categories()
+        if settings['id_columns']:
+            df = add_id_columns(df)
+        # record changes, all rows of the table are replaced
+        record_changes(df, file_name)
+
+        # csv backend
+        if settings['storage_backend'] == 'csv':
+            df.to_csv(path, index=False)
+            return
+
+        # sqlite backend
+        if settings['storage_backend'] == 'sqlite':
+            write_database_table(df, file_name, on_top=False, replace_table=True)
+            return
+
+        # parquet backend, write each partition as its first part file
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        os.makedirs(path)
+        for year, partition_df in split_partitions(df, event_years):
+            write_part_file(partition_df, path, year, 0)
+
+
+
+# append rows to table
+def append_table(df: pd.DataFrame, file_name: str, event_years: Dict[str, int] = None, replace_events: Iterable[str] = ()) -> None:
+    '''
+    append new rows to a table with the storage backend
+    rows of replace_events are removed from the table before the new rows are added
+    events are matched without surrounding whitespace, as fight results keep the whitespace of the page
+    tables of fights, given with event_years, get the new rows on top so the newest events stay first
+    other tables get the new rows at the bottom
+    the csv backend reads and writes the whole file
+    the parquet backend writes new part files and only rewrites the partitions of replaced events
+    the sqlite backend updates the table in one transaction, new rows replace existing rows with the same id
+    with id columns, the id of each new row is added from its url, and the csv backend fills in ids missing from existing rows
+    categories added since they were last saved are saved with the table
+
+    arguments:
+    df (df): new rows of table
+    file_name (str): file name of table in the config
+    event_years (dict): event to year, partitions a parquet table of fights by year, from get_event_years()
+    replace_events (list): events whose existing rows are removed
+
+    returns:
+    none
+    '''
+    with METRICS.timed('store_seconds', operation='append', table=file_name):
+        path = get_table_path(file_name)
+        replace_events = list(replace_events)
+        save_categories()
+        if settings['id_columns']:
+            df = add_id_columns(df)
+
+        # csv backend
+        if settings['storage_backend'] == 'csv':
+            parsed_df = pd.read_csv(path)
+            record_changes(df, file_name, replace_events, parsed_df)
+            if replace_events:
+                parsed_df = parsed_df[~parsed_df['EVENT'].str.strip().isin({event.strip() for event in replace_events})]
+            # add new rows on top of tables of fights and at the bottom of other tables
+            parsed_df = pd.concat([df, parsed_df] if event_years is not None else [parsed_df, df])
+            if settings['id_columns']:
+                parsed_df = add_id_columns(parsed_df)
+            parsed_df.to_csv(path, index=False)
+            return
+
+        # record changes, rows of replace_events and rows with the same key are replaced
+        record_changes(df, file_name, replace_events)
+
+        # sqlite backend
+        if settings['storage_backend'] == 'sqlite':
+            write_database_table(df, file_name, on_top=event_years is not None, replace_events=replace_events)
+            return
+
+        # parquet backend
+        import pyarrow.parquet as pq
+        part_files = list_part_files(path)
+        # next number of part
+        next_part = max([part for _, part, _ in part_files], default=-1) + 1
+
+        # rewrite partitions that have rows of replaced events
+        if replace_events:
+            replace_years = {event_years.get(event.strip(), 0) for event in replace_events} if event_years is not None else None
+            stripped_replace_events = {event.strip() for event in replace_events}
+            for year in sorted({year for year, _, _ in part_files}, key=lambda year: year or 0):
+                if replace_years is not None and (year or 0) not in replace_years:
+                    continue
+                year_part_files = [part_file for part_file in part_files if part_file[0] == year]
+                partition_df = pd.concat([pq.ParquetFile(part_file_name).read().to_pandas() for _, _, part_file_name in year_part_files], ignore_index=True)
+                kept_df = partition_df[~partition_df['EVENT'].str.strip().isin(stripped_replace_events)]
+                if len(kept_df) == len(partition_df):
+                    continue
+                # write kept rows as one part file that is read in the same place as the old part files
+                # partitions are read newest part first, other tables oldest part first
+                part = max(part for _, part, _ in year_part_files) if year is not None else min(part for _, part, _ in year_part_files)
+                for _, _, part_file_name in year_part_files:
+                    os.remove(part_file_name)
+                if len(kept_df):
+                    write_part_file(kept_df, path, year, part)
+
+        # write new rows as new part files
+        for year, partition_df in split_partitions(df, event_years):
+            if len(partition_df):
+                write_part_file(partition_df, path, year, next_part)
+
+
+
+# look up rows of table
+def lookup_table(file_name: str, column: str, values: Iterable, columns: List[str] = None) -> pd.DataFrame:
+    '''
+    read the rows of a table with one of values in a column, e.g. all rows of fight stats of one fighter
+    the sqlite backend reads only those rows through the index of the column
+    other backends read the whole table
+
+    arguments:
+    file_name (str): file name of table in the config
+    column (str): column to look up, e.g. FIGHTER or FIGHT_ID
+    values (list): values to look up
+    columns (list): columns to read, defaults to all columns
+
+    returns:
+    a df of the rows, in the order of the table
+    '''
+    with METRICS.timed('store_seconds', operation='lookup', table=file_name):
+        # sqlite backend
+        if settings['storage_backend'] == 'sqlite':
+            return read_database_table(file_name, columns, (column, values))
+
+        # other backends
+        df = read_table(file_name)
+        df = df[df[column].isin(list(values))].reset_index(drop=True)
+
+        # return
+        return df[columns] if columns else df
+
+
+
+# get index of ids of column
+def get_id_index(df: pd.DataFrame, column: str) -> Dict[str, np.ndarray]:
+    '''
+    build a hash index of the ids of a column, from each id to the positions of its rows in the df
+    rows of an id are then found without scanning the column, e.g. all rounds of fight stats of one FIGHTER_ID
+
+    arguments:
+    df (df): df of table
+    column (str): id column, e.g. FIGHTER_ID
+
+    returns:
+    a dict of id to an array of positions of rows, in the order of the df, missing ids are left out
+    '''
+    # return
+    return df.groupby(column, sort=False, observed=True).indices
+
+
+
+# table with indexes of ids
+class IndexedTable:
+    '''
+    a table read with the storage backend and a hash index of each of its id columns, built once when it is read
+    joins between tables and lookups of one fighter, fight or event use ids, so fighters with the same name never collide
+    e.g. IndexedTable('ufc_fight_stats.csv').lookup('FIGHTER_ID', ['d854be0f422e4945'])
+
+    arguments:
+    file_name (str): file name of table in the config
+    columns (list): columns to read, defaults to all columns
+    '''
+
+    def __init__(self, file_name: str, columns: List[str] = None):
+        self.df = read_table(file_name, columns)
+        self.indexes = {
+            column: get_id_index(self.df, column)
+            for column in id_column_names + fighter_id_column_names
+            if column in self.df.columns
+        }
+
+    def __len__(self) -> int:
+        return len(self.df)
+
+    # get positions of rows of ids
+    def get_positions(self, column: str, ids: Iterable[str]) -> np.ndarray:
+        '''
+        get the positions of the rows of ids in an id column, in the order of the table
+
+        arguments:
+        column (str): id column
+        ids (list): ids to look up
+
+        returns:
+        an array of positions of rows
+        '''
+        if column not in self.indexes:
+            raise KeyError(f'{column} is not an id column of the table')
+        index = self.indexes[column]
+        positions = [index[id_] for id_ in dict.fromkeys(ids) if id_ in index]
+
+        # return
+        return np.sort(np.concatenate(positions)) if positions else np.array([], dtype=int)
+
+    # look up rows of ids
+    def lookup(self, column: str, ids: Iterable[str]) -> pd.DataFrame:
+        '''
+        get the rows of ids in an id column, in the order of the table
+
+        arguments:
+        column (str): id column, e.g. FIGHT_ID or FIGHTER_ID
+        ids (list): ids to look up
+
+        returns:
+        a df of the rows
+        '''
+        # return
+        return self.df.iloc[self.get_positions(column, ids)]
+
+
+
+# convert tables between storage backends
+def convert_tables(file_names: List[str], event_details_file_name: str, from_backend: str, to_backend: str) -> None:
+    '''
+    convert tables from one storage backend to another
+    tables of fights, those with an EVENT column other than event details, are partitioned by year of event
+    tables that do not exist yet, e.g. career stats before the first run, are skipped
+
+    arguments:
+    file_names (list): file names of tables in the config
+    event_details_file_name (str): file name of event details in the config
+    from_backend (str): storage backend to read from
+    to_backend (str): storage backend to write to
+
+    returns:
+    none
+    '''
+    # read event details for years of events
+    configure(from_backend)
+    event_years = get_event_years(read_table(event_details_file_name))
+
+    for file_name in file_names:
+        # read table
+        configure(from_backend)
+        try:
+            df = read_table(file_name)
+        except FileNotFoundError:
+            print(f'{get_table_path(file_name, from_backend)} does not exist, skipped')
+            continue
+        # write table
+        configure(to_backend)
+        # tables of fights are partitioned, fight history of fighters has events but is a table of fighters
+        partitioned = {'EVENT', 'BOUT'} <= set(df.columns)
+        write_table(df, file_name, event_years if partitioned else None)
+        print(f'{get_table_path(file_name, from_backend)} -> {get_table_path(file_name, to_backend)} ({len(df)} rows)')
+
+
+
+# convert tables of config
+if __name__ == '__main__':
+    # import config
+    import yaml
+    config = yaml.safe_load(open('scrape_ufc_stats_config.yaml'))
+
+    # read arguments
+    parser = argparse.ArgumentParser(description='convert the tables in the config between storage backends')
+    parser.add_argument('--from', dest='from_backend', choices=storage_backends, default='csv', help='storage backend to read from')
+    parser.add_argument('--to', dest='to_backend', choices=storage_backends, default='parquet', help='storage backend to write to')
+    args = parser.parse_args()
+    configure(database_file_name=config['database_file_name'], id_columns=config['id_columns'])
+    # store categorical columns dictionary encoded
+    if config['compact_columns']:
+        configure(categorical_column_names=config['categorical_column_names'], categories_file_name=config['categories_file_name'])
+
+    # store normalised fight stats columns with their types
+    if config['normalise_fight_stats']:
+        import scrape_ufc_stats_library as LIB
+        configure(column_types=LIB.get_normalised_fight_stats_column_types(config['normalised_fight_stats_columns']))
+    # store career stats columns with their types
+    if config['fighter_career_stats']:
+        import scrape_ufc_stats_career as CAREER
+        configure(column_types=CAREER.get_career_column_types(config['normalised_fight_stats_columns']))
+
+    convert_tables(
+        [config[key] for key in [
+            'event_details_file_name',
+            'fight_details_file_name',
+            'fight_results_file_name',
+            'fight_stats_file_name',
+            'fighter_details_file_name',
+            'fighter_tott_file_name',
+        ]]
+        + ([config['fighter_career_file_name']] if config['fighter_career_stats'] else [])
+        + ([config['fighter_averages_file_name'], config['fighter_history_file_name']] if config['fighter_history'] else []),
+        config['event_details_file_name'],
+        args.from_backend,
+        args.to_backend
+    )
@@ -0,0 +1,102 @@
+'''
+Overview
+
+shared setup of the tests of the scraper
+the modules of the scraper are imported from the root of the repository, and the config is read from there
+
+fixtures
+tests/fixtures holds pages of ufcstats.com saved as html, one page of each type
+urls.json maps each file to the url of its page, as parse functions take ids from urls
+
+'''
+
+# imports
+from typing import Dict, List, Tuple
+import json
+import os
+import sys
+import pytest
+import yaml
+
+# root of the repository, so the modules of the scraper can be imported
+repo_directory = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if repo_directory not in sys.path:
+    sys.path.insert(0, repo_directory)
+
+# directory of saved pages
+fixtures_directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+
+# get urls of saved pages
+def get_fixture_urls() -> Dict[str, str]:
+    '''
+    get the url of each saved page in tests/fixtures
+
+    arguments:
+    none
+
+    returns:
+    a dict of file name to url
+    '''
+    with open(os.path.join(fixtures_directory, 'urls.json')) as file:
+        # return
+        return json.load(file)
+
+
+
+# read saved pages
+def read_fixture_pages(page_type: str = None) -> List[Tuple[str, bytes]]:
+    '''
+    read the saved pages in tests/fixtures with their urls
+
+    arguments:
+    page_type (str): only pages whose url contains page_type, e.g. fight-details, defaults to all pages
+
+    returns:
+    a list of tuples of url and raw content of page
+    '''
+    pages = []
+    for file_name, url in get_fixture_urls().items():
+        if page_type is None or page_type in url:
+            with open(os.path.join(fixtures_directory, file_name), 'rb') as file:
+                pages.append((url, file.read()))
+
+    # return
+    return pages
+
+
+
+# config of the scraper
+@pytest.fixture(scope='session')
+def config() -> dict:
+    '''
+    read scrape_ufc_stats_config.yaml from the root of the repository
+
+    arguments:
+    none
+
+    returns:
+    config dict
+    '''
+    with open(os.path.join(repo_directory, 'scrape_ufc_stats_config.yaml')) as file:
+        # return
+        return yaml.safe_load(file)
+
+
+
+# reset parser backend after each test
+@pytest.fixture(autouse=True)
+def reset_parser_backend():
+    '''
+    set the parser backend back to html.parser after each test, as tests of streamed pages configure it
+
+    arguments:
+    none
+
+    returns:
+    none
+    '''
+    yield
+    import scrape_ufc_stats_soup as SOUP
+    SOUP.configure('html.parser')
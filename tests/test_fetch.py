@@ -0,0 +1,77 @@
+'''
+Overview
+
+tests of the retries of the fetch engine against a local server that breaks its responses
+
+run with
+python -m pytest tests
+
+'''
+
+# imports
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+import pytest
+
+# import fetch engine
+import scrape_ufc_stats_fetch as FETCH
+
+
+
+# server that breaks every response part way through its chunked body
+class BrokenChunkedHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    requests = 0
+
+    def do_GET(self):
+        BrokenChunkedHandler.requests += 1
+        self.send_response(200)
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        # a chunk of 100 bytes with only a few of them sent, then the connection is closed
+        self.wfile.write(b'64\r\n<html>')
+        self.wfile.flush()
+        self.close_connection = True
+
+    def log_message(self, *args):
+        pass
+
+
+
+# local server of broken responses
+@pytest.fixture
+def broken_server(monkeypatch):
+    '''
+    serve broken chunked responses on a free local port, with fetch settings for fast retries and no proxy or page cache
+
+    arguments:
+    monkeypatch (monkeypatch): restores the settings after the test
+
+    returns:
+    url of the server
+    '''
+    for name in ['HTTP_PROXY', 'http_proxy', 'HTTPS_PROXY', 'https_proxy', 'ALL_PROXY', 'all_proxy']:
+        monkeypatch.delenv(name, raising=False)
+    for name, value in {'max_retries': 2, 'backoff_seconds': 0.0, 'requests_per_second': 1000.0, 'page_cache_file_name': None, 'offline': False}.items():
+        monkeypatch.setitem(FETCH.settings, name, value)
+    FETCH.configure()
+
+    BrokenChunkedHandler.requests = 0
+    server = ThreadingHTTPServer(('127.0.0.1', 0), BrokenChunkedHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}/fight-details/de1a3734be60e6a1'
+
+    server.shutdown()
+    server.server_close()
+    FETCH.configure()
+
+
+
+# test a broken response is retried and then raised as a fetch error
+def test_broken_response_is_retried_then_raises_fetch_error(broken_server):
+    with pytest.raises(FETCH.FetchError) as error:
+        FETCH.request_page(broken_server)
+
+    assert 'ChunkedEncodingError' in error.value.reason
+    assert BrokenChunkedHandler.requests == FETCH.settings['max_retries'] + 1
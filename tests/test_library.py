@@ -0,0 +1,62 @@
+'''
+Overview
+
+tests of parse functions of the library on saved pages in tests/fixtures, edited for cases the saved pages do not have
+and of the record accumulator the parsed records are collected in
+
+run with
+python -m pytest tests
+
+'''
+
+# imports
+import pytest
+
+# import library
+import scrape_ufc_stats_library as LIB
+import scrape_ufc_stats_soup as SOUP
+
+# import saved pages
+from conftest import read_fixture_pages
+
+# upcoming event at the top of the saved page of all events
+upcoming_event = ['UFC 301: Upcoming vs. Event', 'http://ufcstats.com/event-details/upcoming0000000', 'December 07, 2024', 'Las Vegas, Nevada, USA']
+
+
+
+# test upcoming event is parsed from the top of the page of all events
+@pytest.mark.parametrize('parser_backend', SOUP.parser_backends)
+def test_parse_upcoming_event(parser_backend):
+    [(url, page)] = read_fixture_pages('statistics/events')
+    SOUP.configure(parser_backend)
+    assert LIB.parse_upcoming_event([page]) == upcoming_event
+
+
+
+# test upcoming event with an empty location, as ufcstats.com shows a venue still to be announced
+@pytest.mark.parametrize('parser_backend', SOUP.parser_backends)
+def test_parse_upcoming_event_without_location(parser_backend):
+    [(url, page)] = read_fixture_pages('statistics/events')
+    page = page.replace(upcoming_event[3].encode(), b'', 1)
+    SOUP.configure(parser_backend)
+    assert LIB.parse_upcoming_event([page]) == upcoming_event[:3] + ['']
+
+
+
+# test page of all events without an upcoming event
+@pytest.mark.parametrize('parser_backend', SOUP.parser_backends)
+def test_parse_upcoming_event_without_upcoming_event(parser_backend):
+    [(url, page)] = read_fixture_pages('statistics/events')
+    start = page.index(b'<tr class="b-statistics__table-row_type_first">')
+    end = page.index(b'</td></tr>', start) + len(b'</td></tr>')
+    SOUP.configure(parser_backend)
+    assert LIB.parse_upcoming_event([page[:start] + page[end:]]) is None
+
+
+
+# test an accumulator without records converts to a df of text columns, as all pages of a run can be quarantined
+def test_record_accumulator_without_records_has_text_columns():
+    df = LIB.RecordAccumulator(['FIGHTER', 'URL']).to_df()
+    assert df.empty
+    assert list(df.dtypes) == [object, object]
+    assert df['FIGHTER'].str.strip().tolist() == []
@@ -0,0 +1,138 @@
+'''
+Overview
+
+parity tests of the parser backends over the saved pages in tests/fixtures
+every parse function must give the same output with lxml and fast as with html.parser
+and the index pages streamed in chunks must give the same records as their soups, with every stream parser
+
+run with
+python -m pytest tests
+
+'''
+
+# imports
+import pytest
+
+# import library
+import scrape_ufc_stats_library as LIB
+import scrape_ufc_stats_soup as SOUP
+
+# import saved pages
+from conftest import read_fixture_pages
+
+# backends compared with html.parser
+other_parser_backends = [parser_backend for parser_backend in SOUP.parser_backends if parser_backend != 'html.parser']
+
+
+
+# parse page
+def parse_page(url: str, page: bytes, parser_backend: str, config: dict) -> dict:
+    '''
+    parse a saved page with every parse function of the library for its type of page
+
+    arguments:
+    url (str): url of page
+    page (bytes): raw content of page
+    parser_backend (str): one of SOUP.parser_backends
+    config (dict): config of the scraper
+
+    returns:
+    a dict of parse function to its output, dfs as csv text so they must be byte identical
+    '''
+    soup = SOUP.make_soup(page, parser_backend)
+    if 'statistics/events' in url:
+        return {'parse_event_details': LIB.parse_event_details(soup).to_csv(index=False)}
+    if 'event-details' in url:
+        return {
+            'parse_fight_details': LIB.parse_fight_details(soup).to_csv(index=False),
+            'parse_fight_fingerprints': LIB.parse_fight_fingerprints(soup),
+            'parse_finished_fight_urls': LIB.parse_finished_fight_urls(soup),
+        }
+    if 'fight-details' in url:
+        return {
+            'parse_bout': LIB.parse_bout(soup),
+            'parse_fight_ids': LIB.parse_fight_ids(soup, url),
+            'parse_organise_fight_results_and_stats_records': LIB.parse_organise_fight_results_and_stats_records(
+                soup, url, config['totals_column_names'], config['significant_strikes_column_names'], id_columns=True
+            ),
+        }
+    if 'statistics/fighters' in url:
+        return {'parse_fighter_details': LIB.parse_fighter_details(soup, config['fighter_details_column_names']).to_csv(index=False)}
+    if 'fighter-details' in url:
+        return {
+            'parse_fighter_tott': LIB.parse_fighter_tott(soup),
+            'parse_fighter_averages': LIB.parse_fighter_averages(soup),
+            'parse_fighter_history': LIB.parse_fighter_history(soup),
+        }
+    raise ValueError(f'unknown type of page {url}')
+
+
+
+# split page into chunks
+def split_page(page: bytes, chunk_size: int) -> list:
+    '''
+    split a page into chunks, as it is streamed from the network
+
+    arguments:
+    page (bytes): raw content of page
+    chunk_size (int): number of bytes of each chunk
+
+    returns:
+    a list of chunks
+    '''
+    # return
+    return [page[i:i + chunk_size] for i in range(0, len(page), chunk_size)]
+
+
+
+# test every saved page type is covered
+def test_fixture_pages_cover_every_page_type():
+    page_types = ['statistics/events', 'event-details', 'fight-details', 'statistics/fighters', 'fighter-details']
+    for page_type in page_types:
+        assert read_fixture_pages(page_type), f'no saved page of type {page_type}'
+
+
+
+# test output of each backend is the same as html.parser
+@pytest.mark.parametrize('parser_backend', other_parser_backends)
+@pytest.mark.parametrize('url, page', read_fixture_pages(), ids=lambda value: value if isinstance(value, str) else '')
+def test_backend_output_matches_html_parser(url, page, parser_backend, config):
+    expected = parse_page(url, page, 'html.parser', config)
+    output = parse_page(url, page, parser_backend, config)
+    for function_name in expected:
+        assert output[function_name] == expected[function_name], f'{function_name} of {parser_backend} differs for {url}'
+
+
+
+# test parse functions find content on saved pages, so parity is not of empty output
+@pytest.mark.parametrize('url, page', read_fixture_pages(), ids=lambda value: value if isinstance(value, str) else '')
+def test_saved_pages_parse_to_content(url, page, config):
+    output = parse_page(url, page, 'html.parser', config)
+    for function_name, value in output.items():
+        assert value and value != '\n', f'{function_name} found nothing on {url}'
+
+
+
+# test streamed event details are the same as the soup of the page
+@pytest.mark.parametrize('parser_backend', SOUP.parser_backends)
+@pytest.mark.parametrize('chunk_size', [512, 65536])
+def test_iter_event_details_matches_parse_event_details(parser_backend, chunk_size):
+    [(url, page)] = read_fixture_pages('statistics/events')
+    expected = LIB.parse_event_details(SOUP.make_soup(page, 'html.parser')).values.tolist()
+
+    SOUP.configure(parser_backend)
+    records = list(LIB.iter_event_details(split_page(page, chunk_size)))
+    assert records == expected
+
+
+
+# test streamed fighter details are the same as the soup of the page
+@pytest.mark.parametrize('parser_backend', SOUP.parser_backends)
+@pytest.mark.parametrize('chunk_size', [512, 65536])
+def test_iter_fighter_details_matches_parse_fighter_details(parser_backend, chunk_size, config):
+    [(url, page)] = read_fixture_pages('statistics/fighters')
+    expected = LIB.parse_fighter_details(SOUP.make_soup(page, 'html.parser'), config['fighter_details_column_names']).values.tolist()
+
+    SOUP.configure(parser_backend)
+    records = list(LIB.iter_fighter_details(split_page(page, chunk_size)))
+    assert records == expected
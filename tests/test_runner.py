@@ -0,0 +1,266 @@
+'''
+Overview
+
+tests of the stages of scrape_ufc_stats_runner.py when pages could not be fetched
+pages are served from the saved pages in tests/fixtures, any other url fails as a missing page of ufcstats.com does
+fight and fighter pages that could not be fetched are quarantined and left for the next run, without aborting the run
+and of the reparse command, which parses pages again only from the page cache
+
+run with
+python -m pytest tests
+
+'''
+
+# imports
+import os
+import pandas as pd
+import pytest
+
+# import stages and the modules they use
+import scrape_ufc_stats_fetch as FETCH
+import scrape_ufc_stats_library as LIB
+import scrape_ufc_stats_manifest as MANIFEST
+import scrape_ufc_stats_runner as RUNNER
+import scrape_ufc_stats_soup as SOUP
+import scrape_ufc_stats_storage as STORE
+
+# import saved pages
+from conftest import read_fixture_pages
+
+# saved pages by url
+fixture_pages = dict(read_fixture_pages())
+
+# saved event page, its fights are saved for only some of its fights
+event_url = 'http://ufcstats.com/event-details/158d79a3572ea87f'
+event = 'UFC 300: Aldo vs. Aaron'
+saved_fight_urls = ['http://ufcstats.com/fight-details/5a9425c66277b58b', 'http://ufcstats.com/fight-details/6535a4beb5e46a70']
+# event of the page of all events whose event page is not saved
+missing_event = "UFC 299: O'Malley vs. Aldo"
+missing_fight_url = 'http://ufcstats.com/fight-details/0092239f0015f285'
+
+# saved fighter page and a fighter whose page is not saved
+saved_fighter_url = 'http://ufcstats.com/fighter-details/d854be0f422e4945'
+missing_fighter_url = 'http://ufcstats.com/fighter-details/affc7235d2c7e4df'
+
+
+
+# serve saved pages
+@pytest.fixture
+def run_directory(tmp_path, monkeypatch, config):
+    '''
+    run the stages in a temporary directory, with the csv backend and pages served from the saved pages
+    urls without a saved page fail with status 404
+    the tables of fights and fighters are empty, as the stages add to tables that exist
+
+    arguments:
+    tmp_path (path): temporary directory of the test
+    monkeypatch (monkeypatch): restores the settings and the fetch engine after the test
+    config (dict): config of the scraper
+
+    returns:
+    path of directory
+    '''
+    def get_page(url):
+        if url not in fixture_pages:
+            raise FETCH.FetchError(url, 'status 404')
+        # return
+        return fixture_pages[url]
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(FETCH, 'get_page', get_page)
+    monkeypatch.setitem(STORE.settings, 'storage_backend', 'csv')
+    monkeypatch.setitem(STORE.settings, 'id_columns', False)
+    monkeypatch.setitem(STORE.settings, 'categorical_column_names', [])
+    for table in ['fight_details', 'fight_results', 'fight_stats', 'fighter_details', 'fighter_tott']:
+        STORE.write_table(pd.DataFrame(columns=config[f'{table}_column_names']), config[f'{table}_file_name'])
+    FETCH.release_quarantined_urls()
+    yield tmp_path
+
+    FETCH.release_quarantined_urls()
+
+
+
+# get events to parse
+def get_events(events_fight_details_dfs: dict) -> dict:
+    '''
+    get the events to parse of the page of all events, as check_events() finds new events
+
+    arguments:
+    events_fight_details_dfs (dict): dict of event to its fight details df
+
+    returns:
+    a dict of events to parse, for parse_events()
+    '''
+    [(url, page)] = read_fixture_pages('statistics/events')
+    event_details_df = LIB.parse_event_details(SOUP.make_soup(page, 'html.parser'))
+    events_to_check_df = event_details_df[event_details_df['EVENT'].isin(events_fight_details_dfs)]
+    soup = SOUP.make_soup(fixture_pages[event_url], 'html.parser')
+
+    # return
+    return {
+        'event_details_df': event_details_df,
+        'unparsed_events': list(events_fight_details_dfs),
+        'replaced_events': [],
+        'changed_fight_urls': [],
+        'events_to_check_df': events_to_check_df,
+        'fight_details_dfs': events_fight_details_dfs,
+        'fight_fingerprints': {event_url: LIB.parse_fight_fingerprints(soup)} if event in events_fight_details_dfs else {},
+        'manifest': MANIFEST.load_manifest('ufc_manifest.json'),
+    }
+
+
+
+# get fight details of the saved event page
+def get_fight_details_df(fight_urls: list) -> pd.DataFrame:
+    '''
+    get fight details of the saved event page, limited to some of its fights
+
+    arguments:
+    fight_urls (list): urls of fights to keep
+
+    returns:
+    a df of fight details
+    '''
+    fight_details_df = LIB.parse_fight_details(SOUP.make_soup(fixture_pages[event_url], 'html.parser'))
+
+    # return
+    return fight_details_df[fight_details_df['URL'].isin(fight_urls)].reset_index(drop=True)
+
+
+
+# test events with a fight that could not be fetched are left for the next run, and other events are written
+def test_parse_events_with_some_fights_quarantined(run_directory, config):
+    missing_fight_details_df = pd.DataFrame({'EVENT': [missing_event], 'BOUT': [None], 'URL': [missing_fight_url]})
+    events = get_events({event: get_fight_details_df(saved_fight_urls), missing_event: missing_fight_details_df})
+
+    fighters = RUNNER.parse_events(config, events)
+
+    assert list(FETCH.list_quarantined_urls()) == [missing_fight_url]
+    assert STORE.read_table(config['fight_details_file_name'])['URL'].tolist() == saved_fight_urls
+    assert STORE.read_table(config['fight_results_file_name'])['EVENT'].str.strip().unique().tolist() == [event]
+    assert STORE.read_table(config['fight_stats_file_name'])['EVENT'].str.strip().unique().tolist() == [event]
+    assert fighters
+    assert event_url in MANIFEST.load_manifest(config['manifest_file_name'])['events']
+
+
+
+# test a run whose fights all could not be fetched writes no fights and does not raise
+def test_parse_events_with_every_fight_quarantined(run_directory, config):
+    fight_details_df = LIB.parse_fight_details(SOUP.make_soup(fixture_pages[event_url], 'html.parser'))
+    fight_urls = [url for url in fight_details_df['URL'] if url not in saved_fight_urls]
+    events = get_events({event: get_fight_details_df(fight_urls)})
+
+    fighters = RUNNER.parse_events(config, events)
+
+    assert list(FETCH.list_quarantined_urls()) == fight_urls
+    assert fighters == set()
+    for file_name in [config['fight_details_file_name'], config['fight_results_file_name'], config['fight_stats_file_name']]:
+        assert STORE.read_table(file_name).empty
+    # fingerprints of the event are not recorded, so it is parsed again on the next run
+    assert event_url not in MANIFEST.load_manifest(config['manifest_file_name'])['events']
+
+
+
+# get fighters to parse
+def get_fighters(fighter_urls: list) -> dict:
+    '''
+    get the fighters to parse of the saved alphabetical page, as check_fighters() finds new fighters
+
+    arguments:
+    fighter_urls (list): urls of fighters to parse
+
+    returns:
+    a dict of fighters to parse, for parse_fighters()
+    '''
+    [(url, page)] = read_fixture_pages('statistics/fighters')
+    records = LIB.RecordAccumulator(['FIRST', 'LAST', 'NICKNAME', 'URL'])
+    records.extend(LIB.iter_fighter_details([page]))
+
+    # return
+    return {
+        'fighter_details_df': records.to_df(),
+        'unparsed_fighter_urls': fighter_urls,
+    }
+
+
+
+# test fighters that could not be fetched are left for the next run, and other fighters are written
+@pytest.mark.parametrize('fighter_urls, expected_urls', [
+    ([saved_fighter_url, missing_fighter_url], [saved_fighter_url]),
+    ([missing_fighter_url], []),
+], ids=['some quarantined', 'every fighter quarantined'])
+def test_parse_fighters_with_fighters_quarantined(run_directory, config, fighter_urls, expected_urls):
+    fighters = RUNNER.parse_fighters(config, get_fighters(fighter_urls))
+
+    assert list(FETCH.list_quarantined_urls()) == [missing_fighter_url]
+    assert len(fighters) == len(expected_urls)
+    assert STORE.read_table(config['fighter_tott_file_name'])['URL'].tolist() == expected_urls
+    assert missing_fighter_url not in STORE.read_table(config['fighter_details_file_name'])['URL'].tolist()
+
+
+
+# run reparse in a temporary directory
+@pytest.fixture
+def reparse_directory(tmp_path, monkeypatch, config):
+    '''
+    run the reparse command in a temporary directory with its own page cache and empty tables of fighters, as a checkout without parser versions
+    the settings of the modules are copies, as the command configures them from the config
+
+    arguments:
+    tmp_path (path): temporary directory of the test
+    monkeypatch (monkeypatch): restores the settings after the test
+    config (dict): config of the scraper
+
+    returns:
+    path of the config file
+    '''
+    import yaml
+    import scrape_ufc_stats_changes as CHANGES
+    import scrape_ufc_stats_metrics as METRICS
+
+    monkeypatch.chdir(tmp_path)
+    for module in [FETCH, STORE, SOUP, CHANGES, METRICS]:
+        monkeypatch.setattr(module, 'settings', dict(module.settings))
+    for table in ['fighter_details', 'fighter_tott']:
+        STORE.write_table(pd.DataFrame(columns=config[f'{table}_column_names']), config[f'{table}_file_name'])
+    with open('scrape_ufc_stats_config.yaml', 'w') as file:
+        yaml.safe_dump(config, file)
+    yield str(tmp_path / 'scrape_ufc_stats_config.yaml')
+
+    FETCH.configure()
+
+
+
+# test reparse without recorded parser versions parses no stage
+def test_reparse_without_parser_versions_parses_no_stage(reparse_directory, config, capsys):
+    RUNNER.main(['--config', reparse_directory, 'reparse'])
+
+    assert 'No parser versions are recorded' in capsys.readouterr().out
+    assert not os.path.exists(config['parser_versions_file_name'])
+
+
+
+# test reparse with pages missing from the page cache reports them and rewrites no table
+def test_reparse_with_uncached_pages_rewrites_no_table(reparse_directory, config, capsys):
+    modified_at = os.path.getmtime(config['fighter_details_file_name'])
+    with pytest.raises(SystemExit) as error:
+        RUNNER.main(['--config', reparse_directory, 'reparse', '--stage', 'fighters'])
+
+    assert error.value.code == 1
+    assert 'are not in the page cache, no tables were rewritten' in capsys.readouterr().err
+    assert os.path.getmtime(config['fighter_details_file_name']) == modified_at
+    assert not os.path.exists(config['fighter_index_file_name'])
+
+
+
+# test reparse of alphabetical pages records the hash of each page in the fighter index
+def test_reparse_fighters_records_page_hashes(reparse_directory, config):
+    [(url, page)] = read_fixture_pages('statistics/fighters')
+    FETCH.configure(page_cache_file_name=config['page_cache_file_name'])
+    for alphabetical_url in LIB.generate_alphabetical_urls():
+        FETCH.write_cached_page(alphabetical_url, page)
+
+    RUNNER.main(['--config', reparse_directory, 'reparse', '--stage', 'fighters'])
+
+    fighter_index = MANIFEST.load_fighter_index(config['fighter_index_file_name'])
+    assert set(MANIFEST.get_fighter_page_hashes(fighter_index).values()) == {FETCH.get_page_hash(url)}
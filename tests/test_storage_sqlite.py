@@ -0,0 +1,82 @@
+'''
+Overview
+
+tests of the sqlite backend when the tables of fights and fighters are written at the same time
+as scrape_ufc_stats_runner.py does when the chain of events and the chain of fighters of a backfill run in threads
+
+run with
+python -m pytest tests
+
+'''
+
+# imports
+import threading
+import pandas as pd
+import pytest
+
+# import storage
+import scrape_ufc_stats_storage as STORE
+
+
+
+# use a sqlite database in a temporary directory
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    '''
+    point the sqlite backend at a new database in a temporary directory, without a change log
+
+    arguments:
+    tmp_path (path): temporary directory of the test
+    monkeypatch (monkeypatch): restores the settings after the test
+
+    returns:
+    path of database
+    '''
+    database_file_name = str(tmp_path / 'ufc_stats.sqlite')
+    monkeypatch.setitem(STORE.settings, 'storage_backend', 'sqlite')
+    monkeypatch.setitem(STORE.settings, 'database_file_name', database_file_name)
+    monkeypatch.setitem(STORE.settings, 'id_columns', False)
+    monkeypatch.setitem(STORE.settings, 'categorical_column_names', [])
+
+    # return
+    return database_file_name
+
+
+
+# test both chains write their tables at the same time
+def test_tables_written_by_two_threads_at_the_same_time(database):
+    number_of_writes = 40
+    fight_details_df = pd.DataFrame({
+        'EVENT': ['UFC 300: Pereira vs. Hill'],
+        'BOUT': ['Alex Pereira vs. Jamahal Hill'],
+        'URL': ['http://ufcstats.com/fight-details/de1a3734be60e6a1'],
+    })
+    fighter_details_df = pd.DataFrame({
+        'FIRST': ['Alex'],
+        'LAST': ['Pereira'],
+        'NICKNAME': ['Poatan'],
+        'URL': ['http://ufcstats.com/fighter-details/e5549c82bfb5582d'],
+    })
+    errors = []
+
+    # each write reads the ids and columns of the database before it writes, as the writes of a backfill do
+    def write(df, file_name, **kwargs):
+        try:
+            for _ in range(number_of_writes):
+                STORE.append_table(df, file_name, **kwargs)
+        except Exception as error:
+            errors.append(error)
+
+    threads = [
+        threading.Thread(target=write, args=(fight_details_df, 'ufc_fight_details.csv'), kwargs={'event_years': {'UFC 300: Pereira vs. Hill': 2024}, 'replace_events': ['UFC 300: Pereira vs. Hill']}),
+        threading.Thread(target=write, args=(fighter_details_df, 'ufc_fighter_details.csv')),
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    # rows with the same key replace each other, so each table has its one row
+    assert STORE.read_table('ufc_fight_details.csv').values.tolist() == fight_details_df.values.tolist()
+    assert STORE.read_table('ufc_fighter_details.csv').values.tolist() == fighter_details_df.values.tolist()